@@ -0,0 +1,88 @@
+#!/usr/bin/python2
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012, Sebastian Wiesner <lunaryorn@googlemail.com>
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+    bench_import
+    ============
+
+    Measure the time needed to import :mod:`synaptiks.config` and the modules,
+    which load the X11 bindings, in a new interpreter.
+
+    Each module is imported in a fresh interpreter process, once with the
+    libraries loaded by their sonames ("soname"), and once with
+    :func:`ctypes.util.find_library` only ("find_library").  The time of an
+    interpreter, which imports nothing, is given for comparison.
+
+    .. moduleauthor::  Sebastian Wiesner  <lunaryorn@googlemail.com>
+"""
+
+from __future__ import (print_function, division, unicode_literals,
+                        absolute_import)
+
+import sys
+import subprocess
+from timeit import default_timer
+
+
+RUNS = 10
+
+MODULES = ['synaptiks.config', 'synaptiks.x11', 'synaptiks.touchpad']
+
+# disables all known sonames before importing the module
+FIND_LIBRARY_ONLY = ('import synaptiks._bindings.util as util; '
+                     'util.SONAMES.clear(); ')
+
+
+def time_statement(statement):
+    """
+    Execute ``statement`` :data:`RUNS` times in a new interpreter.
+
+    Return the median time of a run in milliseconds.
+    """
+    durations = []
+    for _ in xrange(RUNS):
+        start = default_timer()
+        subprocess.check_call([sys.executable, '-c', statement])
+        durations.append(default_timer() - start)
+    durations.sort()
+    return durations[len(durations) // 2] * 1000
+
+
+def main():
+    print('{0:<20} {1:>8} {2:>12}'.format('module', 'soname', 'find_library'))
+    print('{0:<20} {1:>8.1f} {2:>12}'.format(
+        '(nothing)', time_statement('pass'), ''))
+    for module in MODULES:
+        import_statement = 'import {0}'.format(module)
+        soname = time_statement(import_statement)
+        find_library = time_statement(FIND_LIBRARY_ONLY + import_statement)
+        print('{0:<20} {1:>8.1f} {2:>12.1f}'.format(
+            module, soname, find_library))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/python2
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012, Sebastian Wiesner <lunaryorn@googlemail.com>
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+    bench_keyboard_polling
+    ======================
+
+    Measure the cost of a single poll of :class:`PollingKeyboardMonitor`,
+    and the number of polls while the keyboard is idle.
+
+    The per-poll cost compares the former byte-wise evaluation of the keymap
+    with the evaluation as 256 bit integer, on random keymaps without the
+    server round trip.  The idle wakeups are first computed from the polling
+    intervals, and then measured together with the CPU time by running a
+    monitor for some seconds, once with a fixed and once with the adaptive
+    interval.
+
+    .. moduleauthor::  Sebastian Wiesner  <lunaryorn@googlemail.com>
+"""
+
+from __future__ import (print_function, division, unicode_literals,
+                        absolute_import)
+
+import sys
+import random
+import resource
+from array import array
+from itertools import izip
+from timeit import Timer
+
+from PyQt4.QtCore import QTimer
+from PyQt4.QtGui import QApplication
+
+from synaptiks.monitors.keyboard import (PollingKeyboardMonitor, ALL_KEYS,
+                                         keymap_to_int, keycodes_to_int)
+
+
+POLLS = 10000
+
+#: seconds, for which each monitor runs
+RUNNING_TIME = 10
+
+MODIFIERS = [37, 50, 62, 64, 66, 105, 108, 133, 134]
+
+
+def random_keymaps(number):
+    keymaps = []
+    for _ in xrange(number):
+        keycodes = random.sample(xrange(8, 256), random.randint(0, 3))
+        keymap = bytearray(32)
+        for keycode in keycodes:
+            keymap[keycode // 8] |= 1 << (keycode % 8)
+        keymaps.append(bytes(keymap))
+    return keymaps
+
+
+def poll_bytewise(keymaps, mask):
+    old_keymap = array(b'B', b'\0' * 32)
+    for raw_keymap in keymaps:
+        keymap = array(b'B', raw_keymap)
+        is_active = False
+        for new_state, old_state, mask_state in izip(keymap, old_keymap, mask):
+            is_active = new_state & ~old_state & mask_state
+            if is_active:
+                break
+        for state, mask_state in izip(keymap, mask):
+            if state & ~mask_state:
+                is_active = False
+                break
+        old_keymap = keymap
+
+
+def poll_bitwise(keymaps, mask):
+    old_keymap = 0
+    for raw_keymap in keymaps:
+        keymap = keymap_to_int(raw_keymap)
+        is_active = bool(keymap & ~old_keymap & mask)
+        if is_active and keymap & ~mask:
+            is_active = False
+        old_keymap = keymap
+
+
+def idle_wakeups_per_minute(next_delay):
+    elapsed = 0
+    wakeups = 0
+    delay = PollingKeyboardMonitor.DEFAULT_POLLDELAY
+    while elapsed < 60000:
+        elapsed += delay
+        wakeups += 1
+        delay = next_delay(delay, False, False)
+    return wakeups
+
+
+class FixedPollingKeyboardMonitor(PollingKeyboardMonitor):
+    MINIMUM_POLLDELAY = PollingKeyboardMonitor.DEFAULT_POLLDELAY
+    MAXIMUM_POLLDELAY = PollingKeyboardMonitor.DEFAULT_POLLDELAY
+
+
+def run_monitor(app, monitor_class):
+    """
+    Run a monitor of the given class for :data:`RUNNING_TIME` seconds.
+
+    Return a tuple ``(polls, cpu_time)``.
+    """
+    monitor = monitor_class()
+    monitor.keys_to_ignore = monitor.IGNORE_MODIFIER_COMBOS
+    polls = [0]
+
+    def count_poll():
+        polls[0] += 1
+    monitor._keyboard_timer.timeout.connect(count_poll)
+    QTimer.singleShot(RUNNING_TIME * 1000, app.quit)
+    start = resource.getrusage(resource.RUSAGE_SELF)
+    monitor.start()
+    app.exec_()
+    monitor.stop()
+    end = resource.getrusage(resource.RUSAGE_SELF)
+    cpu_time = (end.ru_utime - start.ru_utime) + (end.ru_stime - start.ru_stime)
+    return polls[0], cpu_time
+
+
+def main():
+    keymaps = random_keymaps(POLLS)
+    mask = ALL_KEYS & ~keycodes_to_int(MODIFIERS)
+    byte_mask = array(b'B', b'\xff' * 32)
+    for keycode in MODIFIERS:
+        byte_mask[keycode // 8] &= ~(1 << (keycode % 8))
+    print('cost of a single poll (without round trip):')
+    for label, poll, poll_mask in [('bytewise', poll_bytewise, byte_mask),
+                                   ('bitwise', poll_bitwise, mask)]:
+        duration = min(Timer(lambda: poll(keymaps, poll_mask)).repeat(3, 1))
+        print('  {0:<10} {1:>8.2f} us'.format(
+            label, duration * 1000000 / POLLS))
+
+    print('idle wakeups per minute:')
+    for label, monitor_class in [('fixed', FixedPollingKeyboardMonitor),
+                                 ('adaptive', PollingKeyboardMonitor)]:
+        print('  {0:<10} {1:>8}'.format(
+            label, idle_wakeups_per_minute(monitor_class._next_poll_delay)))
+
+    app = QApplication(sys.argv)
+    print('running each monitor for {0} seconds, do not type:'.format(
+        RUNNING_TIME))
+    for label, monitor_class in [('fixed', FixedPollingKeyboardMonitor),
+                                 ('adaptive', PollingKeyboardMonitor)]:
+        polls, cpu_time = run_monitor(app, monitor_class)
+        print('  {0:<10} {1:>5} polls {2:>8.3f} s CPU'.format(
+            label, polls, cpu_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/python2
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012, Sebastian Wiesner <lunaryorn@googlemail.com>
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+    bench_keyboard_signals
+    ======================
+
+    Count the Qt signals, which cross from the recording thread of
+    :class:`RecordingKeyboardMonitor` to the GUI thread, per keystroke.
+
+    A typing session is simulated as a sequence of key presses and releases.
+    Formerly, the recording thread emitted a signal for each key press and
+    for each key release.  Now the events are filtered by a
+    :class:`KeyActivityFilter` inside the recording thread, which is replayed
+    here, and only the start and the end of typing are signalled.
+
+    .. moduleauthor::  Sebastian Wiesner  <lunaryorn@googlemail.com>
+"""
+
+from __future__ import (print_function, division, unicode_literals,
+                        absolute_import)
+
+import random
+
+from synaptiks.monitors.keyboard import (AbstractKeyboardMonitor,
+                                         KeyActivityFilter)
+
+
+#: number of simulated typing bursts
+BURSTS = 200
+
+#: keystrokes per second within a burst
+KEYS_PER_SECOND = 8
+
+MODIFIERS = [37, 50, 62, 64, 66, 105, 108, 133, 134]
+
+
+def simulate_typing():
+    """
+    Simulate a typing session.
+
+    Return a list of ``(time, pressed, keycode)`` tuples.
+    """
+    events = []
+    now = 0
+    for _ in xrange(BURSTS):
+        for _ in xrange(random.randint(5, 60)):
+            keycode = random.choice(xrange(24, 62))
+            events.append((now, True, keycode))
+            events.append((now + 0.08, False, keycode))
+            now += random.expovariate(KEYS_PER_SECOND)
+        # pause between bursts, sometimes shorter than the idle time
+        now += random.uniform(0.5, 6)
+    return events
+
+
+def replay(events, keys_to_ignore):
+    """
+    Replay the given ``events`` through a :class:`KeyActivityFilter`.
+
+    Return the number of signals, which the recording thread emits.
+    """
+    activity_filter = KeyActivityFilter(MODIFIERS)
+    activity_filter.keys_to_ignore = keys_to_ignore
+    signals = 0
+    for now, pressed, keycode in events:
+        # the recording thread checks for the idle timeout before handling
+        # the next event
+        if activity_filter.check_idle(now):
+            signals += 1
+        if pressed:
+            started = activity_filter.key_pressed(keycode, now)
+        else:
+            started = activity_filter.key_released(keycode, now)
+        if started:
+            signals += 1
+    if activity_filter.check_idle(float('inf')):
+        signals += 1
+    return signals
+
+
+def main():
+    events = simulate_typing()
+    keystrokes = len(events) // 2
+    print('{0} keystrokes in {1} bursts'.format(keystrokes, BURSTS))
+    print('{0:<24} {1:>8} {2:>14}'.format('', 'signals', 'per keystroke'))
+    before = len(events)
+    print('{0:<24} {1:>8} {2:>14.3f}'.format(
+        'per key event (before)', before, before / keystrokes))
+    after = replay(events, AbstractKeyboardMonitor.IGNORE_NO_KEYS)
+    print('{0:<24} {1:>8} {2:>14.3f}'.format(
+        'transitions (after)', after, after / keystrokes))
+
+
+if __name__ == '__main__':
+    main()
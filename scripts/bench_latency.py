@@ -0,0 +1,335 @@
+#!/usr/bin/python2
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012, Sebastian Wiesner <lunaryorn@googlemail.com>
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+    bench_latency
+    =============
+
+    Measure the latency from a key press until the touchpad is switched off,
+    for each keyboard monitor backend.
+
+    The benchmark starts a private Xvfb server, unless ``--display`` is
+    given.  The ``Synaptics Off`` property is created on the XTest pointer,
+    which then serves as touchpad of a :class:`TouchpadManager`.  Keys are
+    pressed with XTest on a separate display connection.  For every key
+    press the following times are taken:
+
+    ``typing_started``
+       :attr:`~AbstractKeyboardMonitor.typingStarted` was emitted
+    ``state_entered``
+       the manager entered the ``temporarily_off`` state
+    ``change_property``
+       ``XIChangeProperty`` was called to switch the touchpad off
+
+    Each backend runs in its own process, which also reports the CPU time
+    per key press and the CPU usage of the idle monitor.  The results are
+    printed as JSON.
+
+    Backends, which do not see XTest key events (e.g. the evdev monitor),
+    cannot be measured.
+
+    .. moduleauthor::  Sebastian Wiesner  <lunaryorn@googlemail.com>
+"""
+
+from __future__ import (print_function, division, unicode_literals,
+                        absolute_import)
+
+import os
+import sys
+import json
+import time
+import resource
+import subprocess
+from argparse import ArgumentParser
+from timeit import default_timer
+
+from synaptiks.x11 import Display, DisplayError
+from synaptiks._bindings import xlib, xinput, xtest
+
+
+#: maps backend names to the names of the keyboard monitor classes
+BACKENDS = {
+    'raw': 'RawEventKeyboardMonitor',
+    'recording': 'RecordingKeyboardMonitor',
+    'polling': 'PollingKeyboardMonitor',
+    }
+
+#: the timestamps taken for every key press
+TIMESTAMPS = ['typing_started', 'state_entered', 'change_property']
+
+#: number of key presses per backend
+KEYSTROKES = 200
+
+#: the keycode of the pressed key ("a" on most keyboards)
+KEYCODE = 38
+
+#: the idle time of the keyboard monitor in seconds
+IDLE_TIME = 0.05
+
+#: the time to wait for the touchpad to be switched in seconds
+TIMEOUT = 2
+
+#: the time span, in which the CPU usage of the idle monitor is measured, in
+#: seconds
+IDLE_MEASUREMENT = 2
+
+
+def cpu_time():
+    """
+    Return the user and system CPU time of this process in seconds.
+    """
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def percentile(samples, fraction):
+    """
+    Return the nearest-rank percentile ``fraction`` of the given sorted
+    ``samples``.
+    """
+    if not samples:
+        return None
+    index = max(int(round(fraction * len(samples))) - 1, 0)
+    return samples[index]
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {'p50': percentile(samples, 0.5), 'p99': percentile(samples, 0.99),
+            'max': samples[-1] if samples else None}
+
+
+def create_touchpad(display):
+    """
+    Create a fake touchpad on the given ``display``.
+
+    The ``Synaptics Off`` property is created on the XTest pointer, so that
+    the returned :class:`Touchpad` can be switched off and on.
+    """
+    from synaptiks.touchpad import Touchpad
+    from synaptiks.x11.input import InputDevice
+    pointer = next(InputDevice.find_devices_by_name(
+        display, 'Virtual core XTEST pointer'))
+    display.intern_atom('Synaptics Off', only_if_exists=False)
+    pointer.set_byte('Synaptics Off', [0])
+    display.flush()
+    return Touchpad(display, pointer.id)
+
+
+def run_backend(backend, keystrokes):
+    """
+    Measure the given ``backend`` in this process.
+
+    Return a dictionary with the results.
+    """
+    from PyQt4.QtCore import QObject, QEventLoop, QTimer, pyqtSignal
+    from PyQt4.QtGui import QApplication
+    from synaptiks import management
+    from synaptiks.monitors import keyboard
+
+    class Probe(QObject):
+        switchedOff = pyqtSignal()
+        switchedOn = pyqtSignal()
+
+        def __init__(self):
+            QObject.__init__(self)
+            self.timestamps = {}
+
+        def mark(self, name):
+            self.timestamps.setdefault(name, default_timer())
+
+        def property_changed(self, value):
+            if value:
+                self.mark('change_property')
+                self.switchedOff.emit()
+            else:
+                self.switchedOn.emit()
+
+    def run_event_loop(timeout, signal=None):
+        """
+        Process events until ``signal`` is emitted, or ``timeout`` seconds
+        passed.  Return ``True``, if the signal was emitted.
+        """
+        loop = QEventLoop()
+        emitted = []
+
+        def quit():
+            emitted.append(True)
+            loop.quit()
+        timer = QTimer()
+        timer.setSingleShot(True)
+        timer.timeout.connect(loop.quit)
+        if signal is not None:
+            signal.connect(quit)
+        timer.start(int(timeout * 1000))
+        loop.exec_()
+        timer.stop()
+        if signal is not None:
+            signal.disconnect(quit)
+        return bool(emitted)
+
+    app = QApplication([])
+    display = Display.from_qt()
+    touchpad = create_touchpad(display)
+    touchpad.enable_property_cache()
+    probe = Probe()
+    off_atom = display.intern_atom('Synaptics Off')
+
+    change_property = xinput.change_property
+
+    def timed_change_property(display, deviceid, property, type, format,
+                              data):
+        result = change_property(display, deviceid, property, type, format,
+                                 data)
+        if deviceid == touchpad.id and property.value == off_atom.value:
+            probe.property_changed(bytearray(data)[0])
+        return result
+    xinput.change_property = timed_change_property
+
+    management.create_keyboard_monitor = getattr(keyboard, BACKENDS[backend])
+    manager = management.TouchpadManager(touchpad)
+    manager.monitor_keyboard = True
+    monitor = manager.keyboard_monitor
+    monitor.idle_time = IDLE_TIME
+    monitor.typingStarted.connect(lambda: probe.mark('typing_started'))
+    manager.states['temporarily_off'].entered.connect(
+        lambda: probe.mark('state_entered'))
+    manager.start()
+    run_event_loop(TIMEOUT, manager.started)
+    # let the monitor settle, before measuring its idle CPU usage
+    run_event_loop(0.5)
+    start_cpu = cpu_time()
+    run_event_loop(IDLE_MEASUREMENT)
+    idle_cpu = (cpu_time() - start_cpu) / IDLE_MEASUREMENT
+
+    latencies = dict((name, []) for name in TIMESTAMPS)
+    missed = 0
+    with Display.from_name() as fake_display:
+        start_cpu = cpu_time()
+        for _ in xrange(keystrokes):
+            probe.timestamps.clear()
+            start = default_timer()
+            xtest.fake_key_event(fake_display, KEYCODE, True)
+            xtest.fake_key_event(fake_display, KEYCODE, False)
+            xlib.flush(fake_display)
+            if not run_event_loop(TIMEOUT, probe.switchedOff):
+                missed += 1
+                continue
+            for name in TIMESTAMPS:
+                if name in probe.timestamps:
+                    latencies[name].append(
+                        (probe.timestamps[name] - start) * 1000)
+            run_event_loop(IDLE_TIME + TIMEOUT, probe.switchedOn)
+        cpu_per_keystroke = (cpu_time() - start_cpu) * 1000 / keystrokes
+
+    manager.stop()
+    run_event_loop(0.1)
+    xinput.change_property = change_property
+    del app
+    result = dict((name, summarize(samples))
+                  for name, samples in latencies.iteritems())
+    result.update(monitor=BACKENDS[backend], keystrokes=keystrokes,
+                  missed=missed,
+                  cpu_ms_per_keystroke=cpu_per_keystroke,
+                  idle_cpu_percent=idle_cpu * 100)
+    return result
+
+
+def start_xvfb():
+    """
+    Start a private Xvfb server on the first free display.
+
+    Return a tuple ``(process, display_name)``.
+    """
+    number = 99
+    while os.path.exists('/tmp/.X{0}-lock'.format(number)):
+        number += 1
+    display_name = ':{0}'.format(number)
+    with open(os.devnull, 'w') as devnull:
+        process = subprocess.Popen(
+            ['Xvfb', display_name, '-nolisten', 'tcp', '-noreset'],
+            stdout=devnull, stderr=devnull)
+    deadline = time.time() + 10
+    while True:
+        try:
+            Display.from_name(display_name).close()
+            return process, display_name
+        except DisplayError:
+            if process.poll() is not None or time.time() > deadline:
+                process.kill()
+                raise EnvironmentError('Xvfb failed to start')
+            time.sleep(0.1)
+
+
+def main():
+    parser = ArgumentParser(description='Measure the latency from key '
+                            'presses to switching the touchpad off')
+    parser.add_argument('--display', help='Use the given display instead '
+                        'of a private Xvfb server')
+    parser.add_argument('--keystrokes', type=int, default=KEYSTROKES,
+                        help='Key presses per backend (default: {0})'.format(
+                            KEYSTROKES))
+    parser.add_argument('--output', help='Write the results to the given '
+                        'file instead of stdout')
+    parser.add_argument('--run-backend', choices=sorted(BACKENDS),
+                        help='Measure the given backend in this process')
+    parser.add_argument('backends', nargs='*', default=sorted(BACKENDS),
+                        help='The backends to measure (default: all)')
+    args = parser.parse_args()
+
+    if args.run_backend:
+        json.dump(run_backend(args.run_backend, args.keystrokes), sys.stdout)
+        return
+
+    xvfb = None
+    display_name = args.display
+    if not display_name:
+        xvfb, display_name = start_xvfb()
+    try:
+        env = dict(os.environ, DISPLAY=display_name)
+        results = {}
+        for backend in args.backends:
+            output = subprocess.check_output(
+                [sys.executable, __file__, '--run-backend', backend,
+                 '--keystrokes', str(args.keystrokes)], env=env)
+            results[backend] = json.loads(output)
+    finally:
+        if xvfb:
+            xvfb.terminate()
+            xvfb.wait()
+    report = json.dumps({'display': display_name, 'backends': results},
+                        indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as stream:
+            stream.write(report)
+            stream.write('\n')
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/python2
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012, Sebastian Wiesner <lunaryorn@googlemail.com>
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+    bench_property_roundtrips
+    =========================
+
+    Count the XIGetProperty round trips needed to read properties of
+    different sizes.
+
+    A temporary property is created on the XTEST keyboard for each size and
+    read twice, first without any size hint ("cold") and then with the size
+    hint remembered by the first read ("warm").  For comparison, the number
+    of requests needed by the old grow-by-one retry loop is shown as well.
+
+    .. moduleauthor::  Sebastian Wiesner  <lunaryorn@googlemail.com>
+"""
+
+from __future__ import (print_function, division, unicode_literals,
+                        absolute_import)
+
+import struct
+
+from synaptiks.x11 import Display
+from synaptiks.x11.input import InputDevice
+from synaptiks._bindings import xlib, xinput
+
+
+PROPERTY_NAME = b'synaptiks benchmark property'
+
+ITEM_COUNTS = [1, 4, 64]
+
+
+class CountingFunction(object):
+    """
+    Wrap a foreign function and count its calls.
+    """
+
+    def __init__(self, function):
+        self.function = function
+        self.calls = 0
+
+    def __call__(self, *args):
+        self.calls += 1
+        return self.function(*args)
+
+
+def count_requests(display, device, atom):
+    get_property = xinput.libXi.XIGetProperty
+    counter = CountingFunction(get_property)
+    xinput.libXi.XIGetProperty = counter
+    try:
+        xinput.get_property(display, device.id, atom)
+    finally:
+        xinput.libXi.XIGetProperty = get_property
+    return counter.calls
+
+
+def main():
+    with Display.from_name() as display:
+        device = next(InputDevice.find_devices_by_name(
+            display, 'Virtual core XTEST keyboard'))
+        atom = xlib.intern_atom(display, PROPERTY_NAME, False)
+        print('{0:>6} {1:>8} {2:>6} {3:>6}'.format(
+            'items', 'old loop', 'cold', 'warm'))
+        for number_of_items in ITEM_COUNTS:
+            data = struct.pack(b'={0}L'.format(number_of_items),
+                               *range(number_of_items))
+            xinput.change_property(display, device.id, atom, xlib.INTEGER,
+                                   32, data)
+            xinput._property_length_hints.clear()
+            cold = count_requests(display, device, atom)
+            warm = count_requests(display, device, atom)
+            # the old loop requested one unit of four bytes more on each
+            # iteration
+            old = number_of_items
+            print('{0:>6} {1:>8} {2:>6} {3:>6}'.format(
+                number_of_items, old, cold, warm))
+        xinput.delete_property(display, device.id, atom)
+        display.flush()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/python2
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012, Sebastian Wiesner <lunaryorn@googlemail.com>
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+    bench_startup
+    =============
+
+    Measure the time needed to find the touchpad on startup, with and without
+    the discovery cache.
+
+    Each run opens a new display connection, so that no atoms or device
+    properties are cached between runs.  "scan" runs without a discovery
+    cache, "cold" with an empty cache file, and "warm" with the cache file
+    written by the previous run.
+
+    .. moduleauthor::  Sebastian Wiesner  <lunaryorn@googlemail.com>
+"""
+
+from __future__ import (print_function, division, unicode_literals,
+                        absolute_import)
+
+import os
+import shutil
+import tempfile
+from timeit import default_timer
+
+from synaptiks.x11 import Display
+from synaptiks.touchpad import Touchpad
+
+
+RUNS = 20
+
+
+def time_find_first(cache_filename=None, before_run=None):
+    """
+    Find the touchpad :data:`RUNS` times on new display connections.
+
+    ``before_run`` is called before each run, if given.
+
+    Return the average time of a run in milliseconds.
+    """
+    total = 0
+    for _ in xrange(RUNS):
+        if before_run:
+            before_run()
+        with Display.from_name() as display:
+            start = default_timer()
+            Touchpad.find_first(display, cache_filename)
+            total += default_timer() - start
+    return total * 1000 / RUNS
+
+
+def main():
+    directory = tempfile.mkdtemp()
+    try:
+        cache_filename = os.path.join(directory, 'touchpad-discovery.json')
+
+        def remove_cache():
+            if os.path.exists(cache_filename):
+                os.remove(cache_filename)
+
+        scan = time_find_first()
+        cold = time_find_first(cache_filename, remove_cache)
+        warm = time_find_first(cache_filename)
+    finally:
+        shutil.rmtree(directory)
+    print('{0:>6} {1:>8}'.format('cache', 'ms/run'))
+    for label, duration in [('scan', scan), ('cold', cold), ('warm', warm)]:
+        print('{0:>6} {1:>8.3f}'.format(label, duration))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/python2
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012, Sebastian Wiesner <lunaryorn@googlemail.com>
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+    evaluate_idle_time
+    ==================
+
+    Evaluate fixed and adaptive idle times of keyboard monitors offline by
+    replaying key timing traces through a :class:`KeyActivityFilter`.
+
+    A trace is a text file with the time of one key press in seconds per
+    line.  Empty lines separate typing bursts, i.e. the places, where the
+    user stopped typing to use the touchpad.  Without trace files, typing
+    of a fast and of a slow typist is simulated.
+
+    Two kinds of errors are reported:
+
+    false enables
+       The touchpad was enabled again within a burst, because the user
+       paused longer than the idle time.  The rate is given per interval
+       between key presses within bursts.
+
+    false disables
+       The touchpad was still disabled, when the user reached for it after
+       a burst (see ``--reach-time``).  The rate is given per burst.
+
+    .. moduleauthor::  Sebastian Wiesner  <lunaryorn@googlemail.com>
+"""
+
+from __future__ import (print_function, division, unicode_literals,
+                        absolute_import)
+
+import io
+import random
+from argparse import ArgumentParser
+
+from synaptiks.monitors.keyboard import KeyActivityFilter
+from synaptiks.monitors.idletime import IdleTimeEstimator
+
+
+#: fixed idle times to evaluate
+IDLE_TIMES = [0.5, 1.0, 2.0]
+
+#: percentiles to evaluate for the adaptive idle time
+PERCENTILES = [0.9, 0.95, 0.99]
+
+#: mean interval between key presses of simulated typists in seconds
+TYPISTS = {'fast': 0.12, 'slow': 0.6}
+
+#: number of simulated typing bursts per typist
+BURSTS = 400
+
+KEYCODE = 38
+
+
+def simulate_typing(mean_interval):
+    """
+    Simulate the typing of a typist with the given ``mean_interval``
+    between key presses.
+
+    Return a list of bursts, each of which is a list of key press times.
+    """
+    bursts = []
+    now = 0
+    for _ in xrange(BURSTS):
+        burst = []
+        for _ in xrange(random.randint(5, 80)):
+            burst.append(now)
+            interval = random.expovariate(1 / mean_interval)
+            if random.random() < 0.03:
+                # the user is thinking about the next word
+                interval += random.uniform(0.5, 2.5) * mean_interval * 4
+            now += interval
+        bursts.append(burst)
+        # the user is working with the touchpad
+        now += random.uniform(2, 30)
+    return bursts
+
+
+def load_trace(filename):
+    """
+    Load a trace from the given file.
+
+    Return a list of bursts, each of which is a list of key press times.
+    """
+    bursts = [[]]
+    with io.open(filename, encoding='utf-8') as stream:
+        for line in stream:
+            line = line.strip()
+            if line:
+                bursts[-1].append(float(line))
+            elif bursts[-1]:
+                bursts.append([])
+    return [burst for burst in bursts if burst]
+
+
+def replay(bursts, idle_time=None, percentile=None, reach_time=1.0):
+    """
+    Replay the given ``bursts`` through a :class:`KeyActivityFilter`.
+
+    Either ``idle_time`` is a fixed idle time, or ``percentile`` is the
+    percentile of the adaptive idle time.
+
+    Return a tuple ``(false_enable_rate, false_disable_rate,
+    final_idle_time)``.
+    """
+    activity_filter = KeyActivityFilter([])
+    estimator = None
+    if idle_time is not None:
+        activity_filter.idle_time = idle_time
+    else:
+        estimator = IdleTimeEstimator(percentile)
+        activity_filter.estimator = estimator
+    false_enables = intervals = false_disables = 0
+    for burst in bursts:
+        for index, now in enumerate(burst):
+            if index > 0:
+                intervals += 1
+                if activity_filter.check_idle(now):
+                    false_enables += 1
+            activity_filter.key_pressed(KEYCODE, now)
+            activity_filter.key_released(KEYCODE, now)
+        remaining = activity_filter.timeout(burst[-1])
+        if remaining > reach_time:
+            false_disables += 1
+        activity_filter.check_idle(burst[-1] + remaining)
+    final_idle_time = idle_time
+    if estimator is not None:
+        final_idle_time = estimator.estimate()
+    return (false_enables / max(intervals, 1),
+            false_disables / max(len(bursts), 1), final_idle_time)
+
+
+def evaluate(name, bursts, reach_time):
+    print('{0}: {1} key presses in {2} bursts'.format(
+        name, sum(len(b) for b in bursts), len(bursts)))
+    print('{0:<20} {1:>14} {2:>15} {3:>10}'.format(
+        '', 'false enables', 'false disables', 'idle time'))
+    strategies = [('fixed {0:.2f} s'.format(t), dict(idle_time=t))
+                  for t in IDLE_TIMES]
+    strategies.extend(('adaptive p{0:g}'.format(p * 100),
+                       dict(percentile=p)) for p in PERCENTILES)
+    for label, kwargs in strategies:
+        false_enable_rate, false_disable_rate, idle_time = replay(
+            bursts, reach_time=reach_time, **kwargs)
+        print('{0:<20} {1:>13.2%} {2:>14.2%} {3:>10}'.format(
+            label, false_enable_rate, false_disable_rate,
+            '-' if idle_time is None else '{0:.2f} s'.format(idle_time)))
+    print()
+
+
+def main():
+    parser = ArgumentParser(description='Evaluate idle times of keyboard '
+                            'monitors against key timing traces')
+    parser.add_argument('--reach-time', type=float, default=1.0,
+                        help='Time from the last key press until the user '
+                        'uses the touchpad in seconds (default: 1.0)')
+    parser.add_argument('traces', nargs='*', help='Key timing traces')
+    args = parser.parse_args()
+    if args.traces:
+        for filename in args.traces:
+            evaluate(filename, load_trace(filename), args.reach_time)
+    else:
+        for name, mean_interval in sorted(TYPISTS.items()):
+            evaluate('simulated {0} typist'.format(name),
+                     simulate_typing(mean_interval), args.reach_time)
+
+
+if __name__ == '__main__':
+    main()
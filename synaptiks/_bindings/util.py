@@ -41,6 +41,54 @@ from ctypes.util import find_library
 from contextlib import contextmanager
 
 
+#: Maps generic library names to the sonames of these libraries on Linux.
+#: :func:`load_library` tries these sonames first, because
+#: :func:`ctypes.util.find_library` is slow on Linux (it runs
+#: :program:`ldconfig` or even :program:`gcc` in a subprocess).
+SONAMES = {
+    'c': 'libc.so.6',
+    'X11': 'libX11.so.6',
+    'Xi': 'libXi.so.6',
+    'Xtst': 'libXtst.so.6',
+    'X11-xcb': 'libX11-xcb.so.1',
+    'xcb-xinput': 'libxcb-xinput.so.0',
+    }
+
+# maps generic library names to the names, which they were loaded with
+_library_names = {}
+
+
+def _open_library(name):
+    """
+    Open the C library with the given generic ``name``.
+
+    The name of a library, that was loaded before, is reused.  Otherwise the
+    soname from :data:`SONAMES` is tried, and :func:`ctypes.util.find_library`
+    is only used, if there is no soname, or if the library cannot be loaded
+    under this soname.
+
+    Return a :class:`ctypes.CDLL` wrapping the library.  Raise
+    :exc:`~exceptions.ImportError`, if the library was not found.
+    """
+    library_name = _library_names.get(name)
+    if library_name:
+        return CDLL(library_name)
+    soname = SONAMES.get(name)
+    if soname:
+        try:
+            library = CDLL(soname)
+            _library_names[name] = soname
+            return library
+        except OSError:
+            pass
+    library_name = find_library(name)
+    if not library_name:
+        raise ImportError('No library named {0}'.format(name))
+    library = CDLL(library_name)
+    _library_names[name] = library_name
+    return library
+
+
 def load_library(name, signatures=None):
     """
     Load the C library with the given ``name``.
@@ -50,13 +98,13 @@ def load_library(name, signatures=None):
     a dictionary with signatures of functions of the library, see
     :func:`add_foreign_signatures` for details.
 
+    Known libraries are loaded by their soname (see :data:`SONAMES`),
+    without the expensive :func:`ctypes.util.find_library`.
+
     Return a :class:`ctypes.CDLL` wrapping the library.  Raise
     :exc:`~exceptions.ImportError`, if the library was not found.
     """
-    library_name = find_library(name)
-    if not library_name:
-        raise ImportError('No library named {0}'.format(name))
-    library = CDLL(library_name)
+    library = _open_library(name)
     if signatures:
         library = add_foreign_signatures(library, signatures)
     return library
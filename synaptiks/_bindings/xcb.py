@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012, Sebastian Wiesner <lunaryorn@googlemail.com>
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+    synaptiks._bindings.xcb
+    =======================
+
+    Incomplete binding to libxcb and the XInput extension of libxcb atop of
+    :mod:`ctypes`.
+
+    Unlike the Xlib functions of libXi, which wait for the reply of each
+    request before returning, the xcb functions return a *cookie* immediately.
+    Many requests can thus be sent to the server, before waiting for the first
+    reply, which saves a round trip per request.  xcb functions work on the
+    xcb connection underlying an Xlib display, see :func:`get_connection`.
+
+    This module raises :exc:`~exceptions.ImportError`, if any of the required
+    libraries is not available.
+
+    .. moduleauthor::  Sebastian Wiesner  <lunaryorn@googlemail.com>
+"""
+
+from __future__ import (print_function, division, unicode_literals,
+                        absolute_import)
+
+from ctypes import (POINTER, Structure, byref, string_at, c_void_p, c_uint,
+                    c_uint8, c_uint16, c_uint32)
+
+from synaptiks._bindings import xlib
+from synaptiks._bindings.util import load_library
+
+
+class Connection(Structure):
+    pass
+
+Connection_p = POINTER(Connection)
+
+Atom = c_uint32
+Atom_p = POINTER(Atom)
+DeviceId = c_uint16
+
+
+class GenericError(Structure):
+    _fields_ = [
+        ('response_type', c_uint8),
+        ('error_code', c_uint8),
+        ('sequence', c_uint16),
+        ('resource_id', c_uint32),
+        ('minor_code', c_uint16),
+        ('major_code', c_uint8),
+        ('pad0', c_uint8),
+        ('pad', c_uint32 * 5),
+        ('full_sequence', c_uint32)]
+
+GenericError_p = POINTER(GenericError)
+
+
+class XIGetPropertyCookie(Structure):
+    _fields_ = [('sequence', c_uint)]
+
+
+class XIGetPropertyReply(Structure):
+    _fields_ = [
+        ('response_type', c_uint8),
+        ('pad0', c_uint8),
+        ('sequence', c_uint16),
+        ('length', c_uint32),
+        ('type', Atom),
+        ('bytes_after', c_uint32),
+        ('num_items', c_uint32),
+        ('format', c_uint8),
+        ('pad1', c_uint8 * 11)]
+
+XIGetPropertyReply_p = POINTER(XIGetPropertyReply)
+
+
+class XIListPropertiesCookie(Structure):
+    _fields_ = [('sequence', c_uint)]
+
+
+class XIListPropertiesReply(Structure):
+    _fields_ = [
+        ('response_type', c_uint8),
+        ('pad0', c_uint8),
+        ('sequence', c_uint16),
+        ('length', c_uint32),
+        ('num_properties', c_uint16),
+        ('pad1', c_uint8 * 22)]
+
+XIListPropertiesReply_p = POINTER(XIListPropertiesReply)
+
+
+SIGNATURES = dict(
+    xcb_input_xi_get_property=(
+        [Connection_p, DeviceId, c_uint8, Atom, Atom, c_uint32, c_uint32],
+        XIGetPropertyCookie),
+    xcb_input_xi_get_property_reply=(
+        [Connection_p, XIGetPropertyCookie, POINTER(GenericError_p)],
+        XIGetPropertyReply_p),
+    xcb_input_xi_get_property_items=([XIGetPropertyReply_p], c_void_p),
+    xcb_input_xi_list_properties=(
+        [Connection_p, DeviceId], XIListPropertiesCookie),
+    xcb_input_xi_list_properties_reply=(
+        [Connection_p, XIListPropertiesCookie, POINTER(GenericError_p)],
+        XIListPropertiesReply_p),
+    xcb_input_xi_list_properties_properties=(
+        [XIListPropertiesReply_p], Atom_p),
+    )
+
+
+libxcb_xinput = load_library('xcb-xinput', SIGNATURES)
+
+libX11_xcb = load_library('X11-xcb', dict(
+    XGetXCBConnection=([xlib.Display_p], Connection_p)))
+
+libc = load_library('c', dict(free=([c_void_p], None)))
+
+
+#: The maximum length of property data requested by
+#: :func:`xi_get_property`, in units of four bytes.  Properties of input
+#: devices are never that large, so a single request always returns the whole
+#: property.
+MAX_PROPERTY_LENGTH = 1 << 24
+
+
+get_connection = libX11_xcb.XGetXCBConnection
+
+
+def free(ptr):
+    """
+    Free the given pointer using ``free()`` from the C library.
+
+    xcb allocates replies and errors with ``malloc()``, so they must *not* be
+    freed with :func:`~synaptiks._bindings.xlib.free`.  Like
+    :func:`~synaptiks._bindings.xlib.free` this function is safe for use with
+    a ``NULL`` pointer.
+    """
+    if ptr:
+        libc.free(ptr)
+
+
+def xi_get_property(connection, deviceid, property,
+                    type=xlib.NONE, length=MAX_PROPERTY_LENGTH):
+    """
+    Send a request for the given ``property`` of the device with the given
+    id, but do *not* wait for the reply.
+
+    ``connection`` is a :class:`Connection_p`, ``deviceid`` an integer with a
+    device id.  ``property`` is the atom of the property to get.  ``type`` is
+    the expected type atom of the property, the default matches any type.
+    ``length`` is the maximum length of the data to get, in units of four
+    bytes.
+
+    Return a :class:`XIGetPropertyCookie`, which is to be passed to
+    :func:`xi_get_property_reply` to get the reply.
+    """
+    return libxcb_xinput.xcb_input_xi_get_property(
+        connection, deviceid, False, property, type, 0, length)
+
+
+def xi_get_property_reply(connection, cookie):
+    """
+    Wait for the reply to the request identified by the given ``cookie``.
+
+    ``connection`` is a :class:`Connection_p`, ``cookie`` is a
+    :class:`XIGetPropertyCookie` as returned by :func:`xi_get_property`.
+
+    Return a tuple ``(type, format, bytes_after, data)``.  ``type`` is the
+    type atom of the property, ``format`` the format (``8``, ``16`` or
+    ``32``) as integer, ``bytes_after`` the number of bytes of the property,
+    which were not returned, and ``data`` the property contents as byte
+    string.  If the property does not exist, ``type`` is
+    :data:`~synaptiks._bindings.xlib.NONE` and ``format`` is ``0``.
+
+    Raise :exc:`~exceptions.EnvironmentError`, if the server returned an
+    error for the request (e.g. because the device does not exist).
+    """
+    error = GenericError_p()
+    reply = libxcb_xinput.xcb_input_xi_get_property_reply(
+        connection, cookie, byref(error))
+    try:
+        if error or not reply:
+            error_code = error.contents.error_code if error else None
+            raise EnvironmentError(
+                'XIGetProperty failed with error {0}'.format(error_code))
+        reply_contents = reply.contents
+        format = reply_contents.format
+        byte_length = reply_contents.num_items * format // 8
+        data = string_at(libxcb_xinput.xcb_input_xi_get_property_items(reply),
+                         byte_length)
+        return (reply_contents.type, format, reply_contents.bytes_after, data)
+    finally:
+        free(error)
+        free(reply)
+
+
+def xi_list_properties(connection, deviceid):
+    """
+    Send a request for the list of properties of the device with the given
+    id, but do *not* wait for the reply.
+
+    ``connection`` is a :class:`Connection_p`, ``deviceid`` an integer with a
+    device id.
+
+    Return a :class:`XIListPropertiesCookie`, which is to be passed to
+    :func:`xi_list_properties_reply` to get the reply.
+    """
+    return libxcb_xinput.xcb_input_xi_list_properties(connection, deviceid)
+
+
+def xi_list_properties_reply(connection, cookie):
+    """
+    Wait for the reply to the request identified by the given ``cookie``.
+
+    ``connection`` is a :class:`Connection_p`, ``cookie`` is a
+    :class:`XIListPropertiesCookie` as returned by :func:`xi_list_properties`.
+
+    Return a list with the integral atoms of all properties of the device.
+
+    Raise :exc:`~exceptions.EnvironmentError`, if the server returned an
+    error for the request (e.g. because the device does not exist).
+    """
+    error = GenericError_p()
+    reply = libxcb_xinput.xcb_input_xi_list_properties_reply(
+        connection, cookie, byref(error))
+    try:
+        if error or not reply:
+            error_code = error.contents.error_code if error else None
+            raise EnvironmentError(
+                'XIListProperties failed with error {0}'.format(error_code))
+        properties = libxcb_xinput.xcb_input_xi_list_properties_properties(
+            reply)
+        return properties[:reply.contents.num_properties]
+    finally:
+        free(error)
+        free(reply)
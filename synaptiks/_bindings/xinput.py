@@ -37,11 +37,17 @@ from __future__ import (print_function, division, unicode_literals,
                         absolute_import)
 
 from ctypes import (POINTER, Structure, byref, string_at, cast,
-                    c_int, c_char_p, c_long, c_ulong, c_byte)
+                    c_int, c_char_p, c_long, c_ulong, c_byte, c_ubyte,
+                    c_double)
 
 from synaptiks._bindings import xlib
 from synaptiks._bindings.util import load_library, scoped_pointer
 
+try:
+    from synaptiks._bindings import xcb
+except ImportError:
+    xcb = None
+
 
 c_int_p = POINTER(c_int)
 c_ulong_p = POINTER(c_ulong)
@@ -51,12 +57,68 @@ c_byte_p = POINTER(c_byte)
 # XInput types
 
 class XIAnyClassInfo(Structure):
-    pass
+    _fields_ = [
+        ('type', c_int),
+        ('sourceid', c_int)]
 
 
 XIAnyClassInfo_p = POINTER(XIAnyClassInfo)
 
 
+class XIButtonState(Structure):
+    _fields_ = [
+        ('mask_len', c_int),
+        ('mask', POINTER(c_ubyte))]
+
+
+class XIButtonClassInfo(Structure):
+    _fields_ = [
+        ('type', c_int),
+        ('sourceid', c_int),
+        ('num_buttons', c_int),
+        ('labels', xlib.Atom_p),
+        ('state', XIButtonState)]
+
+
+class XIKeyClassInfo(Structure):
+    _fields_ = [
+        ('type', c_int),
+        ('sourceid', c_int),
+        ('num_keycodes', c_int),
+        ('keycodes', c_int_p)]
+
+
+class XIValuatorClassInfo(Structure):
+    _fields_ = [
+        ('type', c_int),
+        ('sourceid', c_int),
+        ('number', c_int),
+        ('label', xlib.Atom),
+        ('min', c_double),
+        ('max', c_double),
+        ('value', c_double),
+        ('resolution', c_int),
+        ('mode', c_int)]
+
+
+class XIScrollClassInfo(Structure):
+    _fields_ = [
+        ('type', c_int),
+        ('sourceid', c_int),
+        ('number', c_int),
+        ('scroll_type', c_int),
+        ('increment', c_double),
+        ('flags', c_int)]
+
+
+class XITouchClassInfo(Structure):
+    _fields_ = [
+        ('type', c_int),
+        ('sourceid', c_int),
+        ('mode', c_int),
+        ('num_touches', c_int)]
+
+
 class XIDeviceInfo(Structure):
     _fields_ = [
         ('deviceid', c_int),
@@ -70,10 +132,142 @@ class XIDeviceInfo(Structure):
 
 XIDeviceInfo_p = POINTER(XIDeviceInfo)
 
+class XIEventMask(Structure):
+    _fields_ = [
+        ('deviceid', c_int),
+        ('mask_len', c_int),
+        ('mask', POINTER(c_ubyte))]
+
+
+XIEventMask_p = POINTER(XIEventMask)
+
+
+class XIHierarchyInfo(Structure):
+    _fields_ = [
+        ('deviceid', c_int),
+        ('attachment', c_int),
+        ('use', c_int),
+        ('enabled', xlib.Bool),
+        ('flags', c_int)]
+
+
+class XIHierarchyEvent(Structure):
+    _fields_ = [
+        ('type', c_int),
+        ('serial', c_ulong),
+        ('send_event', xlib.Bool),
+        ('display', xlib.Display_p),
+        ('extension', c_int),
+        ('evtype', c_int),
+        ('time', xlib.Time),
+        ('flags', c_int),
+        ('num_info', c_int),
+        ('info', POINTER(XIHierarchyInfo))]
+
+
+XIHierarchyEvent_p = POINTER(XIHierarchyEvent)
+
+
+class XIPropertyEvent(Structure):
+    _fields_ = [
+        ('type', c_int),
+        ('serial', c_ulong),
+        ('send_event', xlib.Bool),
+        ('display', xlib.Display_p),
+        ('extension', c_int),
+        ('evtype', c_int),
+        ('time', xlib.Time),
+        ('deviceid', c_int),
+        ('property', xlib.Atom),
+        ('what', c_int)]
+
+
+XIPropertyEvent_p = POINTER(XIPropertyEvent)
+
+
+class XIValuatorState(Structure):
+    _fields_ = [
+        ('mask_len', c_int),
+        ('mask', POINTER(c_ubyte)),
+        ('values', POINTER(c_double))]
+
+
+class XIRawEvent(Structure):
+    _fields_ = [
+        ('type', c_int),
+        ('serial', c_ulong),
+        ('send_event', xlib.Bool),
+        ('display', xlib.Display_p),
+        ('extension', c_int),
+        ('evtype', c_int),
+        ('time', xlib.Time),
+        ('deviceid', c_int),
+        ('sourceid', c_int),
+        ('detail', c_int),
+        ('flags', c_int),
+        ('valuators', XIValuatorState),
+        ('raw_values', POINTER(c_double))]
+
+
+XIRawEvent_p = POINTER(XIRawEvent)
+
 # Misc constants
 PROP_MODE_REPLACE = 0
 ANY_PROPERTY_TYPE = 0
 
+# Device class types
+#: Keys of a device (:class:`XIKeyClassInfo`)
+KEY_CLASS = 0
+#: Buttons of a device (:class:`XIButtonClassInfo`)
+BUTTON_CLASS = 1
+#: An axis of a device (:class:`XIValuatorClassInfo`)
+VALUATOR_CLASS = 2
+#: A scrolling axis of a device (:class:`XIScrollClassInfo`, XI 2.1)
+SCROLL_CLASS = 3
+#: Touch capabilities of a device (:class:`XITouchClassInfo`, XI 2.2)
+TOUCH_CLASS = 8
+
+#: Maps device class types to the corresponding structures
+CLASS_INFO_TYPES = {
+    KEY_CLASS: XIKeyClassInfo,
+    BUTTON_CLASS: XIButtonClassInfo,
+    VALUATOR_CLASS: XIValuatorClassInfo,
+    SCROLL_CLASS: XIScrollClassInfo,
+    TOUCH_CLASS: XITouchClassInfo,
+    }
+
+# Event types
+#: The device hierarchy changed (:class:`XIHierarchyEvent`)
+HIERARCHY_CHANGED = 11
+#: A device property was created, modified or deleted
+#: (:class:`XIPropertyEvent`)
+PROPERTY_EVENT = 12
+#: A key was pressed, reported before any grab or focus processing
+#: (:class:`XIRawEvent`)
+RAW_KEY_PRESS = 13
+#: A key was released, reported before any grab or focus processing
+#: (:class:`XIRawEvent`)
+RAW_KEY_RELEASE = 14
+
+#: Flag in :attr:`XIRawEvent.flags`, which marks a :data:`RAW_KEY_PRESS`
+#: as generated by keyboard autorepeat
+KEY_REPEAT = 1 << 16
+
+# Hierarchy change flags for XIHierarchyInfo.flags and XIHierarchyEvent.flags
+MASTER_ADDED = 1 << 0
+MASTER_REMOVED = 1 << 1
+SLAVE_ADDED = 1 << 2
+SLAVE_REMOVED = 1 << 3
+SLAVE_ATTACHED = 1 << 4
+SLAVE_DETACHED = 1 << 5
+DEVICE_ENABLED = 1 << 6
+DEVICE_DISABLED = 1 << 7
+
+# Values of XIPropertyEvent.what
+PROPERTY_DELETED = 0
+PROPERTY_CREATED = 1
+PROPERTY_MODIFIED = 2
+
 # Special device IDs
 #: Device id for all devices
 ALL_DEVICES = 0
@@ -117,6 +311,9 @@ SIGNATURES = dict(
                     c_ulong_p, c_ulong_p, POINTER(c_byte_p)], xlib.Status),
     XIChangeProperty=([xlib.Display_p, c_int, xlib.Atom, xlib.Atom,
                        c_int, c_int, c_byte_p, c_int], None),
+    XIDeleteProperty=([xlib.Display_p, c_int, xlib.Atom], None),
+    XISelectEvents=([xlib.Display_p, xlib.Window, XIEventMask_p, c_int],
+                    xlib.Status),
     )
 
 
@@ -134,9 +331,10 @@ def query_version(display, expected_version):
     expected version.  Both components are integers.
 
     Return a tuple ``(matched, actual_version)``.  ``matched`` is ``True``,
-    if the server-side version is at least the ``expected_version``,
-    ``False`` otherwise.  ``actual_version`` is a ``(major, minor)`` tuple
-    containing the actual version on the server side.
+    if the server supports XInput 2, ``False`` otherwise.
+    ``actual_version`` is a ``(major, minor)`` tuple containing the version
+    used on this connection, which is the lower of ``expected_version`` and
+    the server-side version.
     """
     major, minor = map(c_int, expected_version)
     state = libXi.XIQueryVersion(display, byref(major), byref(minor))
@@ -197,6 +395,92 @@ def list_properties(display, deviceid):
     return (number_of_properties.value, property_atoms)
 
 
+def list_device_properties(display, deviceids):
+    """
+    Query the properties of all devices with the given ids.
+
+    This is equivalent to calling :func:`list_properties` for each of the
+    given devices, but much faster, because all requests are sent to the
+    server at once, if the xcb binding (see :mod:`~synaptiks._bindings.xcb`)
+    is available.
+
+    ``display`` is a :class:`~synaptiks._bindings.xlib.Display_p` providing the
+    server connection, ``deviceids`` is a sequence of integral device ids.
+
+    Return a list with a list of the integral property atoms of each device,
+    in the order of ``deviceids``.  The list of a device, which does not
+    exist (anymore), is empty.
+    """
+    if not xcb:
+        result = []
+        for deviceid in deviceids:
+            number_of_properties, property_atoms = list_properties(
+                display, deviceid)
+            with scoped_pointer(property_atoms, xlib.free):
+                result.append(property_atoms[:number_of_properties])
+        return result
+    connection = xcb.get_connection(display)
+    cookies = [xcb.xi_list_properties(connection, d) for d in deviceids]
+    result = []
+    for cookie in cookies:
+        try:
+            result.append(xcb.xi_list_properties_reply(connection, cookie))
+        except EnvironmentError:
+            # the device vanished in the meantime
+            result.append([])
+    return result
+
+
+#: The length of property data initially requested by :func:`get_property`
+#: in units of four bytes, if the size of the property is not yet known.
+DEFAULT_PROPERTY_LENGTH = 16
+
+# maps (deviceid, property) pairs to the length of the property in units of
+# four bytes, as seen by the last call to get_property.
+_property_length_hints = {}
+
+
+def _atom_value(atom):
+    """
+    Return the integral value of the given ``atom``.
+
+    ``atom`` is either an integer, a :class:`~synaptiks._bindings.xlib.Atom`
+    or any object with an ``_as_parameter_`` attribute.
+    """
+    atom = getattr(atom, '_as_parameter_', atom)
+    return getattr(atom, 'value', atom)
+
+
+def _get_property_data(display, deviceid, property, length):
+    """
+    Get at most ``length`` units of four bytes of the given ``property``
+    from the device with the given id.
+
+    Return a tuple ``(type, format, bytes_after, data)``.  ``bytes_after`` is
+    the number of bytes of the property, which did not fit into ``length``.
+    See :func:`get_property` for the other items.
+    """
+    type_return = xlib.Atom(0)
+    format_return = c_int(0)
+    num_items_return = c_ulong(0)
+    bytes_after_return = c_ulong(0)
+    data = c_byte_p()
+
+    state = libXi.XIGetProperty(
+        display, deviceid, property, 0, length, False,
+        ANY_PROPERTY_TYPE, byref(type_return), byref(format_return),
+        byref(num_items_return), byref(bytes_after_return), byref(data))
+
+    with scoped_pointer(data, xlib.free):
+        if state != xlib.SUCCESS:
+            # XXX: better diagnostics
+            raise EnvironmentError()
+        format = format_return.value
+        byte_length = num_items_return.value * format // 8
+        return (type_return.value, format, bytes_after_return.value,
+                string_at(data, byte_length))
+
+
 def get_property(display, deviceid, property):
     """
     Get the given ``property`` from the device with the given id.
@@ -206,6 +490,12 @@ def get_property(display, deviceid, property):
     ``property`` is a :class:`~synaptiks._bindings.xlib.Atom` with the X11 atom
     of the property to get.
 
+    The property is usually fetched with at most two requests.  The size of
+    the property is remembered, so that subsequent calls for the same
+    property of the same device usually need a single request only.  If the
+    property grows between two requests, it is fetched again, so that the
+    returned data is never truncated.
+
     Return a tuple ``(type, format, data)``.  ``type`` and ``format`` are
     integers, ``data`` is a byte string.  If the property exists on the
     device, ``type`` contains the type atom, ``format`` the format of the
@@ -214,33 +504,19 @@ def get_property(display, deviceid, property):
     :data:`~synaptiks._bindings.xlib.NONE` and ``format`` is ``0``.
     ``data`` contains an empty string.
     """
-    length = 1
-    while True:
-        type_return = xlib.Atom(0)
-        format_return = c_int(0)
-        num_items_return = c_ulong(0)
-        bytes_after_return = c_ulong(0)
-        data = c_byte_p()
-
-        state = libXi.XIGetProperty(
-            display, deviceid, property, 0, length, False,
-            ANY_PROPERTY_TYPE, byref(type_return), byref(format_return),
-            byref(num_items_return), byref(bytes_after_return), byref(data))
-
-        with scoped_pointer(data, xlib.free):
-            if state != xlib.SUCCESS:
-                # XXX: better diagnostics
-                raise EnvironmentError()
-            if bytes_after_return.value == 0:
-                # got all bytes now, handle them
-                format = format_return.value
-                type = type_return.value
-                number_of_items = num_items_return.value
-                byte_length = number_of_items * format // 8
-                return (type, format, string_at(data, byte_length))
-            else:
-                # get some more bytes and try again
-                length += 1
+    hint_key = (deviceid, _atom_value(property))
+    length = _property_length_hints.get(hint_key, DEFAULT_PROPERTY_LENGTH)
+    type, format, bytes_after, data = _get_property_data(
+        display, deviceid, property, length)
+    while bytes_after:
+        # the property is larger than expected, but now we know its exact
+        # size, so fetch all of it at once, unless it grew in the meantime
+        length = (len(data) + bytes_after + 3) // 4
+        type, format, bytes_after, data = _get_property_data(
+            display, deviceid, property, length)
+    if format:
+        _property_length_hints[hint_key] = max((len(data) + 3) // 4, 1)
+    return (type, format, data)
 
 
 def change_property(display, deviceid, property, type, format, data):
@@ -270,3 +546,76 @@ def change_property(display, deviceid, property, type, format, data):
     libXi.XIChangeProperty(
         display, deviceid, property, type, format, PROP_MODE_REPLACE,
         cast(c_char_p(data), c_byte_p), number_of_items)
+
+
+delete_property = libXi.XIDeleteProperty
+
+
+def select_events(display, window, deviceid, event_types):
+    """
+    Select XInput events on the given ``window``.
+
+    ``display`` is a :class:`~synaptiks._bindings.xlib.Display_p` providing the
+    server connection, ``window`` is a
+    :class:`~synaptiks._bindings.xlib.Window`.
+    ``deviceid`` is the id of the device to select events for, or a
+    :ref:`special ID <xinput-special-ids>`.  :data:`HIERARCHY_CHANGED` can
+    only be selected for :data:`ALL_DEVICES`.  ``event_types`` is a sequence of
+    XInput event types (e.g. :data:`PROPERTY_EVENT`).  Any previous
+    selection of the device on this window is replaced.  If ``event_types`` is
+    empty, all events are deselected.
+
+    Return a :class:`~synaptiks._bindings.xlib.Status`.
+    """
+    mask = (c_ubyte * (max(event_types or [0]) // 8 + 1))()
+    for event_type in event_types:
+        mask[event_type >> 3] |= 1 << (event_type & 7)
+    event_mask = XIEventMask(deviceid, len(mask), cast(mask, POINTER(c_ubyte)))
+    return libXi.XISelectEvents(display, window, byref(event_mask), 1)
+
+
+def get_properties(display, deviceid, properties):
+    """
+    Get all of the given ``properties`` from the device with the given id.
+
+    This is equivalent to calling :func:`get_property` for each of the given
+    properties, but much faster, because all requests are sent to the server
+    at once, before waiting for the first reply.  Consequently fetching any
+    number of properties costs the latency of a single round trip only.  If
+    the xcb binding (see :mod:`~synaptiks._bindings.xcb`) is not available,
+    this function falls back to :func:`get_property`.
+
+    ``display`` is a :class:`~synaptiks._bindings.xlib.Display_p` providing the
+    server connection, ``deviceid`` is an integer with a device id.
+    ``properties`` is a sequence of
+    :class:`~synaptiks._bindings.xlib.Atom` objects with the X11 atoms of the
+    properties to get.
+
+    Return a list of ``(type, format, data)`` tuples as returned by
+    :func:`get_property`, in the order of ``properties``.
+    """
+    if not xcb:
+        return [get_property(display, deviceid, p) for p in properties]
+    connection = xcb.get_connection(display)
+    cookies = [xcb.xi_get_property(connection, deviceid, p)
+               for p in properties]
+    # fetch *all* replies, even if some of them fail, because xcb would
+    # otherwise keep the remaining replies around forever
+    results = []
+    error = None
+    for property, cookie in zip(properties, cookies):
+        try:
+            type, format, bytes_after, data = xcb.xi_get_property_reply(
+                connection, cookie)
+        except EnvironmentError as exc:
+            error = exc
+            continue
+        if bytes_after:
+            # the property is larger than anything ever seen on an input
+            # device, just fetch it the slow way
+            results.append(get_property(display, deviceid, property))
+        else:
+            results.append((type, format, data))
+    if error:
+        raise error
+    return results
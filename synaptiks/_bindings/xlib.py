@@ -38,9 +38,9 @@ from __future__ import (print_function, division, unicode_literals,
 
 from collections import namedtuple
 from itertools import islice, izip
-from ctypes import (Structure, POINTER, string_at, create_string_buffer,
-                    c_uint32, c_int, c_void_p, c_char_p, c_char, c_ubyte,
-                    c_ulong)
+from ctypes import (Structure, Union, POINTER, CFUNCTYPE, string_at,
+                    create_string_buffer, byref, c_uint32, c_int, c_uint,
+                    c_long, c_void_p, c_char_p, c_char, c_ubyte, c_ulong)
 
 from synaptiks._bindings.util import load_library, scoped_pointer
 
@@ -56,6 +56,7 @@ KeyCode = c_ubyte
 KeyCode_p = c_ubyte_p
 XPointer = c_char_p
 XID = c_uint32
+Window = c_ulong
 
 
 class Display(Structure):
@@ -72,6 +73,61 @@ class XModifierKeymap(Structure):
 
 XModifierKeymap_p = POINTER(XModifierKeymap)
 
+
+class XErrorEvent(Structure):
+    _fields_ = [
+        ('type', c_int),
+        ('display', Display_p),
+        ('resourceid', c_ulong),
+        ('serial', c_ulong),
+        ('error_code', c_ubyte),
+        ('request_code', c_ubyte),
+        ('minor_code', c_ubyte)
+        ]
+
+XErrorEvent_p = POINTER(XErrorEvent)
+
+XErrorHandler = CFUNCTYPE(c_int, Display_p, XErrorEvent_p)
+
+
+class XGenericEventCookie(Structure):
+    _fields_ = [
+        ('type', c_int),
+        ('serial', c_ulong),
+        ('send_event', Bool),
+        ('display', Display_p),
+        ('extension', c_int),
+        ('evtype', c_int),
+        ('cookie', c_uint),
+        ('data', c_void_p)
+        ]
+
+XGenericEventCookie_p = POINTER(XGenericEventCookie)
+
+
+class XMappingEvent(Structure):
+    _fields_ = [
+        ('type', c_int),
+        ('serial', c_ulong),
+        ('send_event', Bool),
+        ('display', Display_p),
+        ('window', Window),
+        ('request', c_int),
+        ('first_keycode', c_int),
+        ('count', c_int)
+        ]
+
+
+class XEvent(Union):
+    _fields_ = [
+        ('type', c_int),
+        ('xcookie', XGenericEventCookie),
+        ('xmapping', XMappingEvent),
+        ('pad', c_long * 24)
+        ]
+
+XEvent_p = POINTER(XEvent)
+
 # Some constants from the libX11 headers
 #: :class:`Status` value indicating a successful operation
 SUCCESS = 0
@@ -89,6 +145,18 @@ STRING = 31
 KEY_PRESS = 2
 #: type code for key release event
 KEY_RELEASE = 3
+#: type code for changes of the keyboard, modifier or pointer mapping
+MAPPING_NOTIFY = 34
+#: type code for generic events of extensions
+GENERIC_EVENT = 35
+
+# request codes of mapping events
+#: the modifier mapping changed
+MAPPING_MODIFIER = 0
+#: the keyboard mapping changed
+MAPPING_KEYBOARD = 1
+#: the pointer button mapping changed
+MAPPING_POINTER = 2
 
 
 def _convert_x11_char_p(c_string, function, args):
@@ -123,11 +191,26 @@ SIGNATURES = dict(
     XOpenDisplay=([c_char_p], Display_p),
     XCloseDisplay=([Display_p], c_int),
     XFlush=([Display_p], c_int),
+    XSync=([Display_p, Bool], c_int),
+    XSetErrorHandler=([XErrorHandler], XErrorHandler),
+    XGetErrorText=([Display_p, c_int, c_char_p, c_int], c_int),
     XInternAtom=([Display_p, c_char_p, Bool], Atom),
+    XInternAtoms=([Display_p, POINTER(c_char_p), c_int, Bool, Atom_p],
+                  Status),
     XGetAtomName=([Display_p, Atom], c_void_p, _convert_x11_char_p),
+    XGetAtomNames=([Display_p, Atom_p, c_int, POINTER(c_void_p)], Status),
     XQueryKeymap=([Display_p, c_char * 32], c_int),
     XGetModifierMapping=([Display_p], XModifierKeymap_p),
     XFreeModifiermap=([XModifierKeymap_p], c_int),
+    XDisplayString=([Display_p], c_char_p),
+    XConnectionNumber=([Display_p], c_int),
+    XDefaultRootWindow=([Display_p], Window),
+    XQueryExtension=([Display_p, c_char_p, POINTER(c_int), POINTER(c_int),
+                      POINTER(c_int)], Bool),
+    XPending=([Display_p], c_int),
+    XNextEvent=([Display_p, XEvent_p], c_int),
+    XGetEventData=([Display_p, XGenericEventCookie_p], Bool),
+    XFreeEventData=([Display_p, XGenericEventCookie_p], None),
     )
 
 
@@ -137,6 +220,8 @@ libX11 = load_library('X11', SIGNATURES)
 open_display = libX11.XOpenDisplay
 close_display = libX11.XCloseDisplay
 flush = libX11.XFlush
+sync = libX11.XSync
+set_error_handler = libX11.XSetErrorHandler
 
 
 # add libX11 functions to top-level namespace under pythonic names
@@ -152,13 +237,103 @@ def free(ptr):
 
 intern_atom = libX11.XInternAtom
 get_atom_name = libX11.XGetAtomName
+display_string = libX11.XDisplayString
+connection_number = libX11.XConnectionNumber
+default_root_window = libX11.XDefaultRootWindow
+pending = libX11.XPending
+next_event = libX11.XNextEvent
+get_event_data = libX11.XGetEventData
+free_event_data = libX11.XFreeEventData
+
+
+def query_extension(display, name):
+    """
+    Query the extension with the given ``name``.
+
+    ``display`` is a :class:`Display_p` providing the server connection,
+    ``name`` is a byte string with the name of the extension (e.g.
+    ``'XInputExtension'``).
+
+    Return a tuple ``(present, opcode, first_event, first_error)``.
+    ``present`` is ``True``, if the extension is present on the server.  The
+    other items are integers with the major opcode, the first event code and
+    the first error code of the extension.
+    """
+    opcode = c_int(0)
+    first_event = c_int(0)
+    first_error = c_int(0)
+    present = libX11.XQueryExtension(display, name, byref(opcode),
+                                     byref(first_event), byref(first_error))
+    return (bool(present), opcode.value, first_event.value, first_error.value)
+
+
+def intern_atoms(display, names, only_if_exists):
+    """
+    Get the atoms for all of the given ``names`` with a single request.
+
+    ``display`` is a :class:`Display_p` providing the server connection,
+    ``names`` is a sequence of byte strings with atom names.  If
+    ``only_if_exists`` is ``True``, atoms are only returned, if they already
+    exist, otherwise they are created as necessary.
+
+    Return a list with the integral atom for each name, in the order of
+    ``names``.  The atom of a name, which does not exist, is :data:`NONE`.
+    """
+    number_of_names = len(names)
+    if not number_of_names:
+        return []
+    atoms = (Atom * number_of_names)()
+    libX11.XInternAtoms(display, (c_char_p * number_of_names)(*names),
+                        number_of_names, only_if_exists, atoms)
+    return atoms[:]
+
+
+def get_atom_names(display, atoms):
+    """
+    Get the names of all of the given ``atoms`` with a single request.
+
+    ``display`` is a :class:`Display_p` providing the server connection,
+    ``atoms`` is a sequence of integral atoms.
+
+    Return a list with the name of each atom as byte string, in the order of
+    ``atoms``.  The name of an atom, which does not exist, is ``None``.
+    """
+    number_of_atoms = len(atoms)
+    if not number_of_atoms:
+        return []
+    names = (c_void_p * number_of_atoms)()
+    libX11.XGetAtomNames(display, (Atom * number_of_atoms)(*atoms),
+                         number_of_atoms, names)
+    result = []
+    for name in names:
+        with scoped_pointer(name, free):
+            result.append(string_at(name) if name else None)
+    return result
+
+
+def get_error_text(display, error_code):
+    """
+    Get a description of the given ``error_code``.
+
+    ``display`` is a :class:`Display_p` providing the server connection,
+    ``error_code`` is the integral error code of a protocol error.
+
+    Return the description as byte string.
+    """
+    buffer = create_string_buffer(256)
+    libX11.XGetErrorText(display, error_code, buffer, len(buffer))
+    return buffer.value
 
 
-def query_keymap(display):
+def query_keymap(display, buffer=None):
     """
     Query the current state of the keyboard.
 
     ``display`` is a :class:`Display_p` providing the server connection.
+    ``buffer`` is a buffer of 32 bytes as created by
+    :func:`~ctypes.create_string_buffer()`, to receive the keymap.  If
+    ``None``, a new buffer is created.  Pass a buffer to avoid allocations,
+    if the keymap is queried repeatedly.
 
     Return a tuple ``(state, keymap)``, where ``state`` is an integer with the
     error code of the underlying C function, and ``keymap`` is a byte string
@@ -166,7 +341,8 @@ def query_keymap(display):
     byte string corresponds to a single key.  If the key is currently pressed,
     the bit is set, otherwise it is unset.
     """
-    buffer = create_string_buffer(32)
+    if buffer is None:
+        buffer = create_string_buffer(32)
     state = libX11.XQueryKeymap(display, buffer)
     return state, buffer.raw
 
@@ -188,8 +364,7 @@ def get_modifier_mapping(display):
     modifier_map = libX11.XGetModifierMapping(display)
     with scoped_pointer(modifier_map, libX11.XFreeModifiermap):
         keys_per_modifier = modifier_map.contents.max_keypermod
-        keycodes = [modifier_map.contents.modifiermap[i]
-                    for i in xrange(8 * keys_per_modifier)]
+        keycodes = modifier_map.contents.modifiermap[:8 * keys_per_modifier]
         modifier_keys = izip(*[islice(keycodes, i, None, keys_per_modifier)
                                for i in xrange(keys_per_modifier)])
         return ModifierMap(*modifier_keys)
@@ -141,6 +141,10 @@ SIGNATURES = dict(
     XRecordFreeContext=([xlib.Display_p, XRecordContext], xlib.Status),
     XRecordEnableContext=([xlib.Display_p, XRecordContext,
                            XRecordInterceptProc, xlib.XPointer], xlib.Status),
+    XRecordEnableContextAsync=([xlib.Display_p, XRecordContext,
+                                XRecordInterceptProc, xlib.XPointer],
+                               xlib.Status),
+    XRecordProcessReplies=([xlib.Display_p], None),
     XRecordDisableContext=([xlib.Display_p, XRecordContext], xlib.Status),
     XRecordFreeData=([XRecordInterceptData_p], None),
     )
@@ -259,6 +263,28 @@ def enable_context(display, context, callback, closure_p):
         raise EnvironmentError('Could not enable the context')
 
 
+def enable_context_async(display, context, callback, closure_p):
+    """
+    Enable the given ``context`` on the given ``display`` without blocking.
+
+    The arguments are the same as for :func:`enable_context`.  Unlike
+    :func:`enable_context`, this function returns immediately.  The
+    ``callback`` is invoked from :func:`process_replies`, whenever recorded
+    data is available on ``display``.
+
+    Return the foreign callback object.  The caller must keep a reference to
+    this object, as long as the context is enabled.  Raise
+    :exc:`~exceptions.EnvironmentError`, if the context could not be enabled.
+    """
+    callback = XRecordInterceptProc(callback)
+    state = libXtst.XRecordEnableContextAsync(
+        display, context, callback, closure_p)
+    if state == 0:
+        raise EnvironmentError('Could not enable the context')
+    return callback
+
+
+process_replies = libXtst.XRecordProcessReplies
 disable_context = libXtst.XRecordDisableContext
 
 free_data = libXtst.XRecordFreeData
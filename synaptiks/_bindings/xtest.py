@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012, Sebastian Wiesner <lunaryorn@googlemail.com>
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+    synaptiks._bindings.xtest
+    =========================
+
+    Incomplete binding to the XTest extension atop of :mod:`ctypes`.
+
+    .. moduleauthor::  Sebastian Wiesner  <lunaryorn@googlemail.com>
+"""
+
+from __future__ import (print_function, division, unicode_literals,
+                        absolute_import)
+
+from ctypes import POINTER, byref, c_int, c_uint, c_ulong
+
+from synaptiks._bindings import xlib
+from synaptiks._bindings.util import load_library
+
+
+c_int_p = POINTER(c_int)
+
+#: Process a fake event immediately
+CURRENT_TIME = 0
+
+
+SIGNATURES = dict(
+    XTestQueryExtension=([xlib.Display_p, c_int_p, c_int_p, c_int_p, c_int_p],
+                         xlib.Bool),
+    XTestFakeKeyEvent=([xlib.Display_p, c_uint, xlib.Bool, c_ulong],
+                       c_int),
+    )
+
+libXtst = load_library('Xtst', SIGNATURES)
+
+
+def query_extension(display):
+    """
+    Query the XTest extension on the given ``display``.
+
+    ``display`` is an X11 display connection
+    (e.g. :class:`~synaptiks._bindings.xlib.Display_p`).
+
+    Return a tuple ``(success, version)``.  ``success`` is a boolean flag
+    indicating, whether XTest is available on the given display.
+    ``version`` is a tuple ``(major, minor)`` of integers.
+    """
+    event_base = c_int()
+    error_base = c_int()
+    major = c_int()
+    minor = c_int()
+    success = libXtst.XTestQueryExtension(
+        display, byref(event_base), byref(error_base), byref(major),
+        byref(minor))
+    return bool(success), (major.value, minor.value)
+
+
+def fake_key_event(display, keycode, is_press, delay=CURRENT_TIME):
+    """
+    Fake a key event on the XTest keyboard of the given ``display``.
+
+    ``keycode`` is the X11 keycode of the key.  If ``is_press`` is ``True``,
+    the key is pressed, otherwise it is released.  ``delay`` is the delay in
+    milliseconds, after which the server processes the event.  The request
+    is only queued, flush the ``display`` to send it.
+
+    Return a :class:`~synaptiks._bindings.xlib.Status`.
+    """
+    return libXtst.XTestFakeKeyEvent(display, keycode, is_press, delay)
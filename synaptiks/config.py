@@ -80,9 +80,9 @@
     .. program:: synaptikscfg
 
     This module is usable as script, available also as :program:`synaptikscfg`
-    in the ``$PATH``.  It provides three different actions, of which ``load``
-    and ``save`` are really self-explanatory. ``init`` however deserves some
-    detailled explanation.
+    in the ``$PATH``.  It provides the actions ``load``, ``save``, ``get``
+    and ``set``, which are really self-explanatory, and ``init`` and
+    ``serve``, which deserve some detailled explanation.
 
     The `init` action is supposed to run automatically as script during session
     startup.  To do this, the installation script installs an autostart entry
@@ -91,6 +91,12 @@
     the default settings from the touchpad driver as described above, and then
     loads and applies the actual touchpad configuration stored on disk.
 
+    The ``serve`` action keeps running, and executes the requests of all
+    other invocations of :program:`synaptikscfg` over a Unix socket, with an
+    open display connection and a cached touchpad (see
+    :mod:`synaptiks.daemon`).  If no server is running, or if ``--no-server``
+    is given, actions are executed in the invoking process.
+
     The command line parsing of the script is implemented with :mod:`argparse`,
     so you can expected standard semantics, and an extensive ``--help`` option.
 
@@ -151,6 +157,15 @@ def get_management_config_file_path():
     return os.path.join(get_configuration_directory(), 'management.json')
 
 
+def get_touchpad_discovery_cache_path():
+    """
+    Get the path to the file which remembers the touchpad device found on
+    the last start (see :meth:`~synaptiks.touchpad.Touchpad.find_first`).
+    """
+    return os.path.join(get_configuration_directory(),
+                        'touchpad-discovery.json')
+
+
 def get_touchpad_defaults(filename=None):
     """
     Get the default touchpad settings as :func:`dict` *without* applying it to
@@ -256,6 +271,44 @@ class TouchpadConfiguration(MutableMapping):
             raise KeyError(key)
         setattr(self.touchpad, key, value)
 
+    def update(self, *args, **kwargs):
+        """
+        Update the configuration from a mapping or an iterable of key-value
+        pairs, and from keyword arguments, like :meth:`dict.update`.
+
+        Unlike the generic implementation of
+        :class:`~collections.MutableMapping` this method does not set every
+        given key individually.  Instead the current values of all given
+        keys are read at once with
+        :meth:`~synaptiks.touchpad.Touchpad.read_all()`, and only
+        those settings, which actually differ from the given values, are
+        written to the touchpad with a single
+        :meth:`~synaptiks.touchpad.Touchpad.apply()`.
+
+        Raise :exc:`~exceptions.KeyError`, if any key is not a configuration
+        key.  In this case, nothing is changed.
+
+        Return a :func:`frozenset` with the keys of all changed settings.
+        """
+        target = dict(*args, **kwargs)
+        if not target:
+            return frozenset()
+        for key in target:
+            if key not in self:
+                raise KeyError(key)
+        current = self.touchpad.read_all(target)
+        changed = {}
+        for key, value in target.iteritems():
+            current_value = current[key]
+            if isinstance(current_value, float):
+                # compare floats as rounded by __getitem__
+                current_value = round(current_value, 5)
+            if current_value != value:
+                changed[key] = value
+        if changed:
+            self.touchpad.apply(changed)
+        return frozenset(changed)
+
     def __delitem__(self, key):
         default = self.defaults.get(key)
         if default is not None:
@@ -294,12 +347,18 @@ class ManagerConfiguration(MutableMapping):
     #: A mapping with the default values for all configuration keys
     _DEFAULTS = {'monitor_mouses': False, 'ignored_mouses': [],
                 'monitor_keyboard': False, 'idle_time': 2.0,
-                'keys_to_ignore': 2}
+                'keys_to_ignore': 2, 'adaptive_idle_time': False,
+                'idle_time_percentile': 0.95, 'idle_time_histogram': [],
+                'ignored_keyboards': []}
 
     #: config keys to be applied to the mouse_manager
     MOUSE_MANAGER_KEYS = frozenset(['ignored_mouses'])
     #: config keys to be applied to the keyboard monitor
-    KEYBOARD_MONITOR_KEYS = frozenset(['idle_time', 'keys_to_ignore'])
+    KEYBOARD_MONITOR_KEYS = frozenset(['idle_time', 'keys_to_ignore',
+                                       'adaptive_idle_time',
+                                       'idle_time_percentile',
+                                       'idle_time_histogram',
+                                       'ignored_keyboards'])
 
     @classmethod
     def load(cls, touchpad_manager, filename=None):
@@ -410,11 +469,13 @@ class ManagerConfiguration(MutableMapping):
 
 
 def main():
+    import json
+    import errno
+    import socket
     from argparse import ArgumentParser
 
     from synaptiks import __version__
-    from synaptiks.x11 import Display, DisplayError
-    from synaptiks.touchpad import Touchpad, NoTouchpadError
+    from synaptiks import daemon
 
     parser = ArgumentParser(
         description='synaptiks touchpad configuration utility',
@@ -423,6 +484,8 @@ Copyright (C) 2010 Sebastian Wiesner <lunaryorn@googlemail.com>,
 distributed under the terms of the BSD License""")
     parser.add_argument('--version', help='Show synaptiks version',
                         action='version', version=__version__)
+    parser.add_argument('--no-server', help='Do not use a running '
+                        'configuration server', action='store_true')
     actions = parser.add_subparsers(title='Actions')
 
     init_act = actions.add_parser(
@@ -444,6 +507,25 @@ distributed under the terms of the BSD License""")
         'empty, the default configuration file is used.')
     save_act.set_defaults(action='save')
 
+    get_act = actions.add_parser(
+        'get', help='Print the current touchpad configuration')
+    get_act.add_argument(
+        'keys', nargs='*', help='Configuration keys to print.  If empty, '
+        'all keys are printed.')
+    get_act.set_defaults(action='get')
+
+    set_act = actions.add_parser(
+        'set', help='Change a single touchpad setting')
+    set_act.add_argument('key', help='The configuration key to change')
+    set_act.add_argument('value', type=json.loads,
+                         help='The new value in JSON format')
+    set_act.set_defaults(action='set')
+
+    serve_act = actions.add_parser(
+        'serve', help='Serve requests of this utility from a single process, '
+        'which keeps the touchpad connection open.')
+    serve_act.set_defaults(action='serve')
+
     # default filename to load configuration from
     parser.set_defaults(filename=None)
 
@@ -451,22 +533,62 @@ distributed under the terms of the BSD License""")
     # arguments (--help mainly) are handled
     args = parser.parse_args()
 
-    try:
-        with Display.from_name() as display:
-            touchpad = Touchpad.find_first(display)
-
-            if args.action == 'init':
-                driver_defaults = TouchpadConfiguration(touchpad)
-                driver_defaults.save(get_touchpad_defaults_file_path())
-            if args.action in ('init', 'load'):
-                TouchpadConfiguration.load(touchpad, filename=args.filename)
-            if args.action == 'save':
-                current_config = TouchpadConfiguration(touchpad)
-                current_config.save(filename=args.filename)
-    except DisplayError:
-        parser.error('could not connect to X11 display')
-    except NoTouchpadError:
-        parser.error('no touchpad found')
+    if args.action == 'serve':
+        from synaptiks.x11 import Display, DisplayError
+        try:
+            with Display.from_name() as display:
+                service = daemon.ConfigurationService(
+                    display, cache_properties=True)
+                server = daemon.ConfigurationServer(service)
+                try:
+                    server.serve()
+                except KeyboardInterrupt:
+                    pass
+                finally:
+                    server.server_close()
+        except DisplayError:
+            parser.error('could not connect to X11 display')
+        except EnvironmentError as error:
+            parser.error('could not serve: {0}'.format(error))
+        return
+
+    request = dict(command=args.action)
+    if args.action in ('load', 'save'):
+        # the server resolves relative paths in its own working directory
+        request['filename'] = (os.path.abspath(args.filename)
+                               if args.filename else None)
+    elif args.action == 'get':
+        request['keys'] = args.keys or None
+    elif args.action == 'set':
+        request.update(key=args.key, value=args.value)
+
+    response = None
+    if not args.no_server:
+        try:
+            response = daemon.send_request(request)
+        except socket.timeout:
+            # the server may have executed the request nonetheless, so it
+            # must not be executed again
+            parser.error('configuration server did not respond')
+        except socket.error as error:
+            if error.errno not in (errno.ENOENT, errno.ECONNREFUSED):
+                parser.error('configuration server failed: {0}'.format(
+                    error))
+            # no server running, execute the request in this process
+    if response is None:
+        # the X11 bindings are only loaded, if there is no server
+        from synaptiks.x11 import Display, DisplayError
+        try:
+            with Display.from_name() as display:
+                service = daemon.ConfigurationService(display)
+                response = service.execute(request)
+        except DisplayError:
+            parser.error('could not connect to X11 display')
+
+    if 'error' in response:
+        parser.error(response['error'])
+    if args.action == 'get':
+        print(json.dumps(response['result'], indent=2, sort_keys=True))
 
 
 if __name__ == '__main__':
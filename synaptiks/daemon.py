@@ -0,0 +1,432 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012, Sebastian Wiesner <lunaryorn@googlemail.com>
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+
+"""
+    synaptiks.daemon
+    ================
+
+    A configuration service, which keeps the display connection, the touchpad
+    and its property cache alive between calls of :program:`synaptikscfg`.
+
+    :program:`synaptikscfg serve` runs a :class:`ConfigurationServer` on a
+    per-user Unix socket (see :func:`get_socket_path()`).  Clients send a
+    single request as JSON object on a single line per connection, and
+    receive a JSON object in return.  Connections are handled one after
+    another, and dropped, if the request does not arrive within two seconds.
+    Each request has a ``command`` and further arguments as keys:
+
+    - ``{"command": "init"}``: Save the driver defaults, and load the
+      configuration
+    - ``{"command": "load", "filename": null}``: Load the configuration
+    - ``{"command": "save", "filename": null}``: Save the configuration
+    - ``{"command": "get", "keys": null}``: Get the given configuration keys,
+      or all of them
+    - ``{"command": "set", "key": "...", "value": ...}``: Set a single key
+    - ``{"command": "apply", "settings": {...}}``: Set many keys at once
+
+    ``filename`` and ``keys`` are optional.  Relative filenames are resolved
+    in the working directory of the server, so clients send absolute
+    paths.  ``load``, ``set`` and ``apply``
+    return a sorted list of the keys, which actually changed.  A response
+    is either ``{"result": ...}`` or ``{"error": "..."}``.
+
+    :func:`send_request()` sends a single request to a running server.  If no
+    server is running, :program:`synaptikscfg` executes requests in-process
+    with a :class:`ConfigurationService`.
+
+    .. moduleauthor::  Sebastian Wiesner  <lunaryorn@googlemail.com>
+"""
+
+from __future__ import (print_function, division, unicode_literals,
+                        absolute_import)
+
+import os
+import stat
+import json
+import errno
+import socket
+import struct
+import tempfile
+from SocketServer import UnixStreamServer, StreamRequestHandler
+
+from synaptiks.util import load_json
+from synaptiks.config import (TouchpadConfiguration,
+                              get_touchpad_config_file_path,
+                              get_touchpad_defaults_file_path,
+                              get_touchpad_discovery_cache_path)
+
+
+#: Seconds, which :func:`send_request()` waits for the server
+TIMEOUT = 10
+
+#: Maximum size of a single request in bytes
+MAXIMUM_REQUEST_SIZE = 1024 * 1024
+
+# socket option to query the credentials of the peer of a Unix socket, which
+# the socket module of Python 2 does not export
+SO_PEERCRED = getattr(socket, 'SO_PEERCRED', 17)
+# struct ucred from <sys/socket.h>
+_UCRED = struct.Struct(str('3i'))
+
+
+def get_socket_path(display_name=None):
+    """
+    Get the path of the socket of the configuration server for the given
+    ``display_name``.
+
+    ``display_name`` is a string with the name of a X11 display.  If
+    ``None``, the value of ``$DISPLAY`` is used.
+
+    The socket is placed in ``$XDG_RUNTIME_DIR``, or in a private directory
+    of the user in the temporary directory, if this variable is not set.
+    Its name contains the user id and the display name, so each user gets a
+    server for each display.
+    """
+    if display_name is None:
+        display_name = os.environ.get('DISPLAY', '')
+    runtime_directory = os.environ.get('XDG_RUNTIME_DIR')
+    if not runtime_directory:
+        runtime_directory = os.path.join(
+            tempfile.gettempdir(), 'synaptiks-{0}'.format(os.getuid()))
+    socket_name = 'synaptiks-{0}-{1}.socket'.format(
+        os.getuid(), display_name.replace('/', '_'))
+    return os.path.join(runtime_directory, socket_name)
+
+
+def get_peer_uid(sock):
+    """
+    Get the user id of the process connected to the given Unix socket
+    ``sock``.
+    """
+    _, uid, _ = _UCRED.unpack(
+        sock.getsockopt(socket.SOL_SOCKET, SO_PEERCRED, _UCRED.size))
+    return uid
+
+
+def _make_private_directory(directory):
+    """
+    Create the given ``directory`` with permissions for the current user
+    only, if it does not exist.
+
+    Raise :exc:`~exceptions.EnvironmentError`, if the directory could not be
+    created, or if it exists, but is not owned by the current user or
+    accessible for other users.
+    """
+    try:
+        os.mkdir(directory, 0o700)
+    except EnvironmentError as error:
+        if error.errno != errno.EEXIST:
+            raise
+    status = os.lstat(directory)
+    if (not stat.S_ISDIR(status.st_mode) or
+        status.st_uid != os.getuid() or status.st_mode & 0o077):
+        raise EnvironmentError(errno.EACCES, 'insecure socket directory',
+                               directory)
+
+
+class ConfigurationService(object):
+    """
+    Execute configuration requests for the touchpad on a display.
+
+    The touchpad is found on the first request, and kept for all further
+    requests.  If a request fails because of the touchpad device, it is
+    searched again on the next request.
+    """
+
+    #: All supported commands
+    COMMANDS = frozenset(['init', 'load', 'save', 'get', 'set', 'apply'])
+
+    def __init__(self, display, cache_properties=False):
+        """
+        Create a new service for the given ``display``, which is a
+        :class:`~synaptiks.x11.Display`.
+
+        If ``cache_properties`` is ``True``, the property cache of the
+        touchpad is enabled (see
+        :meth:`~synaptiks.x11.input.InputDevice.enable_property_cache()`).
+        """
+        self.display = display
+        self.cache_properties = cache_properties
+        self._config = None
+
+    @property
+    def config(self):
+        """
+        The :class:`~synaptiks.config.TouchpadConfiguration` of the touchpad.
+
+        Raise :exc:`~synaptiks.touchpad.NoTouchpadError`, if no touchpad was
+        found.
+        """
+        if self._config is None:
+            from synaptiks.touchpad import Touchpad
+            touchpad = Touchpad.find_first(
+                self.display, get_touchpad_discovery_cache_path())
+            if self.cache_properties:
+                touchpad.enable_property_cache()
+            self._config = TouchpadConfiguration(touchpad)
+        return self._config
+
+    def execute(self, request):
+        """
+        Execute the given ``request``, which is a dictionary as described in
+        the module documentation.
+
+        All X11 errors caused by the request are trapped with
+        :meth:`~synaptiks.x11.Display.trap_errors()`.
+
+        Return the response as dictionary, either with a ``result`` or with
+        an ``error`` message.
+        """
+        from synaptiks.x11 import ProtocolError
+        from synaptiks.x11.input import InputDeviceNotFoundError
+        from synaptiks.touchpad import NoTouchpadError
+        try:
+            command = request['command']
+            if command not in self.COMMANDS:
+                raise ValueError('unknown command: {0}'.format(command))
+            arguments = dict((str(k), v) for k, v in request.iteritems()
+                             if k != 'command')
+            handler = getattr(self, 'do_{0}'.format(command))
+            with self.display.trap_errors():
+                result = handler(**arguments)
+            return dict(result=result)
+        except NoTouchpadError:
+            return dict(error='no touchpad found')
+        except (ProtocolError, InputDeviceNotFoundError) as error:
+            # the touchpad is probably gone, search it again next time
+            self._config = None
+            return dict(error=unicode(error))
+        except Exception as error:
+            return dict(error='{0}: {1}'.format(type(error).__name__, error))
+
+    def process_events(self):
+        """
+        Process pending device events of the property cache of the touchpad,
+        so that they do not pile up while no request arrives.
+        """
+        if self._config is not None:
+            cache = self._config.touchpad.property_cache
+            if cache is not None:
+                cache.events.process_events()
+
+    def do_init(self):
+        """
+        Save the driver defaults, and load the configuration.
+        """
+        defaults = TouchpadConfiguration(self.config.touchpad)
+        defaults.save(get_touchpad_defaults_file_path())
+        return self.do_load()
+
+    def do_load(self, filename=None):
+        """
+        Load the configuration from ``filename``.
+        """
+        if not filename:
+            filename = get_touchpad_config_file_path()
+        return sorted(self.config.update(load_json(filename, default={})))
+
+    def do_save(self, filename=None):
+        """
+        Save the configuration to ``filename``.
+        """
+        self.config.save(filename)
+
+    def do_get(self, keys=None):
+        """
+        Get the given configuration ``keys``, or all of them.
+        """
+        if keys is None:
+            keys = self.config
+        return dict((key, self.config[key]) for key in keys)
+
+    def do_set(self, key, value):
+        """
+        Set a single configuration ``key`` to ``value``.
+        """
+        return sorted(self.config.update({key: value}))
+
+    def do_apply(self, settings):
+        """
+        Set all configuration keys in ``settings``.
+        """
+        return sorted(self.config.update(settings))
+
+
+class _RequestHandler(StreamRequestHandler):
+
+    # the server handles one connection at a time, so a client, which does
+    # not send its request in time, is dropped to not block other clients
+    timeout = 2
+
+    def handle(self):
+        try:
+            line = self.rfile.readline(MAXIMUM_REQUEST_SIZE)
+            if not line.strip():
+                return
+            try:
+                request = json.loads(line)
+            except ValueError as error:
+                response = dict(error='invalid request: {0}'.format(error))
+            else:
+                response = self.server.service.execute(request)
+            self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+        except socket.error:
+            # the client timed out or went away
+            pass
+
+
+class ConfigurationServer(UnixStreamServer):
+    """
+    A server, which executes requests with a :class:`ConfigurationService`.
+
+    Requests are handled one after another in the serving thread, because
+    the display connection must not be used from different threads.
+    """
+
+    #: Seconds without any request, after which pending device events are
+    #: processed by :meth:`serve()`
+    timeout = 5
+
+    def __init__(self, service, socket_path=None):
+        """
+        Create a new server for the given ``service``, which is a
+        :class:`ConfigurationService`.
+
+        ``socket_path`` is the path of the socket to listen on.  If ``None``,
+        :func:`get_socket_path()` is used, and its directory is created with
+        permissions for the current user only.  A stale socket, on which no
+        server listens, is replaced.  Only processes of the current user may
+        connect to the server.
+
+        Raise :exc:`~exceptions.EnvironmentError`, if another server already
+        listens on the socket, if the socket could not be created, or if its
+        default directory is accessible for other users.
+        """
+        if socket_path is None:
+            socket_path = get_socket_path()
+            _make_private_directory(os.path.dirname(socket_path))
+        self.service = service
+        _remove_stale_socket(socket_path)
+        UnixStreamServer.__init__(self, socket_path, _RequestHandler)
+
+    def server_bind(self):
+        # create the socket without any permissions for other users, instead
+        # of restricting the permissions after binding
+        umask = os.umask(0o077)
+        try:
+            UnixStreamServer.server_bind(self)
+        finally:
+            os.umask(umask)
+
+    def serve(self):
+        """
+        Handle requests until interrupted.
+
+        Unlike :meth:`serve_forever()`, pending device events are processed
+        with :meth:`ConfigurationService.process_events()` whenever no
+        request arrived for :attr:`timeout` seconds.
+        """
+        while True:
+            self.handle_request()
+
+    def handle_timeout(self):
+        self.service.process_events()
+
+    def verify_request(self, request, client_address):
+        """
+        Only accept connections of processes of the current user.
+        """
+        return get_peer_uid(request) == os.getuid()
+
+    def server_close(self):
+        """
+        Close and remove the socket.
+        """
+        UnixStreamServer.server_close(self)
+        try:
+            os.unlink(self.server_address)
+        except EnvironmentError as error:
+            if error.errno != errno.ENOENT:
+                raise
+
+
+def _remove_stale_socket(socket_path):
+    """
+    Remove the socket at ``socket_path``, if no server listens on it.
+
+    Raise :exc:`~exceptions.EnvironmentError`, if a server listens on it.
+    """
+    if not os.path.exists(socket_path):
+        return
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+    except socket.error as error:
+        if error.errno not in (errno.ECONNREFUSED, errno.ENOTSOCK):
+            raise
+        os.unlink(socket_path)
+    else:
+        raise EnvironmentError(errno.EADDRINUSE, 'server already running',
+                               socket_path)
+    finally:
+        sock.close()
+
+
+def send_request(request, socket_path=None):
+    """
+    Send the given ``request`` to a running :class:`ConfigurationServer`.
+
+    ``request`` is a dictionary as described in the module documentation.
+    ``socket_path`` is the path of the socket of the server.  If ``None``,
+    :func:`get_socket_path()` is used.
+
+    Return the response as dictionary.  Raise :exc:`~socket.error` with
+    :data:`~errno.ENOENT` or :data:`~errno.ECONNREFUSED`, if no server is
+    running, and with :data:`~errno.EACCES`, if the server runs as another
+    user.  Raise :exc:`~socket.timeout`, if the server did not respond
+    within :data:`TIMEOUT` seconds.  In this case, the request may
+    nonetheless have been executed.
+    """
+    if socket_path is None:
+        socket_path = get_socket_path()
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(TIMEOUT)
+    try:
+        sock.connect(socket_path)
+        if get_peer_uid(sock) != os.getuid():
+            raise socket.error(errno.EACCES, 'server runs as another user')
+        sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+        stream = sock.makefile('rb')
+        try:
+            response = stream.readline()
+        finally:
+            stream.close()
+    finally:
+        sock.close()
+    if not response:
+        raise socket.error(errno.ECONNRESET, 'server closed the connection')
+    return json.loads(response)
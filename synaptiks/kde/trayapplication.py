@@ -50,7 +50,8 @@ from PyKDE4.kdeui import (KUniqueApplication, KStatusNotifierItem,
 from synaptiks.x11 import Display
 from synaptiks.touchpad import Touchpad
 from synaptiks.management import TouchpadManager
-from synaptiks.config import TouchpadConfiguration, ManagerConfiguration
+from synaptiks.config import (TouchpadConfiguration, ManagerConfiguration,
+                              get_touchpad_discovery_cache_path)
 from synaptiks.kde import make_about_data
 from synaptiks.kde.widgets.touchpad import TouchpadConfigurationWidget
 from synaptiks.kde.widgets.management import TouchpadManagementWidget
@@ -136,7 +137,9 @@ class SynaptiksNotifierItem(KStatusNotifierItem):
         self._config = SynaptiksTrayConfiguration(self)
 
         try:
-            self.touchpad = Touchpad.find_first(Display.from_qt())
+            self.touchpad = Touchpad.find_first(
+                Display.from_qt(), get_touchpad_discovery_cache_path())
+            self.touchpad.enable_property_cache()
         except Exception as error:
             # show an error message
             from synaptiks.kde.error import get_localized_error_message
@@ -203,9 +206,20 @@ class SynaptiksNotifierItem(KStatusNotifierItem):
             partial(self.notify_touchpad_state, True))
         self.touchpad_manager.states['off'].exited.connect(
             partial(self.notify_touchpad_state, False))
+        # keep the learned typing rhythm across sessions
+        KUniqueApplication.instance().aboutToQuit.connect(
+            self.save_learned_idle_time)
         # and eventually start managing the touchpad
         self.touchpad_manager.start()
 
+    def save_learned_idle_time(self):
+        if self.touchpad_manager.keyboard_monitor.adaptive_idle_time:
+            try:
+                ManagerConfiguration(self.touchpad_manager).save()
+            except EnvironmentError:
+                # not worth bothering the user while quitting
+                pass
+
     def notify_touchpad_state(self, is_off=None):
         if is_off is None:
             is_off = self.touchpad.off
@@ -53,7 +53,8 @@ class ConfigurationWidgetMixin(object):
     configuration mapping.  For all these widgets the mixin automatically does
     all the configuration management (applying and loading configuration,
     checking for default settings, checking if the user changed some settings
-    and so on).
+    and so on).  Keys without a corresponding widget are left alone, and are
+    not considered when checking for changes or default settings.
 
     To do so, it needs to now the ``<prefix>``.  Classes deriving from this
     mixin must therefore define a ``NAME_PREFIX`` attribute at class or
@@ -187,6 +188,16 @@ class ConfigurationWidgetMixin(object):
             config[config_key] = self._convert_from_property(config_key, value)
         return config
 
+    def _differs_from_widgets(self, mapping):
+        """
+        Check, if the configuration widgets show values different from the
+        given ``mapping``.
+
+        Only keys with a corresponding widget are compared.
+        """
+        current = self._get_mapping_from_widgets()
+        return any(mapping[key] != value for key, value in current.iteritems())
+
     @property
     def is_configuration_changed(self):
         """
@@ -194,7 +205,7 @@ class ConfigurationWidgetMixin(object):
         from the actual configuration.  This usually means, that the user has
         changed some setting in the widget.
         """
-        return self.__config != self._get_mapping_from_widgets()
+        return self._differs_from_widgets(self.__config)
 
     def load_defaults(self):
         """
@@ -210,8 +221,7 @@ class ConfigurationWidgetMixin(object):
         Return ``True``, if the given defaults are contained in the widgets, or
         ``False`` otherwise.
         """
-        current = self._get_mapping_from_widgets()
-        return current == self.__config.defaults
+        return not self._differs_from_widgets(self.__config.defaults)
 
     def load_configuration(self):
         """
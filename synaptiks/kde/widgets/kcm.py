@@ -152,9 +152,12 @@ def make_kcm_widget(component_data, parent=None):
     """
     from synaptiks.x11 import Display
     from synaptiks.touchpad import Touchpad
-    from synaptiks.config import TouchpadConfiguration
+    from synaptiks.config import (TouchpadConfiguration,
+                                  get_touchpad_discovery_cache_path)
     try:
-        touchpad = Touchpad.find_first(Display.from_qt())
+        touchpad = Touchpad.find_first(
+            Display.from_qt(), get_touchpad_discovery_cache_path())
+        touchpad.enable_property_cache()
         config = TouchpadConfiguration(touchpad)
         return TouchpadConfigurationKCM(config, component_data, parent)
     except Exception as error:
@@ -55,11 +55,13 @@ class TouchpadManagementWidget(QWidget, ConfigurationWidgetMixin,
 
     PROPERTY_MAP = dict(
         QGroupBox='checked', MouseDevicesView='checkedDevices',
-        KDoubleNumInput='value', KComboBox='currentIndex')
+        KDoubleNumInput='value', KComboBox='currentIndex',
+        KEditListBox='items')
 
     CHANGED_SIGNAL_MAP = dict(
         QGroupBox='toggled', MouseDevicesView='checkedDevicesChanged',
-        KDoubleNumInput='valueChanged', KComboBox='currentIndexChanged')
+        KDoubleNumInput='valueChanged', KComboBox='currentIndexChanged',
+        KEditListBox='changed')
 
     def __init__(self, config, parent=None):
         QWidget.__init__(self, parent)
@@ -68,12 +70,12 @@ class TouchpadManagementWidget(QWidget, ConfigurationWidgetMixin,
         self._setup(self.management_config)
 
     def _convert_to_property(self, key, value):
-        if key == 'ignored_mouses':
+        if key in ('ignored_mouses', 'ignored_keyboards'):
             return QStringList(value)
         return ConfigurationWidgetMixin._convert_to_property(self, key, value)
 
     def _convert_from_property(self, key, value):
-        if key == 'ignored_mouses':
+        if key in ('ignored_mouses', 'ignored_keyboards'):
             return [unicode(d) for d in value]
         return ConfigurationWidgetMixin._convert_from_property(
             self, key, value)
@@ -30,13 +30,66 @@
 
     Monitor classes for various external event sources.
 
+    The public classes and functions of the implementation modules are
+    available from this package, but the implementation modules are only
+    imported on first access of one of their attributes.  Thus importing
+    this package alone does not import PyQt4, pyudev or dbus.
+
     .. moduleauthor::  Sebastian Wiesner  <lunaryorn@googlemail.com>
 """
 
 from __future__ import (print_function, division, unicode_literals,
                         absolute_import)
 
-# aggregate public classes and functions from implementation modules
-from synaptiks.monitors.keyboard import *
-from synaptiks.monitors.mouses import *
-from synaptiks.monitors.power import *
+import sys
+from types import ModuleType
+from importlib import import_module
+
+
+# maps public classes and functions to the implementation modules, which
+# define them
+_IMPLEMENTATIONS = {
+    'create_keyboard_monitor': 'keyboard',
+    'AbstractKeyboardMonitor': 'keyboard',
+    'EvdevKeyboardMonitor': 'keyboard',
+    'PollingKeyboardMonitor': 'keyboard',
+    'RawEventKeyboardMonitor': 'keyboard',
+    'RecordingKeyboardMonitor': 'keyboard',
+    'MouseDevicesManager': 'mouses',
+    'MouseDevicesMonitor': 'mouses',
+    'MouseDevice': 'mouses',
+    'create_resume_monitor': 'power',
+    'AbstractResumeMonitor': 'power',
+    'UPowerResumeMonitor': 'power',
+    }
+
+__all__ = sorted(_IMPLEMENTATIONS)
+
+
+class _LazyPackage(ModuleType):
+    """
+    A package, which imports implementation modules on attribute access.
+    """
+
+    def __getattr__(self, name):
+        module_name = _IMPLEMENTATIONS.get(name)
+        if module_name is None:
+            raise AttributeError(name)
+        module = import_module('{0}.{1}'.format(self.__name__, module_name))
+        value = getattr(module, name)
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self):
+        return sorted(set(self.__dict__) | set(_IMPLEMENTATIONS))
+
+
+def _install_lazy_package():
+    package = _LazyPackage(__name__)
+    package.__dict__.update(sys.modules[__name__].__dict__)
+    # keep the original module alive, Python 2 clears the globals of
+    # deallocated modules
+    package._original_module = sys.modules[__name__]
+    sys.modules[__name__] = package
+
+_install_lazy_package()
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012, Sebastian Wiesner <lunaryorn@googlemail.com>
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+    synaptiks.monitors.evdev
+    ========================
+
+    Reading of key events from evdev event devices.
+
+    :class:`EvdevKeyEventSource` reads key events directly from the event
+    devices of the kernel (e.g. ``/dev/input/event3``), independently of the
+    X server.  All devices are watched by a single :func:`select.epoll`
+    object, so the source does not block and needs no thread:
+
+    >>> from synaptiks.monitors.evdev import EvdevKeyEventSource
+    >>> source = EvdevKeyEventSource()
+    >>> source.open_device('/dev/input/event3')
+    >>> source.add_listener(print)
+    >>> source.process_events()
+    KeyEvent(time=1326811253.12, device=u'/dev/input/event3', keycode=38, pressed=True, repeat=False)
+    1
+
+    Call :meth:`EvdevKeyEventSource.process_events()` whenever the file
+    descriptor returned by :meth:`EvdevKeyEventSource.fileno()` becomes
+    readable, e.g. by means of a :class:`~PyQt4.QtCore.QSocketNotifier`.
+
+    .. moduleauthor::  Sebastian Wiesner  <lunaryorn@googlemail.com>
+"""
+
+from __future__ import (print_function, division, unicode_literals,
+                        absolute_import)
+
+import os
+import io
+import errno
+import fcntl
+import select
+import struct
+from collections import namedtuple
+
+
+#: The layout of ``struct input_event`` from ``<linux/input.h>``: the
+#: timestamp as ``struct timeval``, the event type, the event code and the
+#: value
+INPUT_EVENT = struct.Struct(str('llHHi'))
+
+#: The event type of key events
+EV_KEY = 1
+
+#: The offset between evdev key codes and X11 keycodes
+X11_KEYCODE_OFFSET = 8
+
+
+#: A key was pressed or released.
+#:
+#: ``time`` is the kernel timestamp of the event in seconds since the epoch
+#: as float, ``device`` the name of the device, on which the key was pressed
+#: (see :meth:`EvdevKeyEventSource.add_device`).  ``keycode`` is the X11
+#: keycode of the key, ``pressed`` is ``True``, if the key was pressed or
+#: repeated, or ``False``, if it was released, and ``repeat`` is ``True``,
+#: if the press was generated by keyboard autorepeat.
+KeyEvent = namedtuple('KeyEvent', 'time device keycode pressed repeat')
+
+
+class EvdevKeyEventSource(object):
+    """
+    A source of key events read from evdev event devices.
+
+    Events are read in bulk:  Each read fetches up to
+    :attr:`EVENTS_PER_READ` events into a preallocated buffer, which are
+    then decoded with :data:`INPUT_EVENT`.  Received key events are passed
+    as :class:`KeyEvent` objects to all listeners added with
+    :meth:`add_listener()`.  All other events (e.g. synchronization events)
+    are skipped.
+
+    This class supports the context manager protocol.  Upon context exit,
+    all devices are closed.
+    """
+
+    #: The maximum number of events read from a device at once
+    EVENTS_PER_READ = 64
+
+    def __init__(self):
+        self._epoll = select.epoll()
+        # maps file descriptors to pairs of device name and file object
+        self._devices = {}
+        self._buffer = bytearray(INPUT_EVENT.size * self.EVENTS_PER_READ)
+        self._listeners = []
+
+    def fileno(self):
+        """
+        Return the file descriptor of the underlying epoll object.  Events
+        are available, if this descriptor is readable.
+        """
+        return self._epoll.fileno()
+
+    @property
+    def devices(self):
+        """
+        The names of all devices of this source as list.
+        """
+        return [name for name, _ in self._devices.itervalues()]
+
+    def add_device(self, fd, name):
+        """
+        Read events from the given file descriptor.
+
+        ``fd`` is a file descriptor opened for reading, e.g. of an event
+        device or of a pipe.  It is switched to non-blocking mode, and closed
+        by this source.  ``name`` is a unicode string, which identifies the
+        device in events and in :meth:`remove_device()`.
+
+        Raise :exc:`~exceptions.ValueError`, if a device with the given
+        ``name`` was already added.  Raise
+        :exc:`~exceptions.EnvironmentError`, if ``fd`` could not be watched.
+        In both cases, ``fd`` is left open.
+        """
+        if name in self.devices:
+            raise ValueError('device already added: {0}'.format(name))
+        flags = fcntl.fcntl(fd, fcntl.F_GETFL)
+        fcntl.fcntl(fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
+        self._epoll.register(fd, select.EPOLLIN)
+        self._devices[fd] = (name, io.FileIO(fd, 'r'))
+
+    def open_device(self, filename):
+        """
+        Open the event device with the given ``filename`` and read events
+        from it.  The ``filename`` is used as name of the device.
+
+        Raise :exc:`~exceptions.EnvironmentError`, if the device could not
+        be opened (e.g. because of missing permissions).  Raise
+        :exc:`~exceptions.ValueError`, if the device was already opened.
+        """
+        fd = os.open(filename, os.O_RDONLY)
+        try:
+            self.add_device(fd, filename)
+        except:
+            os.close(fd)
+            raise
+
+    def remove_device(self, name):
+        """
+        Close the device with the given ``name``.
+
+        Raise :exc:`~exceptions.KeyError`, if there is no such device.
+        """
+        for fd, (device_name, _) in self._devices.iteritems():
+            if device_name == name:
+                self._close_device(fd)
+                return
+        raise KeyError(name)
+
+    def _close_device(self, fd):
+        _, device = self._devices.pop(fd)
+        self._epoll.unregister(fd)
+        device.close()
+
+    def add_listener(self, listener):
+        """
+        Add the given ``listener``, which is a callable taking a single
+        :class:`KeyEvent` argument.
+        """
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        """
+        Remove the given ``listener``.
+
+        Raise :exc:`~exceptions.ValueError`, if the listener was not added.
+        """
+        self._listeners.remove(listener)
+
+    def _read_events(self, fd):
+        """
+        Read all pending key events from the device with the given ``fd``.
+
+        Return a list of :class:`KeyEvent` objects.  The device is closed, if
+        it was removed or reached end of file.
+        """
+        name, device = self._devices[fd]
+        buffer = self._buffer
+        events = []
+        while True:
+            try:
+                size = device.readinto(buffer)
+            except EnvironmentError as error:
+                if error.errno != errno.ENODEV:
+                    raise
+                # the device was unplugged
+                size = 0
+            if size == 0:
+                self._close_device(fd)
+                break
+            if size is None:
+                # no more pending data
+                break
+            # the kernel only returns complete events
+            for offset in xrange(0, size, INPUT_EVENT.size):
+                seconds, microseconds, event_type, code, value = \
+                    INPUT_EVENT.unpack_from(buffer, offset)
+                if event_type == EV_KEY:
+                    events.append(KeyEvent(
+                        seconds + microseconds / 1000000, name,
+                        code + X11_KEYCODE_OFFSET, value != 0, value == 2))
+            if size < len(buffer):
+                break
+        return events
+
+    def process_events(self):
+        """
+        Process all pending events without blocking.
+
+        Each key event is passed to all listeners.
+
+        Return the number of processed key events.
+        """
+        number_of_events = 0
+        for fd, _ in self._epoll.poll(0):
+            if fd not in self._devices:
+                continue
+            for event in self._read_events(fd):
+                for listener in list(self._listeners):
+                    listener(event)
+                number_of_events += 1
+        return number_of_events
+
+    def close(self):
+        """
+        Close all devices and the epoll object.
+        """
+        for fd in list(self._devices):
+            self._close_device(fd)
+        self._epoll.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, _exc_type, _exc_value, _traceback):
+        self.close()
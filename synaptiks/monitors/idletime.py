@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012, Sebastian Wiesner <lunaryorn@googlemail.com>
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+    synaptiks.monitors.idletime
+    ===========================
+
+    Estimation of the idle time of keyboard monitors from the typing rhythm
+    of the user.
+
+    :class:`IdleTimeEstimator` records the intervals between key presses in
+    a histogram with exponential decay, and derives the idle time from a
+    percentile of these intervals:
+
+    >>> estimator = IdleTimeEstimator(percentile=0.95)
+    >>> for interval in intervals:
+    ...     estimator.add_interval(interval)
+    >>> estimator.estimate()
+    0.7134802593264826
+
+    .. moduleauthor::  Sebastian Wiesner  <lunaryorn@googlemail.com>
+"""
+
+from __future__ import (print_function, division, unicode_literals,
+                        absolute_import)
+
+from math import log
+
+
+class IdleTimeEstimator(object):
+    """
+    Estimate the idle time from the intervals between key presses.
+
+    Intervals are counted in a histogram of :attr:`BINS` logarithmically
+    spaced bins between :attr:`MINIMUM_INTERVAL` and
+    :attr:`MAXIMUM_INTERVAL`, thus the memory used by the estimator is
+    constant.  Each recorded interval decays the weight of all previous
+    intervals by :attr:`DECAY`, so that the estimate follows changes of the
+    typing rhythm.  Intervals longer than :attr:`MAXIMUM_INTERVAL` are
+    considered pauses between typing, and ignored.
+
+    Instead of decaying all bins on every interval, the weight of new
+    intervals grows inversely, and the bins are only rescaled occasionally.
+    Consequently recording an interval costs constant time.
+    """
+
+    #: The number of histogram bins
+    BINS = 48
+    #: The shortest interval in seconds.  Shorter intervals are counted in the
+    #: first bin.
+    MINIMUM_INTERVAL = 0.02
+    #: The longest interval in seconds.  Longer intervals are ignored.
+    MAXIMUM_INTERVAL = 5.0
+    #: The decay of the weight of all previous intervals per recorded
+    #: interval.  The weight of an interval halves after about 700 key
+    #: presses.
+    DECAY = 0.999
+    #: The minimum weight of all recorded intervals, before an estimate is
+    #: given
+    MINIMUM_WEIGHT = 50
+
+    # the bins are rescaled, once the weight of new intervals exceeds this
+    # limit
+    _RESCALE_LIMIT = 1e100
+
+    def __init__(self, percentile=0.95, histogram=None):
+        """
+        Create a new estimator.
+
+        ``percentile`` is a float between 0 and 1 (see :attr:`percentile`).
+        ``histogram`` is a list of the weights of all bins, as returned by
+        :attr:`histogram`, or ``None`` to start with an empty histogram.
+
+        Raise :exc:`~exceptions.ValueError`, if ``histogram`` has not
+        exactly :attr:`BINS` items.
+        """
+        #: The fraction of intervals between key presses as float between 0
+        #: and 1, which have to be shorter than the estimated idle time.
+        self.percentile = percentile
+        self._bins = [0.0] * self.BINS
+        self._increment = 1.0
+        self._scale = self.BINS / log(self.MAXIMUM_INTERVAL /
+                                      self.MINIMUM_INTERVAL)
+        if histogram:
+            self.histogram = histogram
+
+    @property
+    def histogram(self):
+        """
+        The weights of all bins as list of floats, or an empty list, if no
+        intervals were recorded.
+
+        Assign a list of :attr:`BINS` weights to restore a previously saved
+        histogram, or an empty list to clear the histogram.  Raise
+        :exc:`~exceptions.ValueError` upon assignment, if the list has any
+        other length.
+        """
+        if not any(self._bins):
+            return []
+        return [weight / self._increment for weight in self._bins]
+
+    @histogram.setter
+    def histogram(self, weights):
+        if not weights:
+            weights = [0.0] * self.BINS
+        if len(weights) != self.BINS:
+            raise ValueError('expected {0} bins, got {1}'.format(
+                self.BINS, len(weights)))
+        self._bins = [float(weight) for weight in weights]
+        self._increment = 1.0
+
+    @property
+    def weight(self):
+        """
+        The decayed number of all recorded intervals as float.
+        """
+        return sum(self._bins) / self._increment
+
+    def _bin_index(self, interval):
+        if interval <= self.MINIMUM_INTERVAL:
+            return 0
+        index = int(log(interval / self.MINIMUM_INTERVAL) * self._scale)
+        return min(index, self.BINS - 1)
+
+    def _upper_bound(self, index):
+        return self.MINIMUM_INTERVAL * (
+            self.MAXIMUM_INTERVAL / self.MINIMUM_INTERVAL) ** (
+            (index + 1) / self.BINS)
+
+    def add_interval(self, interval):
+        """
+        Record the given ``interval`` between two key presses in seconds as
+        float.
+        """
+        if interval > self.MAXIMUM_INTERVAL:
+            return
+        self._bins[self._bin_index(interval)] += self._increment
+        self._increment /= self.DECAY
+        if self._increment > self._RESCALE_LIMIT:
+            self._bins = [weight / self._increment for weight in self._bins]
+            self._increment = 1.0
+
+    def estimate(self):
+        """
+        Estimate the idle time.
+
+        Return the idle time in seconds as float, which is longer than
+        :attr:`percentile` of all recorded intervals, or ``None``, if the
+        :attr:`weight` of the recorded intervals is less than
+        :attr:`MINIMUM_WEIGHT`.
+        """
+        total = sum(self._bins)
+        if total < self.MINIMUM_WEIGHT * self._increment:
+            return None
+        threshold = total * self.percentile
+        cumulative = 0
+        for index, weight in enumerate(self._bins):
+            cumulative += weight
+            if cumulative >= threshold:
+                return self._upper_bound(index)
+        return self.MAXIMUM_INTERVAL
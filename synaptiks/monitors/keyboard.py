@@ -36,21 +36,147 @@
 from __future__ import (print_function, division, unicode_literals,
                         absolute_import)
 
-from threading import Event
-from array import array
-from itertools import izip
-
-from PyQt4.QtCore import QObject, QTimer, QTime, QThread, pyqtSignal
-from PyQt4.QtGui import QApplication
-
-from synaptiks.x11 import Display
+import os
+import warnings
+from math import ceil
+from time import time
+from select import select
+from binascii import hexlify
+from itertools import ifilter
+from ctypes import create_string_buffer
+
+import pyudev
+from pyudev.pyqt4 import QUDevMonitorObserver
+from PyQt4.QtCore import (QObject, QTimer, QTime, QThread, QSocketNotifier,
+                          pyqtSignal)
+
+from synaptiks.x11 import Display, DisplayError
+from synaptiks.x11.input import DeviceSnapshot, XInputVersionError
+from synaptiks.x11.events import (RawKeyEventSource, MappingEventSource,
+                                   HierarchyEvent)
+from synaptiks.monitors.evdev import EvdevKeyEventSource
+from synaptiks.monitors.idletime import IdleTimeEstimator
 from synaptiks._bindings import xlib
 from synaptiks._bindings import xrecord
 from synaptiks._bindings.util import scoped_pointer
 
 
 __all__ = ['create_keyboard_monitor', 'AbstractKeyboardMonitor',
-           'PollingKeyboardMonitor', 'RecordingKeyboardMonitor']
+           'PollingKeyboardMonitor', 'RecordingKeyboardMonitor',
+           'RawEventKeyboardMonitor', 'EvdevKeyboardMonitor']
+
+
+#: A keymap with all keys pressed, see :func:`keymap_to_int()`
+ALL_KEYS = (1 << 256) - 1
+
+
+def keymap_to_int(keymap):
+    """
+    Convert the given ``keymap`` to an integer.
+
+    ``keymap`` is a byte string with 32 bytes, as returned by
+    :func:`~synaptiks._bindings.xlib.query_keymap()`.
+
+    Return a 256 bit integer, in which the bit ``1 << keycode`` is set, if
+    the key with this ``keycode`` is pressed.
+    """
+    # the keymap is little-endian: the first byte holds keys 0 to 7
+    return int(hexlify(keymap[::-1]), 16)
+
+
+def keycodes_to_int(keycodes):
+    """
+    Convert the given ``keycodes`` to an integer like
+    :func:`keymap_to_int()`.
+
+    ``keycodes`` is an iterable of key codes.  Zero key codes are ignored.
+
+    Return a 256 bit integer, in which the bits of all ``keycodes`` are set.
+    """
+    mask = 0
+    for keycode in keycodes:
+        if keycode:
+            mask |= 1 << keycode
+    return mask
+
+
+class ModifierMapping(QObject):
+    """
+    The modifier keys of a display.
+
+    The modifier mapping is queried once, and then kept until a
+    :class:`~synaptiks.x11.events.MappingEventSource` reports a change of the
+    keyboard or modifier mapping (e.g. by :program:`xmodmap` or
+    :program:`setxkbmap`).  The modifier keys are available as set of
+    keycodes in :attr:`modifiers`, and as precomputed 256 bit masks like
+    :func:`keymap_to_int()`.
+
+    Use :meth:`for_display()` to get the mapping of a display, which is
+    shared by all keyboard monitors on this display.
+    """
+
+    #: emitted, after the modifier mapping changed
+    changed = pyqtSignal()
+
+    # maps display names to shared instances
+    _instances = {}
+
+    def __init__(self, display_name=None, parent=None):
+        """
+        Create a new mapping for the display with the given
+        ``display_name``.
+
+        ``display_name`` is a byte or unicode string with the name of the
+        display, or ``None`` to use the value of ``$DISPLAY``.
+
+        Raise :exc:`~synaptiks.x11.DisplayError`, if the display could not be
+        opened.
+        """
+        QObject.__init__(self, parent)
+        self._source = MappingEventSource(display_name)
+        self._source.add_listener(self._mapping_changed)
+        self._notifier = QSocketNotifier(self._source.fileno(),
+                                         QSocketNotifier.Read, self)
+        self._notifier.activated.connect(self._process_events)
+        self._stale = True
+        self._process_events()
+
+    @classmethod
+    def for_display(cls, display):
+        """
+        Get the shared mapping of the given ``display``, which is a
+        :class:`~synaptiks.x11.Display`.
+        """
+        mapping = cls._instances.get(display.name)
+        if mapping is None:
+            mapping = cls._instances[display.name] = cls(display.name)
+        return mapping
+
+    def _update(self):
+        self._stale = False
+        modifier_mapping = xlib.get_modifier_mapping(self._source.display)
+        self.modifiers = frozenset(keycode for modifier_keys
+                                   in modifier_mapping
+                                   for keycode in modifier_keys if keycode)
+        self.modifier_mask = keycodes_to_int(self.modifiers)
+        self.non_modifier_mask = ALL_KEYS & ~self.modifier_mask
+
+    def _mapping_changed(self, event):
+        if event.request != xlib.MAPPING_POINTER:
+            self._stale = True
+
+    def _process_events(self):
+        self._source.process_events()
+        if not self._stale:
+            return
+        # programs like setxkbmap change the mapping in many steps, so the
+        # mapping is only queried once for all pending events.  Events
+        # received while querying the mapping are already read from the
+        # socket, and must be processed here.
+        while self._stale:
+            self._update()
+            self._source.process_events()
+        self.changed.emit()
 
 
 class AbstractKeyboardMonitor(QObject):
@@ -58,8 +184,10 @@ class AbstractKeyboardMonitor(QObject):
     Abstract base class for keyboard monitors.
 
     This class defines the interface for keyboard monitoring classes.
-    Currently there are two base classes:
+    Currently there are four base classes:
 
+    - :class:`RawEventKeyboardMonitor`
+    - :class:`EvdevKeyboardMonitor`
     - :class:`RecordingKeyboardMonitor`
     - :class:`PollingKeyboardMonitor`
 
@@ -77,6 +205,14 @@ class AbstractKeyboardMonitor(QObject):
     Modifier keys can be ignored (see :attr:`keys_to_ignore`) as this kind of
     keys is mostly involved in hotkeys and shortcuts and doesn't really
     indicate keyboard activity.
+
+    Instead of a fixed :attr:`idle_time`, the monitor can also learn the
+    idle time from the typing rhythm of the user (see
+    :attr:`adaptive_idle_time`).
+
+    Some keyboards (e.g. barcode scanners or virtual keyboards) do not
+    indicate typing of the user.  These keyboards can be ignored (see
+    :attr:`ignored_keyboards`).
     """
 
     #: default time span before considering the keyboard inactive again
@@ -98,6 +234,14 @@ class AbstractKeyboardMonitor(QObject):
     #: Qt signal, emitted if typing is stopped.  Has no arguments.
     typingStopped = pyqtSignal()
 
+    def __init__(self, parent=None):
+        QObject.__init__(self, parent)
+        #: The :class:`~synaptiks.monitors.idletime.IdleTimeEstimator`,
+        #: which learns the typing rhythm of the user, if
+        #: :attr:`adaptive_idle_time` is enabled
+        self.idle_time_estimator = IdleTimeEstimator()
+        self._ignored_keyboards = frozenset()
+
     def start():
         """
         Start monitoring the keyboard.
@@ -132,6 +276,85 @@ class AbstractKeyboardMonitor(QObject):
     def idle_time(self, value):
         raise NotImplementedError()
 
+    @property
+    def ignored_keyboards(self):
+        """
+        The list of ignored keyboards.
+
+        This property holds a list of device names.  Key events of keyboards
+        with these names are dropped, before they are checked for keyboard
+        activity.  Only monitors, which know the keyboard of each key event,
+        support this property (:class:`RawEventKeyboardMonitor` and
+        :class:`EvdevKeyboardMonitor`).  All other monitors do not ignore any
+        keyboard, and issue a :exc:`~exceptions.RuntimeWarning`, if this
+        property is set to a non-empty list.
+
+        Modifying the returned list in place does not have any effect, assign
+        to this property to change the list of ignored keyboards.
+        """
+        return list(self._ignored_keyboards)
+
+    @ignored_keyboards.setter
+    def ignored_keyboards(self, names):
+        names = frozenset(names)
+        if self._ignored_keyboards != names:
+            self._ignored_keyboards = names
+            self._ignored_keyboards_changed()
+
+    def _ignored_keyboards_changed(self):
+        """
+        Called, whenever :attr:`ignored_keyboards` changed.
+
+        Monitors, which support :attr:`ignored_keyboards`, must override
+        this method.  The default implementation warns, that the ignored
+        keyboards have no effect.
+        """
+        if self._ignored_keyboards:
+            warnings.warn('{0} does not support ignored keyboards, key events '
+                          'of all keyboards are monitored'.format(
+                              type(self).__name__), RuntimeWarning)
+
+    @property
+    def adaptive_idle_time(self):
+        """
+        Whether to estimate the idle time from the typing rhythm of the user.
+
+        If ``True``, the intervals between key presses are recorded by
+        :attr:`idle_time_estimator`, and the estimated idle time is used
+        instead of :attr:`idle_time`, once enough intervals were recorded.
+        The estimate is updated whenever the user starts typing.
+        """
+        raise NotImplementedError()
+
+    @adaptive_idle_time.setter
+    def adaptive_idle_time(self, enabled):
+        raise NotImplementedError()
+
+    @property
+    def idle_time_percentile(self):
+        """
+        The fraction of intervals between key presses as float between 0 and
+        1, which have to be shorter than the estimated idle time.
+        """
+        return self.idle_time_estimator.percentile
+
+    @idle_time_percentile.setter
+    def idle_time_percentile(self, value):
+        self.idle_time_estimator.percentile = value
+
+    @property
+    def idle_time_histogram(self):
+        """
+        The histogram of the intervals between key presses as list of floats.
+
+        See :attr:`~synaptiks.monitors.idletime.IdleTimeEstimator.histogram`.
+        """
+        return self.idle_time_estimator.histogram
+
+    @idle_time_histogram.setter
+    def idle_time_histogram(self, value):
+        self.idle_time_estimator.histogram = value
+
     @property
     def keys_to_ignore(self):
         """
@@ -161,149 +384,290 @@ class AbstractKeyboardMonitor(QObject):
         raise NotImplementedError()
 
 
+class KeyActivityFilter(object):
+    """
+    Track typing activity from key events.
+
+    This class implements the filtering of modifiers (see
+    :attr:`keys_to_ignore`) and the idle timeout (see :attr:`idle_time`)
+    for :class:`RecordingKeyboardMonitor`, :class:`RawEventKeyboardMonitor`
+    and :class:`EvdevKeyboardMonitor`.  It does not depend on Qt, and is
+    driven by the recorder thread, which only forwards the transitions of
+    :attr:`typing` to the GUI thread.
+
+    All times are given in seconds since the epoch as float, as returned by
+    :func:`time.time()`.
+
+    If an :attr:`estimator` is set, the intervals between key presses are
+    recorded, and the estimated idle time is used instead of
+    :attr:`idle_time`.  Presses generated by keyboard autorepeat keep the
+    user typing, but are not recorded, because their intervals reflect the
+    autorepeat rate instead of the typing speed of the user.
+    """
+
+    def __init__(self, modifiers):
+        """
+        Create a new filter.
+
+        ``modifiers`` is an iterable of the keycodes of all modifier keys.
+        """
+        self.modifiers = frozenset(modifiers)
+        self.keys_to_ignore = AbstractKeyboardMonitor.IGNORE_NO_KEYS
+        self.idle_time = AbstractKeyboardMonitor.DEFAULT_IDLETIME / 1000
+        #: The :class:`~synaptiks.monitors.idletime.IdleTimeEstimator`, or
+        #: ``None``, to always use :attr:`idle_time`
+        self.estimator = None
+        #: ``True``, if the user is currently typing, ``False`` otherwise
+        self.typing = False
+        self._last_activity = 0
+        self._last_press = None
+        # the idle time of the current typing
+        self._current_idle_time = self.idle_time
+        # all pressed, but not yet released modifier keys
+        self._pressed_modifiers = set()
+
+    def _is_ignored(self, keycode):
+        """
+        Return ``True``, if the event of the given ``keycode`` has to be
+        ignored, ``False`` otherwise.
+        """
+        if (self.keys_to_ignore >= AbstractKeyboardMonitor.IGNORE_MODIFIER_KEYS
+            and keycode in self.modifiers):
+            return True
+        return (self.keys_to_ignore ==
+                AbstractKeyboardMonitor.IGNORE_MODIFIER_COMBOS and
+                bool(self._pressed_modifiers))
+
+    def _key_event(self, keycode, now):
+        if self._is_ignored(keycode):
+            return False
+        self._last_activity = now
+        if not self.typing:
+            self.typing = True
+            self._current_idle_time = self._estimate_idle_time()
+            return True
+        return False
+
+    def _estimate_idle_time(self):
+        if self.estimator is not None:
+            estimate = self.estimator.estimate()
+            if estimate is not None:
+                return estimate
+        return self.idle_time
+
+    def key_pressed(self, keycode, now, repeat=False):
+        """
+        Process the press of the key with the given ``keycode`` at the time
+        ``now``.  ``repeat`` is ``True``, if the press was generated by
+        keyboard autorepeat.
+
+        Return ``True``, if typing started with this key, ``False``
+        otherwise.
+        """
+        if keycode in self.modifiers:
+            self._pressed_modifiers.add(keycode)
+        if (self.estimator is not None and not repeat and
+            not self._is_ignored(keycode)):
+            if self._last_press is not None:
+                self.estimator.add_interval(now - self._last_press)
+            self._last_press = now
+        return self._key_event(keycode, now)
+
+    def key_released(self, keycode, now):
+        """
+        Process the release of the key with the given ``keycode`` at the
+        time ``now``.
+
+        Return ``True``, if typing started with this key, ``False``
+        otherwise.
+        """
+        self._pressed_modifiers.discard(keycode)
+        return self._key_event(keycode, now)
+
+    def timeout(self, now):
+        """
+        Get the time left from ``now``, until typing is considered stopped.
+
+        Return the time in seconds, or ``None``, if the user is not typing.
+        """
+        if not self.typing:
+            return None
+        return max(self._last_activity + self._current_idle_time - now, 0)
+
+    def check_idle(self, now):
+        """
+        Check, whether typing stopped at the time ``now``.
+
+        Return ``True``, if typing stopped, ``False`` otherwise.
+        """
+        if self.typing and self.timeout(now) == 0:
+            self.typing = False
+            return True
+        return False
+
+    def reset(self):
+        """
+        Forget all pressed keys, and stop typing.
+        """
+        self.typing = False
+        self._last_press = None
+        self._pressed_modifiers.clear()
+
+
 class EventRecorder(QThread):
     """
     A thread to record keyboard events.
 
     Once started, this thread connects to the X11 display, and records all
-    keyboard events.  On every keyboard event, the :attr:`keyboardEvent` signal
-    is emitted.
+    keyboard events.  The events are passed to a :class:`KeyActivityFilter`
+    inside this thread, and only the start and the end of typing are
+    signalled with :attr:`typingStarted` and :attr:`typingStopped`.
 
     Use :meth:`stop()` to stop recording.
     """
 
-    #: Qt signal emitted whenever a key was pressed.  Has a single argument,
-    #: which is the key code of the pressed key
-    keyPressed = pyqtSignal(int)
-    #: Qt signal emitted whenever a key was released.  Has a single argument,
-    #: which is the key code of the pressed key
-    keyReleased = pyqtSignal(int)
+    #: Qt signal emitted, if typing started.  Has no arguments.
+    typingStarted = pyqtSignal()
+    #: Qt signal emitted, if typing stopped.  Has no arguments.
+    typingStopped = pyqtSignal()
 
-    def __init__(self, parent=None):
+    def __init__(self, activity_filter, parent=None):
+        """
+        Create a new recorder, which feeds the given ``activity_filter``.
+
+        ``activity_filter`` is a :class:`KeyActivityFilter`.
+        """
         QThread.__init__(self, parent)
-        # to synchronize startup
-        self._started = Event()
+        self.activity_filter = activity_filter
         # XXX: dirty hack: ctypes insists on a per-instance reference to the
         # event handling callback, otherwise "self" is garbage in the event
         # handler, and access to "self" causes a segfault.  Reason is unknown
         # to me.
         self._callback = self._handle_event
-        # maps event types to signals
-        self._event_signal_map = {xlib.KEY_PRESS: self.keyPressed,
-                                  xlib.KEY_RELEASE: self.keyReleased}
+        # written to by stop() to wake up the recording loop, only open
+        # between start() and stop()
+        self._wakeup_read = self._wakeup_write = None
+        self._stopping = False
+
+    def start(self):
+        """
+        Start recording.
+        """
+        # the thread may have terminated on its own without being stopped
+        self._close_wakeup_pipe()
+        self._stopping = False
+        self._wakeup_read, self._wakeup_write = os.pipe()
+        QThread.start(self)
+
+    def _close_wakeup_pipe(self):
+        if self._wakeup_read is not None:
+            os.close(self._wakeup_read)
+            os.close(self._wakeup_write)
+            self._wakeup_read = self._wakeup_write = None
 
     def run(self):
-        # create a special display connection for recording
-        with Display.from_name() as recording_display:
-            # record all key presses and releases, as these events indicate
-            # keyboard activity
-            key_events = (xlib.KEY_PRESS, xlib.KEY_RELEASE)
-            with xrecord.context(recording_display, xrecord.ALL_CLIENTS,
-                                 device_events=key_events) as context:
-                self._context = context
-                # create the recording context and enable it.  This function
-                # does not return until disable_context is called, which
-                # happens in stop.
-                xrecord.enable_context(recording_display, context,
-                                       self._callback, None)
+        # create a control connection for the context, and a special display
+        # connection for recording
+        with Display.from_name() as control_display:
+            with Display.from_name() as recording_display:
+                # record all key presses and releases, as these events
+                # indicate keyboard activity
+                key_events = (xlib.KEY_PRESS, xlib.KEY_RELEASE)
+                with xrecord.context(control_display, xrecord.ALL_CLIENTS,
+                                     device_events=key_events) as context:
+                    # make sure, that the context exists, before it is
+                    # enabled on the other connection
+                    xlib.sync(control_display, False)
+                    callback = xrecord.enable_context_async(
+                        recording_display, context, self._callback, None)
+                    try:
+                        self._record(recording_display)
+                    finally:
+                        xrecord.disable_context(control_display, context)
+                        xlib.sync(control_display, False)
+                        del callback
+
+    def _record(self, recording_display):
+        """
+        Process recorded data from ``recording_display``, and check for the
+        end of typing, until :meth:`stop()` is called.
+        """
+        connection = xlib.connection_number(recording_display)
+        while not self._stopping:
+            timeout = self.activity_filter.timeout(time())
+            readable, _, _ = select([connection, self._wakeup_read], [], [],
+                                    timeout)
+            if self._wakeup_read in readable:
+                os.read(self._wakeup_read, 1)
+            if connection in readable:
+                xrecord.process_replies(recording_display)
+            if self.activity_filter.check_idle(time()):
+                self.typingStopped.emit()
 
     def stop(self):
         """
-        Stop this recorder.
+        Stop this recorder, and wait for the thread to terminate.
         """
-        if not self.isRunning():
-            return
-        self._started.wait()
-        xrecord.disable_context(Display.from_qt(), self._context)
-        # immediately process the end of data event.  This allows us to wait
-        # for this thread to terminate in the next line, thus making this
-        # method synchronous.
-        QApplication.instance().processEvents()
-        self.wait()
-        self._started.clear()
+        if self.isRunning():
+            self._stopping = True
+            os.write(self._wakeup_write, b'\0')
+            self.wait()
+        self._close_wakeup_pipe()
 
     def _handle_event(self, _, data):
         with scoped_pointer(data, xrecord.free_data):
-            if data.contents.category == xrecord.START_OF_DATA:
-                # the recorder has started
-                self._started.set()
-            elif data.contents.category == xrecord.FROM_SERVER:
-                event_type, keycode = data.contents.event
-                signal = self._event_signal_map.get(event_type)
-                if signal is not None:
-                    signal.emit(keycode)
-            # all other client side events are ignored (e.g. END_OF_DATA)
+            if data.contents.category != xrecord.FROM_SERVER:
+                # all other client side events are ignored (e.g.
+                # START_OF_DATA)
+                return
+            event_type, keycode = data.contents.event
+            if event_type == xlib.KEY_PRESS:
+                started = self.activity_filter.key_pressed(keycode, time())
+            elif event_type == xlib.KEY_RELEASE:
+                started = self.activity_filter.key_released(keycode, time())
+            else:
+                started = False
+            if started:
+                self.typingStarted.emit()
 
 
 class RecordingKeyboardMonitor(AbstractKeyboardMonitor):
     """
     Monitor the keyboard by recording X11 protocol data.
+
+    Key events are filtered in the recording thread, so that only the start
+    and the end of typing are signalled to the GUI thread.
     """
 
     def __init__(self, parent=None):
         AbstractKeyboardMonitor.__init__(self, parent)
         self.display = Display.from_qt()
-        # this timer is started on every keyboard event, its timeout signals,
-        # that the keyboard is to be considered inactive again
-        self._idle_timer = QTimer(self)
-        self._idle_timer.setInterval(self.DEFAULT_IDLETIME)
-        self._idle_timer.timeout.connect(self.typingStopped)
-        self._idle_timer.setSingleShot(True)
+        self._modifier_mapping = ModifierMapping.for_display(self.display)
+        self._modifier_mapping.changed.connect(self._modifiers_changed)
+        self._filter = KeyActivityFilter(self._modifier_mapping.modifiers)
+        self._typing = False
         # this object records events
-        self._recorder = EventRecorder(self)
-        self._recorder.keyPressed.connect(self._key_pressed)
-        self._recorder.keyReleased.connect(self._key_released)
+        self._recorder = EventRecorder(self._filter, self)
+        self._recorder.typingStarted.connect(self._typing_started)
+        self._recorder.typingStopped.connect(self._typing_stopped)
         self._recorder.started.connect(self.started)
         self._recorder.finished.connect(self.stopped)
-        # a set of all known modifier keycodes
-        modifier_mapping = xlib.get_modifier_mapping(self.display)
-        self._modifiers = frozenset(keycode for modifiers in modifier_mapping
-                                    for keycode in modifiers if keycode != 0)
-        # a set holding all pressed, but not yet released modifier keys
-        self._pressed_modifiers = set()
-        # the value of keys to ignore
-        self._keys_to_ignore = self.IGNORE_NO_KEYS
-
-    def _is_ignored_modifier(self, keycode):
-        """
-        Return ``True``, if ``keycode`` as a modifier key, which has to be
-        ignored, ``False`` otherwise.
-        """
-        return (self._keys_to_ignore >= self.IGNORE_MODIFIER_KEYS and
-                keycode in self._modifiers)
 
-    def _is_ignored_modifier_combo(self):
-        """
-        Return ``True``, if the current key event occurred in combination
-        with a modifier, which has to be ignored, ``False`` otherwise.
-        """
-        return (self._keys_to_ignore == self.IGNORE_MODIFIER_COMBOS and
-                self._pressed_modifiers)
-
-    def _is_ignored(self, keycode):
-        """
-        Return ``True``, if the given ``keycode`` has to be ignored,
-        ``False`` otherwise.
-        """
-        return (self._is_ignored_modifier(keycode) or
-                self._is_ignored_modifier_combo())
+    def _typing_started(self):
+        # ignore signals, which were still queued, when the recorder stopped
+        if self.is_running:
+            self._typing = True
+            self.typingStarted.emit()
 
-    def _key_pressed(self, keycode):
-        if keycode in self._modifiers:
-            self._pressed_modifiers.add(keycode)
-        if not self._is_ignored(keycode):
-            if not self.keyboard_active:
-                self.typingStarted.emit()
-            # reset the idle timeout
-            self._idle_timer.start()
+    def _typing_stopped(self):
+        if self.is_running:
+            self._typing = False
+            self.typingStopped.emit()
 
-    def _key_released(self, keycode):
-        self._pressed_modifiers.discard(keycode)
-        if not self._is_ignored(keycode):
-            if not self.keyboard_active:
-                self.typingStarted.emit()
-            # reset the idle timeout
-            self._idle_timer.start()
+    def _modifiers_changed(self):
+        # replacing the set is atomic, so the recorder thread sees either the
+        # old or the new modifiers
+        self._filter.modifiers = self._modifier_mapping.modifiers
 
     @property
     def is_running(self):
@@ -313,60 +677,382 @@ class RecordingKeyboardMonitor(AbstractKeyboardMonitor):
         self._recorder.start()
 
     def stop(self):
+        self._recorder.stop()
+        self._filter.reset()
+        self._typing = False
         AbstractKeyboardMonitor.stop(self)
+
+    @property
+    def keys_to_ignore(self):
+        return self._filter.keys_to_ignore
+
+    @keys_to_ignore.setter
+    def keys_to_ignore(self, value):
+        if not (self.IGNORE_NO_KEYS <= value <= self.IGNORE_MODIFIER_COMBOS):
+            raise ValueError('unknown constant for keys_to_ignore')
+        self._filter.keys_to_ignore = value
+
+    @property
+    def idle_time(self):
+        return self._filter.idle_time
+
+    @idle_time.setter
+    def idle_time(self, value):
+        self._filter.idle_time = value
+
+    @property
+    def adaptive_idle_time(self):
+        return self._filter.estimator is not None
+
+    @adaptive_idle_time.setter
+    def adaptive_idle_time(self, enabled):
+        self._filter.estimator = self.idle_time_estimator if enabled else None
+
+    @property
+    def keyboard_active(self):
+        return self._typing
+
+
+class _FilteringKeyboardMonitor(AbstractKeyboardMonitor):
+    """
+    Base class for keyboard monitors, which receive key events in the GUI
+    thread.
+
+    Key events are passed to :meth:`_key_event()` and filtered with a
+    :class:`KeyActivityFilter`.  Once all pending events are processed,
+    subclasses call :meth:`_events_processed()`, which starts a single-shot
+    timer to check for the end of typing.
+    """
+
+    def __init__(self, parent=None):
+        AbstractKeyboardMonitor.__init__(self, parent)
+        self.display = Display.from_qt()
+        self._modifier_mapping = ModifierMapping.for_display(self.display)
+        self._modifier_mapping.changed.connect(self._modifiers_changed)
+        self._filter = KeyActivityFilter(self._modifier_mapping.modifiers)
+        # fires, once the user may have stopped typing
+        self._idle_timer = QTimer(self)
+        self._idle_timer.setSingleShot(True)
+        self._idle_timer.timeout.connect(self._check_idle)
+
+    def stop(self):
         self._idle_timer.stop()
-        self._recorder.stop()
+        self._filter.reset()
+        AbstractKeyboardMonitor.stop(self)
+
+    def _modifiers_changed(self):
+        self._filter.modifiers = self._modifier_mapping.modifiers
+
+    def _key_event(self, keycode, pressed, repeat=False):
+        """
+        Process the press or release of the key with the given ``keycode``.
+
+        ``repeat`` is ``True``, if the press was generated by keyboard
+        autorepeat.
+        """
+        if pressed:
+            started = self._filter.key_pressed(keycode, time(), repeat)
+        else:
+            started = self._filter.key_released(keycode, time())
+        if started:
+            self.typingStarted.emit()
+
+    def _events_processed(self):
+        if not self._idle_timer.isActive():
+            self._start_idle_timer()
+
+    def _start_idle_timer(self):
+        """
+        Start the idle timer for the time left until typing is considered
+        stopped, if the user is typing.
+        """
+        timeout = self._filter.timeout(time())
+        if timeout is not None:
+            self._idle_timer.start(int(ceil(timeout * 1000)))
+
+    def _check_idle(self):
+        if self._filter.check_idle(time()):
+            self.typingStopped.emit()
+        else:
+            # keys were pressed since the timer was started
+            self._start_idle_timer()
 
     @property
     def keys_to_ignore(self):
-        return self._keys_to_ignore
+        return self._filter.keys_to_ignore
 
     @keys_to_ignore.setter
     def keys_to_ignore(self, value):
         if not (self.IGNORE_NO_KEYS <= value <= self.IGNORE_MODIFIER_COMBOS):
             raise ValueError('unknown constant for keys_to_ignore')
-        self._keys_to_ignore = value
+        self._filter.keys_to_ignore = value
 
     @property
     def idle_time(self):
-        return self._idle_timer.interval() / 1000
+        return self._filter.idle_time
 
     @idle_time.setter
     def idle_time(self, value):
-        self._idle_timer.setInterval(int(value * 1000))
+        self._filter.idle_time = value
+
+    @property
+    def adaptive_idle_time(self):
+        return self._filter.estimator is not None
+
+    @adaptive_idle_time.setter
+    def adaptive_idle_time(self, enabled):
+        self._filter.estimator = self.idle_time_estimator if enabled else None
 
     @property
     def keyboard_active(self):
-        return self._idle_timer.isActive()
+        return self._filter.typing
+
+
+class RawEventKeyboardMonitor(_FilteringKeyboardMonitor):
+    """
+    Monitor the keyboard by means of XInput 2 raw key events.
+
+    Key events are read from a
+    :class:`~synaptiks.x11.events.RawKeyEventSource`, whose display
+    connection is watched by a :class:`~PyQt4.QtCore.QSocketNotifier` in the
+    GUI thread.  Unlike :class:`RecordingKeyboardMonitor`, this monitor
+    neither needs the XRecord extension nor a separate thread.
+
+    The ids of all :attr:`ignored_keyboards` are looked up on the first key
+    event after a change of the device hierarchy.
+    """
+
+    def __init__(self, parent=None):
+        _FilteringKeyboardMonitor.__init__(self, parent)
+        self._source = None
+        self._notifier = None
+        # the ids of all ignored keyboards, or None, if unknown
+        self._ignored_ids = None
+
+    @property
+    def is_running(self):
+        return self._source is not None
+
+    def start(self):
+        if self.is_running:
+            return
+        self._source = RawKeyEventSource()
+        self._source.add_listener(self._handle_event)
+        self._notifier = QSocketNotifier(
+            self._source.fileno(), QSocketNotifier.Read, self)
+        self._notifier.activated.connect(self._process_events)
+        self.started.emit()
+
+    def stop(self):
+        if not self.is_running:
+            return
+        self._notifier.setEnabled(False)
+        self._notifier.deleteLater()
+        self._notifier = None
+        self._source.close()
+        self._source = None
+        _FilteringKeyboardMonitor.stop(self)
+        self.stopped.emit()
+
+    def _process_events(self):
+        self._source.process_events()
+        self._events_processed()
+
+    def _handle_event(self, event):
+        if isinstance(event, HierarchyEvent):
+            self._ignored_ids = None
+            return
+        if self._ignored_keyboards:
+            if self._ignored_ids is None:
+                self._ignored_ids = self._find_ignored_ids()
+            if event.sourceid in self._ignored_ids:
+                return
+        self._key_event(event.keycode, event.pressed, event.repeat)
+
+    def _find_ignored_ids(self):
+        """
+        Return a frozenset with the ids of all ignored keyboards.
+        """
+        snapshots = DeviceSnapshot.query(self.display)
+        return frozenset(deviceid for deviceid, snapshot
+                         in snapshots.iteritems()
+                         if snapshot.name in self._ignored_keyboards)
+
+    def _ignored_keyboards_changed(self):
+        self._ignored_ids = None
+
+
+def _is_keyboard(device):
+    return (device.sys_name.startswith('event') and
+            device.get('ID_INPUT_KEYBOARD') == '1')
+
+
+def _keyboard_name(device):
+    # like in MouseDevice.from_udev(), the name is available from the parent
+    # device, which represents the physical device
+    return device.parent.get('NAME', '').strip('"')
+
+
+class EvdevKeyboardMonitor(_FilteringKeyboardMonitor):
+    """
+    Monitor the keyboard by reading key events from the evdev event devices
+    of all keyboards.
+
+    Keyboards are found with :mod:`pyudev`, and key events are read from an
+    :class:`~synaptiks.monitors.evdev.EvdevKeyEventSource`, which is watched
+    by a :class:`~PyQt4.QtCore.QSocketNotifier` in the GUI thread.  This
+    monitor does not depend on the X server for keyboard monitoring, but
+    requires read access to the event devices.  Keyboards, which cannot be
+    opened, are ignored.
+
+    :attr:`ignored_keyboards` are not opened at all.
+    """
+
+    def __init__(self, parent=None):
+        _FilteringKeyboardMonitor.__init__(self, parent)
+        self._udev = pyudev.Context()
+        self._source = None
+        self._notifier = None
+        self._observer = None
+
+    @property
+    def is_running(self):
+        return self._source is not None
+
+    def start(self):
+        if self.is_running:
+            return
+        self._source = EvdevKeyEventSource()
+        self._source.add_listener(self._handle_event)
+        self._observer = QUDevMonitorObserver(
+            pyudev.Monitor.from_netlink(self._udev), self)
+        self._observer.deviceEvent.connect(self._handle_udev_event)
+        self._observer.monitor.filter_by('input')
+        self._observer.monitor.start()
+        self._open_keyboards()
+        self._notifier = QSocketNotifier(
+            self._source.fileno(), QSocketNotifier.Read, self)
+        self._notifier.activated.connect(self._process_events)
+        self.started.emit()
+
+    def stop(self):
+        if not self.is_running:
+            return
+        self._notifier.setEnabled(False)
+        self._notifier.deleteLater()
+        self._notifier = None
+        self._observer.deviceEvent.disconnect(self._handle_udev_event)
+        self._observer.deleteLater()
+        self._observer = None
+        self._source.close()
+        self._source = None
+        _FilteringKeyboardMonitor.stop(self)
+        self.stopped.emit()
+
+    def _open_keyboards(self):
+        """
+        Open all plugged keyboards, which are not ignored.
+        """
+        devices = self._udev.list_devices(
+            subsystem='input', ID_INPUT_KEYBOARD=True)
+        for device in ifilter(_is_keyboard, devices):
+            self._open_device(device)
+
+    def _open_device(self, device):
+        if _keyboard_name(device) in self._ignored_keyboards:
+            return
+        if device.device_node in self._source.devices:
+            # reported by udev, while all keyboards were opened
+            return
+        try:
+            self._source.open_device(device.device_node)
+        except EnvironmentError:
+            # most likely the user may not read this device
+            pass
+
+    def _ignored_keyboards_changed(self):
+        if self.is_running:
+            for name in self._source.devices:
+                self._source.remove_device(name)
+            self._open_keyboards()
+
+    def _handle_udev_event(self, evt, device):
+        if not _is_keyboard(device):
+            return
+        evt = unicode(evt)
+        if evt == 'add':
+            self._open_device(device)
+        elif evt == 'remove':
+            try:
+                self._source.remove_device(device.device_node)
+            except KeyError:
+                # already closed upon read
+                pass
+
+    def _process_events(self):
+        self._source.process_events()
+        self._events_processed()
+
+    def _handle_event(self, event):
+        self._key_event(event.keycode, event.pressed, event.repeat)
 
 
 class PollingKeyboardMonitor(AbstractKeyboardMonitor):
     """
     Monitor the keyboard for state changes by constantly polling the keyboard.
+
+    The polling interval adapts to the keyboard activity:  After a key
+    press, the keyboard is polled every :attr:`MINIMUM_POLLDELAY`
+    milliseconds.  While no key is pressed, the interval is doubled on every
+    poll, up to :attr:`DEFAULT_POLLDELAY` milliseconds while the user is
+    typing, and up to :attr:`MAXIMUM_POLLDELAY` milliseconds after typing
+    stopped.  An idle keyboard is thus polled only a quarter as often as
+    with a fixed interval.
+
+    Key presses shorter than the polling interval may be missed, if no
+    other key is held down at the next poll.  While typing, the interval
+    never exceeds the default, so that short taps are detected as reliably
+    as with a fixed interval.  After typing stopped, typing is detected at
+    most :attr:`MAXIMUM_POLLDELAY` milliseconds after the first key press,
+    which is held down for a poll, that is at most 600 milliseconds later
+    than with a fixed interval.
     """
 
     #: default polling interval
     DEFAULT_POLLDELAY = 200
+    #: polling interval after keyboard activity
+    MINIMUM_POLLDELAY = 100
+    #: polling interval, to which the interval grows after typing stopped
+    MAXIMUM_POLLDELAY = 800
     #: size of the X11 keymap array
     _KEYMAP_SIZE = 32
 
     def __init__(self, parent=None):
         AbstractKeyboardMonitor.__init__(self, parent)
+        self.display = Display.from_qt()
         self._keyboard_was_active = False
-        self._old_keymap = array(b'B', b'\0' * 32)
+        # the keymap is queried into this buffer on every poll
+        self._keymap_buffer = create_string_buffer(self._KEYMAP_SIZE)
+        self._old_keymap = 0
         self._keyboard_timer = QTimer(self)
         self._keyboard_timer.timeout.connect(self._check_keyboard_activity)
         self._keyboard_timer.setInterval(self.DEFAULT_POLLDELAY)
         self._activity = QTime()
         self._keys_to_ignore = self.IGNORE_NO_KEYS
+        self._modifier_mapping = ModifierMapping.for_display(self.display)
+        self._modifier_mapping.changed.connect(self._modifiers_changed)
         self._keymap_mask = self._setup_mask()
         self._idle_time = self.DEFAULT_IDLETIME
+        self._adaptive_idle_time = False
+        # the idle time of the current typing
+        self._current_idle_time = self._idle_time
 
     @property
     def is_running(self):
         return self._keyboard_timer.isActive()
 
     def start(self):
+        self._keyboard_timer.setInterval(self.DEFAULT_POLLDELAY)
         self._keyboard_timer.start()
         self.started.emit()
 
@@ -394,48 +1080,80 @@ class PollingKeyboardMonitor(AbstractKeyboardMonitor):
     def idle_time(self, value):
         self._idle_time = int(value * 1000)
 
-    def _setup_mask(self):
-        mask = array(b'B', b'\xff' * 32)
-        if self._keys_to_ignore >= self.IGNORE_MODIFIER_KEYS:
-            modifier_mappings = xlib.get_modifier_mapping(self.display)
-            for modifier_keys in modifier_mappings:
-                for keycode in modifier_keys:
-                    mask[keycode // 8] &= ~(1 << (keycode % 8))
-        return mask
-
     @property
-    def keyboard_active(self):
-        is_active = False
+    def adaptive_idle_time(self):
+        return self._adaptive_idle_time
+
+    @adaptive_idle_time.setter
+    def adaptive_idle_time(self, enabled):
+        self._adaptive_idle_time = enabled
 
-        _, raw_keymap = xlib.query_keymap(self.display)
-        keymap = array(b'B', raw_keymap)
+    def _estimate_idle_time(self):
+        """
+        Get the idle time for the current typing in milliseconds.
+        """
+        if self._adaptive_idle_time:
+            estimate = self.idle_time_estimator.estimate()
+            if estimate is not None:
+                return int(estimate * 1000)
+        return self._idle_time
+
+    def _setup_mask(self):
+        """
+        Return a 256 bit integer mask of all keys, which are not ignored.
+        """
+        if self._keys_to_ignore >= self.IGNORE_MODIFIER_KEYS:
+            return self._modifier_mapping.non_modifier_mask
+        return ALL_KEYS
 
-        is_active = keymap != self._old_keymap
-        for new_state, old_state, mask in izip(keymap, self._old_keymap,
-                                               self._keymap_mask):
-            is_active = new_state & ~old_state & mask
-            if is_active:
-                break
+    def _modifiers_changed(self):
+        self._keymap_mask = self._setup_mask()
 
-        if self._keys_to_ignore == self.IGNORE_MODIFIER_COMBOS:
-            for state, mask in izip(keymap, self._keymap_mask):
-                if state & ~mask:
-                    is_active = False
-                    break
+    @classmethod
+    def _next_poll_delay(cls, delay, active, typing):
+        """
+        Get the polling interval following the given ``delay``, if the
+        keyboard was ``active`` at the last poll, and the user is ``typing``.
+        """
+        if active:
+            return cls.MINIMUM_POLLDELAY
+        limit = cls.DEFAULT_POLLDELAY if typing else cls.MAXIMUM_POLLDELAY
+        return min(delay * 2, limit)
 
+    @property
+    def keyboard_active(self):
+        _, raw_keymap = xlib.query_keymap(self.display, self._keymap_buffer)
+        keymap = keymap_to_int(raw_keymap)
+        # newly pressed keys, which are not ignored
+        is_active = bool(keymap & ~self._old_keymap & self._keymap_mask)
+        if (is_active and
+            self._keys_to_ignore == self.IGNORE_MODIFIER_COMBOS and
+            keymap & ~self._keymap_mask):
+            # a modifier is pressed
+            is_active = False
         self._old_keymap = keymap
         return is_active
 
     def _check_keyboard_activity(self):
-        if self.keyboard_active:
+        is_active = self.keyboard_active
+        if is_active:
+            if self._adaptive_idle_time and self._activity.isValid():
+                # the interval is only accurate up to the polling interval
+                self.idle_time_estimator.add_interval(
+                    self._activity.elapsed() / 1000)
             self._activity.start()
             if not self._keyboard_was_active:
                 self._keyboard_was_active = True
+                self._current_idle_time = self._estimate_idle_time()
                 self.typingStarted.emit()
-        elif self._activity.elapsed() > self._idle_time and \
+        elif self._activity.elapsed() > self._current_idle_time and \
                  self._keyboard_was_active:
             self._keyboard_was_active = False
             self.typingStopped.emit()
+        delay = self._next_poll_delay(self._keyboard_timer.interval(),
+                                      is_active, self._keyboard_was_active)
+        if delay != self._keyboard_timer.interval():
+            self._keyboard_timer.setInterval(delay)
 
 
 def create_keyboard_monitor(parent=None):
@@ -450,16 +1168,28 @@ def create_keyboard_monitor(parent=None):
     >>> monitor.start()
 
     This function automatically chooses the "best" available implementation.
-    Currently this means, that a :class:`RecordingKeyboardMonitor` is created,
-    if the XRecord extension is available.  Otherwise this functions falls back
-    to :class:`PollingKeyboardMonitor`.
+    Currently this means, that a :class:`RawEventKeyboardMonitor` is created,
+    if XInput 2.1 or newer is available.  Otherwise a
+    :class:`RecordingKeyboardMonitor` is created, if the XRecord extension is
+    available.  If neither is available, this functions falls back to
+    :class:`PollingKeyboardMonitor`.
 
     ``parent`` is the parent :class:`~PyQt4.QtCore.QObject`.
 
     Return an implementation of :class:`AbstractKeyboardMonitor`.
     """
+    display = Display.from_qt()
+    try:
+        # check the version on a private connection like the monitor does,
+        # because the Qt connection may already have announced XInput 2.0
+        with RawKeyEventSource(display.name):
+            pass
+    except (DisplayError, XInputVersionError):
+        pass
+    else:
+        return RawEventKeyboardMonitor(parent)
     if xrecord:
-        success, _ = xrecord.query_version(Display.from_qt())
+        success, _ = xrecord.query_version(display)
         if success:
             return RecordingKeyboardMonitor(parent)
     return PollingKeyboardMonitor(parent)
@@ -68,13 +68,53 @@ from __future__ import (print_function, division, unicode_literals,
 
 import math
 from functools import partial
-from collections import namedtuple
+from collections import namedtuple, OrderedDict
 
-from synaptiks.x11.input import InputDevice
+from synaptiks.util import load_json, save_json
+from synaptiks.x11 import ProtocolError
+from synaptiks.x11.input import InputDevice, InputDeviceNotFoundError
 
 
 PhysicalButtons = namedtuple('PhysicalButtons', 'left middle right')
 
+#: A device property in the plan of :meth:`Touchpad.property_plan()`.
+#:
+#: ``name`` is the name of the property, and ``type`` its type as string (see
+#: :attr:`device_property.PROPERTY_TYPES`).  ``attributes`` is a tuple of
+#: ``(attribute_name, descriptor)`` pairs of all :class:`device_property`
+#: attributes mapped to this property.
+PlannedProperty = namedtuple('PlannedProperty', 'name type attributes')
+
+
+class TouchpadHardwareInfo(namedtuple(
+    '_TouchpadHardwareInfo', 'capabilities buttons finger_detection '
+    'has_pressure_detection has_finger_width_detection '
+    'has_two_finger_emulation')):
+    """
+    The hardware capabilities of a touchpad, as derived from the
+    ``'Synaptics Capabilities'`` property.
+
+    See the attributes of the same names of :class:`Touchpad` for a
+    description of the components.  ``capabilities`` is a tuple.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def from_capabilities(cls, capabilities):
+        """
+        Create the hardware info from the given ``capabilities``, which is a
+        sequence with the items of the ``'Synaptics Capabilities'``
+        property.
+        """
+        capabilities = tuple(map(bool, capabilities))
+        return cls(capabilities=capabilities,
+                   buttons=PhysicalButtons(*capabilities[0:3]),
+                   finger_detection=sum(capabilities[3:5], 1),
+                   has_pressure_detection=capabilities[5],
+                   has_finger_width_detection=capabilities[6],
+                   has_two_finger_emulation=all(capabilities[5:7]))
+
 
 class device_property(object):
     """
@@ -103,17 +143,32 @@ class device_property(object):
     def __get__(self, obj, owner=None):
         if obj is None:
             return self
-        values = obj[self.property_name]
-        if self.property_type == 'bool':
-            values = map(bool, values)
-        return self.convert_from_property(values[self.item])
+        return self.from_values(obj.get_value(self.property_name))
 
     def __set__(self, obj, value):
         values = obj[self.property_name]
-        values[self.item] = self.convert_to_property(value)
+        self.update_values(values, value)
         set_property = getattr(obj, 'set_{0}'.format(self.property_type))
         set_property(self.property_name, values)
 
+    def from_values(self, values):
+        """
+        Get the value of this attribute from the given ``values``, which is a
+        sequence of all items of the property.
+        """
+        # only decode the single item we need
+        value = values[self.item]
+        if self.property_type == 'bool':
+            value = bool(value)
+        return self.convert_from_property(value)
+
+    def update_values(self, values, value):
+        """
+        Store the given ``value`` of this attribute in the given ``values``,
+        which is a list of all items of the property.
+        """
+        values[self.item] = self.convert_to_property(value)
+
     def convert_from_property(self, value):
         """
         Convert the given ``value`` from the actual property value.
@@ -157,28 +212,202 @@ class Touchpad(InputDevice):
         Return an iterator over all :class:`Touchpad` objects present on this
         system.
 
+        The atoms of all :meth:`property_names()` are interned with a single
+        request beforehand.
+
         Raise :exc:`synaptiks.x11.input.XInputVersionError`, if the XInput
         version isn't sufficient to support input device management.
         """
+        display.intern_atoms(cls.property_names())
         return cls.find_devices_with_property(display, 'Synaptics Off')
 
+    #: Names of properties used by this class in addition to those of
+    #: :class:`device_property` attributes
+    EXTRA_PROPERTY_NAMES = frozenset(['Synaptics Capabilities'])
+
+    # a tuple (hierarchy_serial, hardware_info), see hardware_info
+    _hardware_info = None
+
     @classmethod
-    def find_first(cls, display):
+    def property_plan(cls):
+        """
+        Get the plan of all :class:`device_property` attributes of this class,
+        grouped by the underlying device property.
+
+        Return an ordered dictionary mapping property names to
+        :class:`PlannedProperty` objects.  The plan is computed only once
+        per class.
+        """
+        plan = cls.__dict__.get('_property_plan')
+        if plan is None:
+            attributes = OrderedDict()
+            for klass in reversed(cls.__mro__):
+                for attribute_name, attr in sorted(vars(klass).items()):
+                    if isinstance(attr, device_property):
+                        attributes[attribute_name] = attr
+            grouped = OrderedDict()
+            for attribute_name, attr in attributes.iteritems():
+                grouped.setdefault(attr.property_name, []).append(
+                    (attribute_name, attr))
+            plan = OrderedDict(
+                (name, PlannedProperty(name, attrs[0][1].property_type,
+                                       tuple(attrs)))
+                for name, attrs in grouped.iteritems())
+            cls._property_plan = plan
+        return plan
+
+    @classmethod
+    def property_names(cls):
+        """
+        Get the names of all properties used by this class.
+
+        Return a frozenset with all property names.
+        """
+        return frozenset(cls.EXTRA_PROPERTY_NAMES).union(cls.property_plan())
+
+    def read_all(self, names=None):
+        """
+        Read all :class:`device_property` attributes of this touchpad.
+
+        If ``names`` is given, only the device properties behind the
+        attributes with these names are read, so that properties not
+        supported by the driver do not matter for other attributes.
+
+        Each underlying device property is read only once, and all of them
+        are fetched with a single request.
+
+        Return a dictionary mapping attribute names to values.  If ``names``
+        is given, the dictionary also contains the other attributes of the
+        read properties.
+        """
+        planned_properties = self.property_plan().values()
+        if names is not None:
+            names = frozenset(names)
+            planned_properties = [
+                planned for planned in planned_properties
+                if any(a in names for a, _ in planned.attributes)]
+        result = {}
+        all_values = self.get_values([p.name for p in planned_properties])
+        for planned, values in zip(planned_properties, all_values):
+            for attribute_name, attr in planned.attributes:
+                result[attribute_name] = attr.from_values(values)
+        return result
+
+    def apply(self, mapping):
+        """
+        Set the :class:`device_property` attributes in the given
+        ``mapping``, which maps attribute names to new values.
+
+        Each underlying device property is read and written at most once.
+        All affected properties are read with a single request, and written
+        together in a :meth:`~synaptiks.x11.input.InputDevice.batch()`.
+
+        Raise :exc:`~exceptions.KeyError`, if ``mapping`` contains a key,
+        which is not a :class:`device_property` attribute.
+        """
+        plan = self.property_plan()
+        attribute_names = set(
+            attribute_name for planned in plan.itervalues()
+            for attribute_name, _ in planned.attributes)
+        for key in mapping:
+            if key not in attribute_names:
+                raise KeyError(key)
+        affected = [planned for planned in plan.itervalues()
+                    if any(a in mapping for a, _ in planned.attributes)]
+        if not affected:
+            return
+        all_values = self.get_values([p.name for p in affected])
+        with self.batch():
+            for planned, values in zip(affected, all_values):
+                values = list(values)
+                for attribute_name, attr in planned.attributes:
+                    if attribute_name in mapping:
+                        attr.update_values(values, mapping[attribute_name])
+                set_property = getattr(
+                    self, 'set_{0}'.format(planned.type))
+                set_property(planned.name, values)
+
+    @classmethod
+    def find_first(cls, display, cache_filename=None):
         """
         Find the first usable touchpad device on this system and return it as
         :class:`Touchpad` object.
 
         ``display`` is a :class:`~synaptiks.x11.Display` object.
 
+        ``cache_filename`` is either ``None`` or a string containing the path
+        to a discovery cache file (see
+        :func:`~synaptiks.config.get_touchpad_discovery_cache_path`).  If
+        given, the touchpad remembered in this file is probed first, and all
+        devices are only scanned, if this touchpad is gone, or has a different
+        name or product id now.  The touchpad found by a scan is remembered
+        in the file.
+
         Raise :exc:`NoTouchpadError`, if no touchpad was found.  Raise
         :exc:`synaptiks.x11.input.XInputVersionError`, if the XInput version isn't
         sufficient to support input device management.
         """
-        touchpad = next(cls.find_all(display), None)
+        touchpad = None
+        if cache_filename:
+            try:
+                entry = load_json(cache_filename, default={})
+            except (EnvironmentError, ValueError):
+                entry = {}
+            if entry:
+                touchpad = cls._probe_cached_touchpad(display, entry)
         if touchpad is None:
-            raise NoTouchpadError()
+            touchpad = next(cls.find_all(display), None)
+            if touchpad is None:
+                raise NoTouchpadError()
+            if cache_filename:
+                touchpad._save_discovery_entry(cache_filename)
         return touchpad
 
+    @classmethod
+    def _probe_cached_touchpad(cls, display, entry):
+        """
+        Probe the touchpad remembered in the given discovery cache ``entry``,
+        which is a dictionary with the keys ``'id'``, ``'name'`` and
+        ``'product_id'``.
+
+        The device is queried, and its product id is read together with
+        ``'Synaptics Off'`` in a single request.
+
+        Return a :class:`Touchpad` object, if the device still exists, is a
+        touchpad, and has the remembered name and product id.  Otherwise
+        return ``None``.
+        """
+        try:
+            touchpad = cls(display, entry['id'])
+            with display.trap_errors():
+                name = touchpad.name
+                product_id, _ = touchpad.get_values(
+                    ['Device Product ID', 'Synaptics Off'])
+        except (KeyError, TypeError, InputDeviceNotFoundError, ProtocolError):
+            return None
+        if (name != entry.get('name') or
+            product_id.tolist() != entry.get('product_id')):
+            return None
+        return touchpad
+
+    def _save_discovery_entry(self, filename):
+        """
+        Remember this touchpad in the discovery cache file with the given
+        ``filename``.
+
+        Nothing is saved, if this touchpad has no product id.  Failures to
+        write the file are ignored, the cache is merely an optimization.
+        """
+        try:
+            product_id = self.get_values(['Device Product ID'])[0].tolist()
+        except KeyError:
+            return
+        try:
+            save_json(filename, dict(id=self.id, name=self.name,
+                                     product_id=product_id))
+        except EnvironmentError:
+            pass
+
     off = device_property('Synaptics Off', 'byte', 0, """\
 Whether the touchpad is off or not.  Three valid values:
 
@@ -306,6 +535,25 @@ generate a single scroll event.
         """
         return self.coasting_speed != 0
 
+    @property
+    def hardware_info(self):
+        """
+        The hardware capabilities of this touchpad as
+        :class:`TouchpadHardwareInfo`.
+
+        The ``'Synaptics Capabilities'`` property is read on first access
+        only.  If the :attr:`~synaptiks.x11.Display.device_events` of the
+        display are used, the result is kept until the device hierarchy
+        changes, otherwise it is kept for the lifetime of this object (see
+        :attr:`~synaptiks.x11.Display.hierarchy_serial`).
+        """
+        serial = self.display.hierarchy_serial
+        if self._hardware_info is None or self._hardware_info[0] != serial:
+            info = TouchpadHardwareInfo.from_capabilities(
+                self['Synaptics Capabilities'])
+            self._hardware_info = (serial, info)
+        return self._hardware_info[1]
+
     @property
     def capabilities(self):
         """
@@ -322,7 +570,7 @@ generate a single scroll event.
         - the touchpad can detect the pressure of a touch
         - the touchpad can detect the width of a finger
         """
-        return map(bool, self['Synaptics Capabilities'])
+        return list(self.hardware_info.capabilities)
 
     @property
     def finger_detection(self):
@@ -330,8 +578,7 @@ generate a single scroll event.
         The number of fingers, this touchpad can independently detect upon a
         touch, as integer.
         """
-        finger_capabilities = self.capabilities[3:5]
-        return sum(finger_capabilities, 1)
+        return self.hardware_info.finger_detection
 
     @property
     def buttons(self):
@@ -346,7 +593,7 @@ generate a single scroll event.
         Each component is ``True``, if the touchpad has this physical button,
         or ``False`` otherwise.
         """
-        return PhysicalButtons(*self.capabilities[0:3])
+        return self.hardware_info.buttons
 
     @property
     def has_pressure_detection(self):
@@ -354,7 +601,7 @@ generate a single scroll event.
         ``True``, if this touchpad can detect the pressure of a touch,
         ``False`` otherwise.
         """
-        return self.capabilities[5]
+        return self.hardware_info.has_pressure_detection
 
     @property
     def has_finger_width_detection(self):
@@ -362,7 +609,7 @@ generate a single scroll event.
         ``True``, if this touchpad can detect the width of a finger upon touch,
         ``False`` otherwise.
         """
-        return self.capabilities[6]
+        return self.hardware_info.has_finger_width_detection
 
     @property
     def has_two_finger_emulation(self):
@@ -375,4 +622,4 @@ generate a single scroll event.
         scrolling.  Some of these however can at least emulate this by
         detecting the width of a finger and the pressure upon a touch.
         """
-        return all(self.capabilities[5:7])
+        return self.hardware_info.has_two_finger_emulation
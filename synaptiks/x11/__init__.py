@@ -36,7 +36,9 @@
 from __future__ import (print_function, division, unicode_literals,
                         absolute_import)
 
-from ctypes import cast
+from collections import namedtuple
+from contextlib import contextmanager
+from ctypes import cast, c_void_p
 
 from synaptiks._bindings import xlib
 from synaptiks.util import ensure_byte_string, ensure_unicode_string
@@ -49,6 +51,37 @@ class DisplayError(EnvironmentError):
     pass
 
 
+#: A single protocol error reported by the X server.
+#:
+#: ``error_code`` is the integral error code, ``request_code`` and
+#: ``minor_code`` identify the failed request, ``resourceid`` is the resource
+#: the error refers to (if any), and ``serial`` is the serial number of the
+#: failed request.  ``description`` is a human-readable description of the
+#: error code as unicode string.
+ErrorEvent = namedtuple('ErrorEvent', 'error_code request_code minor_code '
+                        'resourceid serial description')
+
+
+class ProtocolError(EnvironmentError):
+    """
+    Raised if the X server reported errors for requests sent inside
+    :meth:`Display.trap_errors()`.
+
+    :attr:`errors` contains all reported errors as :class:`ErrorEvent`
+    objects, in the order in which they were reported.
+    """
+
+    def __init__(self, errors):
+        EnvironmentError.__init__(self, errors)
+        self.errors = errors
+
+    def __str__(self):
+        return '; '.join(
+            '{0.description} (error {0.error_code}, request '
+            '{0.request_code}.{0.minor_code})'.format(error)
+            for error in self.errors)
+
+
 class Display(object):
     """
     A X11 display connection.
@@ -69,11 +102,22 @@ class Display(object):
     function as ``Display*`` argument.
     """
 
+    # the wrapper of the Qt display connection returned by from_qt()
+    _qt_display = None
+
     def __init__(self, display_pointer):
         if not display_pointer:
             raise DisplayError()
         self._as_parameter_ = display_pointer
+        # two-way atom table, mapping byte names to Atom objects and integral
+        # atoms to unicode names
         self._atom_cache = {}
+        self._atom_names = {}
+        # byte names of atoms known not to exist, only maintained while
+        # device_events reports new properties
+        self._undefined_atoms = set()
+        self._device_events = None
+        self._property_index = None
         self.types = StandardTypes(self)
 
     @classmethod
@@ -99,8 +143,12 @@ class Display(object):
     @classmethod
     def from_qt(cls):
         """
-        Create and return a :class:`Display` object from the Qt display
-        connection, as available in :meth:`PyQt4.QtGui.QX11Info.display()`.
+        Get a :class:`Display` object for the Qt display connection, as
+        available in :meth:`PyQt4.QtGui.QX11Info.display()`.
+
+        The object is created on first use, and returned by all subsequent
+        calls, so that all users of the Qt connection share the atom cache,
+        the :attr:`property_index` and the :attr:`device_events`.
 
         Raise :exc:`~exceptions.DisplayError`, if no Qt display connection
         is available.  Raise :exc:`~exceptions.ImportError`, if either
@@ -113,12 +161,27 @@ class Display(object):
         if not display:
             raise DisplayError()
         display_address = sip.unwrapinstance(display)
-        return cls(cast(display_address, xlib.Display_p))
+        cached = cls._qt_display
+        if (type(cached) is not cls or not cached or
+            cast(cached._as_parameter_, c_void_p).value != display_address):
+            cached = cls(cast(display_address, xlib.Display_p))
+            cls._qt_display = cached
+        return cached
 
     def close(self):
         """
         Close this display connection.
+
+        If :attr:`device_events` was used, its private connection is closed,
+        too.  The :attr:`property_index` is dropped.
         """
+        if self._property_index:
+            self._property_index.close()
+            self._property_index = None
+        if self._device_events:
+            self._device_events.close()
+            self._device_events = None
+        self._undefined_atoms.clear()
         if self:
             xlib.close_display(self)
         self._as_parameter_ = None
@@ -130,12 +193,153 @@ class Display(object):
         """
         return bool(self._as_parameter_)
 
+    @property
+    def name(self):
+        """
+        The name of this display as unicode string (e.g. ``':0'``).
+        """
+        return ensure_unicode_string(xlib.display_string(self))
+
+    @property
+    def device_events(self):
+        """
+        An :class:`~synaptiks.x11.events.InputEventSource` for this display.
+
+        The event source is created on first access, and uses a private
+        connection to this display.  It is closed along with this display.
+        """
+        if self._device_events is None:
+            from synaptiks.x11.events import InputEventSource
+            self._device_events = InputEventSource(self.name)
+            self._device_events.add_listener(self._handle_device_event)
+        return self._device_events
+
+    def _handle_device_event(self, event):
+        from synaptiks.x11.events import PropertyEvent
+        from synaptiks._bindings.xinput import PROPERTY_CREATED
+        if not isinstance(event, PropertyEvent) or \
+           event.what == PROPERTY_CREATED:
+            # new properties or devices may come with new atoms
+            self._undefined_atoms.clear()
+
+    @property
+    def hierarchy_serial(self):
+        """
+        The number of device hierarchy changes reported by
+        :attr:`device_events` so far, or ``None``, if :attr:`device_events`
+        was not used yet.
+
+        Pending events are processed first.  Unlike :attr:`device_events`,
+        this attribute does not open the private event connection.
+        """
+        if self._device_events is None:
+            return None
+        self._device_events.process_events()
+        return self._device_events.hierarchy_serial
+
+    @property
+    def property_index(self):
+        """
+        A :class:`~synaptiks.x11.input.PropertyIndex` of the properties of all
+        input devices on this display, or ``None``, if :attr:`device_events`
+        was not used yet.
+
+        The index is created on first access, and kept current by
+        :attr:`device_events`.  Like :attr:`hierarchy_serial`, this attribute
+        does not open the private event connection, because nothing would
+        process its events otherwise.
+        """
+        if self._device_events is None:
+            return None
+        if self._property_index is None:
+            from synaptiks.x11.input import PropertyIndex
+            self._property_index = PropertyIndex(self)
+        return self._property_index
+
     def flush(self):
         """
         Flush the output buffer of this display.
         """
         xlib.flush(self)
 
+    def sync(self):
+        """
+        Flush the output buffer of this display, and wait until all requests
+        have been processed by the server.
+        """
+        xlib.sync(self, False)
+
+    @contextmanager
+    def trap_errors(self):
+        """
+        Trap X11 protocol errors on this display inside a ``with`` block::
+
+           with display.trap_errors():
+               # send requests to the server here
+
+        Requests are not checked individually.  Instead, the display is
+        synchronized once upon exit of the block, and all errors reported for
+        requests sent inside the block are raised together as
+        :exc:`ProtocolError`.  Errors reported for other displays are passed
+        to the previous error handler.
+
+        If the block itself raises an exception, this exception is propagated,
+        and trapped protocol errors are discarded.
+        """
+        errors = []
+        display_address = cast(self._as_parameter_, c_void_p).value
+
+        def handle_error(display, event):
+            if cast(display, c_void_p).value != display_address:
+                return previous_handler(display, event)
+            event = event.contents
+            description = ensure_unicode_string(
+                xlib.get_error_text(display, event.error_code))
+            errors.append(ErrorEvent(
+                event.error_code, event.request_code, event.minor_code,
+                event.resourceid, event.serial, description))
+            return 0
+
+        handler = xlib.XErrorHandler(handle_error)
+        previous_handler = xlib.set_error_handler(handler)
+        try:
+            yield
+        finally:
+            self.sync()
+            xlib.set_error_handler(previous_handler)
+        if errors:
+            raise ProtocolError(errors)
+
+    def _remember_atom(self, name, value):
+        """
+        Add the atom with the given byte ``name`` and the given integral
+        ``value`` to the atom table.
+
+        Return the :class:`Atom`.
+        """
+        atom = self._atom_cache.setdefault(name, Atom(self, value))
+        self._atom_names[value] = ensure_unicode_string(name)
+        self._undefined_atoms.discard(name)
+        return atom
+
+    def _is_undefined_atom(self, name):
+        """
+        Check, if the atom with the given byte ``name`` is known not to exist.
+        """
+        if not self._undefined_atoms:
+            return False
+        if self._device_events is None:
+            # the negative cache cannot be kept current anymore
+            self._undefined_atoms.clear()
+            return False
+        # drop the negative cache, if new atoms appeared in the meantime
+        self._device_events.process_events()
+        return name in self._undefined_atoms
+
+    def _remember_undefined_atom(self, name):
+        if self._device_events is not None:
+            self._undefined_atoms.add(name)
+
     def intern_atom(self, name, only_if_exists=True):
         """
         Create a new X11 atom with the given ``name``.
@@ -144,6 +348,10 @@ class Display(object):
         ``only_if_exists`` is ``True``, the atom is only created, if it already
         exists.  If it does not exist, ``None`` is returned.
 
+        Atoms are cached.  While :attr:`device_events` is used, names of
+        atoms, which do not exist, are cached, too, until a new property or a
+        new device appears.
+
         Return an :class:`Atom` with the given ``name``, or ``None``, if the
         ``only_if_exists`` was ``True`` and the atom did not exist.
         """
@@ -151,10 +359,56 @@ class Display(object):
         atom = self._atom_cache.get(name)
         if atom:
             return atom
-        atom = xlib.intern_atom(self, ensure_byte_string(name), only_if_exists)
-        if atom == xlib.NONE:
+        if only_if_exists and self._is_undefined_atom(name):
             return None
-        return self._atom_cache.setdefault(name, Atom(self, atom))
+        value = xlib.intern_atom(self, name, only_if_exists)
+        if value == xlib.NONE:
+            self._remember_undefined_atom(name)
+            return None
+        return self._remember_atom(name, value)
+
+    def intern_atoms(self, names, only_if_exists=True):
+        """
+        Create X11 atoms for all of the given ``names``.
+
+        Like :meth:`intern_atom()`, but all atoms, which are not yet cached,
+        are created with a single request.  Use this method to preload atoms.
+
+        Return a list of :class:`Atom` objects (or ``None`` for atoms, which
+        do not exist) in the order of ``names``.
+        """
+        names = [ensure_byte_string(n) for n in names]
+        missing = [n for n in set(names) if n not in self._atom_cache and
+                   not (only_if_exists and self._is_undefined_atom(n))]
+        if missing:
+            values = xlib.intern_atoms(self, missing, only_if_exists)
+            for name, value in zip(missing, values):
+                if value == xlib.NONE:
+                    self._remember_undefined_atom(name)
+                else:
+                    self._remember_atom(name, value)
+        return [self._atom_cache.get(n) for n in names]
+
+    def get_atom_names(self, atoms):
+        """
+        Get the names of the given ``atoms``.
+
+        ``atoms`` is a sequence of integral atoms or :class:`Atom` objects.
+        Names are cached, and all names not yet cached are fetched with a
+        single request.
+
+        Return a list with the name of each atom as unicode string, in the
+        order of ``atoms``.  The name of an atom, which does not exist, is
+        ``None``.
+        """
+        values = [getattr(a, 'value', a) for a in atoms]
+        missing = [v for v in set(values) if v not in self._atom_names]
+        if missing:
+            names = xlib.get_atom_names(self, missing)
+            for value, name in zip(missing, names):
+                if name is not None:
+                    self._remember_atom(name, value)
+        return [self._atom_names.get(v) for v in values]
 
     def is_atom_defined(self, name):
         """
@@ -224,8 +478,10 @@ class Atom(object):
     def name(self):
         """
         The name of this atom as unicode string.
+
+        The name is looked up in the atom table of the :attr:`display`.
         """
-        return ensure_unicode_string(xlib.get_atom_name(self.display, self))
+        return self.display.get_atom_names([self.value])[0]
 
     def __unicode__(self):
         return self.name
@@ -0,0 +1,360 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012, Sebastian Wiesner <lunaryorn@googlemail.com>
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+"""
+    synaptiks.x11.events
+    ====================
+
+    Notifications about changes of input devices.
+
+    :class:`InputEventSource` receives events about changes of the device
+    hierarchy (e.g. a device was plugged) and of device properties on a
+    private display connection.  These events allow to cache information
+    about input devices, instead of querying the server over and over again:
+
+    >>> from synaptiks.x11 import Display
+    >>> source = Display.from_qt().device_events
+    >>> source.add_listener(print)
+    >>> source.process_events()
+    PropertyEvent(time=4143270L, deviceid=12, property=276L, what=2)
+    1
+
+    The source does not block.  Call :meth:`InputEventSource.process_events()`
+    whenever the file descriptor returned by
+    :meth:`InputEventSource.fileno()` becomes readable, e.g. by means of a
+    :class:`~PyQt4.QtCore.QSocketNotifier` or :func:`select.select`.
+
+    :class:`RawKeyEventSource` receives raw key events of all keyboards in
+    the same way, without the need to record the X11 protocol.
+    :class:`MappingEventSource` receives changes of the keyboard and modifier
+    mapping.
+
+    .. moduleauthor::  Sebastian Wiesner  <lunaryorn@googlemail.com>
+"""
+
+from __future__ import (print_function, division, unicode_literals,
+                        absolute_import)
+
+from collections import namedtuple
+from ctypes import byref, cast
+
+from synaptiks._bindings import xlib, xinput
+from synaptiks.x11 import Display
+from synaptiks.x11.input import assert_xinput_version
+
+
+#: A change of a single device in a :class:`HierarchyEvent`.
+#:
+#: ``deviceid`` is the id of the changed device.  ``attachment``, ``use`` and
+#: ``enabled`` describe the new state of the device (see
+#: :class:`~synaptiks.x11.input.DeviceSnapshot`).  ``flags`` is a combination
+#: of the hierarchy change flags in :mod:`synaptiks._bindings.xinput` (e.g.
+#: :data:`~synaptiks._bindings.xinput.SLAVE_ADDED`).
+HierarchyChange = namedtuple('HierarchyChange',
+                             'deviceid attachment use enabled flags')
+
+#: The device hierarchy changed.
+#:
+#: ``time`` is the server time of the event, ``flags`` the combination of the
+#: flags of all ``changes``, which is a tuple of :class:`HierarchyChange`
+#: objects.
+HierarchyEvent = namedtuple('HierarchyEvent', 'time flags changes')
+
+#: A device property was created, modified or deleted.
+#:
+#: ``time`` is the server time of the event, ``deviceid`` the id of the
+#: device, and ``property`` the integral atom of the property.  ``what`` is
+#: one of :data:`~synaptiks._bindings.xinput.PROPERTY_CREATED`,
+#: :data:`~synaptiks._bindings.xinput.PROPERTY_MODIFIED` or
+#: :data:`~synaptiks._bindings.xinput.PROPERTY_DELETED`.
+PropertyEvent = namedtuple('PropertyEvent', 'time deviceid property what')
+
+#: A key was pressed or released.
+#:
+#: ``time`` is the server time of the event, ``deviceid`` the id of the
+#: master device, and ``sourceid`` the id of the slave device, on which the
+#: key was pressed.  ``keycode`` is the keycode of the key, ``pressed`` is
+#: ``True``, if the key was pressed, or ``False``, if it was released.
+#: ``repeat`` is ``True``, if the press was generated by keyboard
+#: autorepeat.
+RawKeyEvent = namedtuple('RawKeyEvent',
+                         'time deviceid sourceid keycode pressed repeat')
+
+#: The keyboard, modifier or pointer mapping changed.
+#:
+#: ``request`` is one of :data:`~synaptiks._bindings.xlib.MAPPING_MODIFIER`,
+#: :data:`~synaptiks._bindings.xlib.MAPPING_KEYBOARD` or
+#: :data:`~synaptiks._bindings.xlib.MAPPING_POINTER`.  If the keyboard
+#: mapping changed, ``first_keycode`` and ``count`` describe the range of
+#: changed keycodes.
+MappingEvent = namedtuple('MappingEvent', 'request first_keycode count')
+
+
+def _read_hierarchy_event(data):
+    event = cast(data, xinput.XIHierarchyEvent_p).contents
+    changes = tuple(
+        HierarchyChange(info.deviceid, info.attachment, info.use,
+                        bool(info.enabled), info.flags)
+        for info in event.info[:event.num_info])
+    return HierarchyEvent(event.time, event.flags, changes)
+
+
+def _read_property_event(data):
+    event = cast(data, xinput.XIPropertyEvent_p).contents
+    return PropertyEvent(event.time, event.deviceid, event.property,
+                         event.what)
+
+
+def _read_raw_key_event(data):
+    event = cast(data, xinput.XIRawEvent_p).contents
+    return RawKeyEvent(event.time, event.deviceid, event.sourceid,
+                       event.detail, event.evtype == xinput.RAW_KEY_PRESS,
+                       bool(event.flags & xinput.KEY_REPEAT))
+
+
+def _read_mapping_event(event):
+    event = event.xmapping
+    return MappingEvent(event.request, event.first_keycode, event.count)
+
+
+class EventSource(object):
+    """
+    Base class for sources of X11 events.
+
+    Events are received on a private connection to the display, so that they
+    do not interfere with the event processing of the application (e.g. of
+    Qt).  Received events are converted by the :attr:`CORE_EVENT_READERS`,
+    and passed to all listeners added with :meth:`add_listener()`.
+
+    This class supports the context manager protocol.  Upon context exit, the
+    private display connection is closed.
+    """
+
+    #: readers for the core event types, which are passed to listeners
+    CORE_EVENT_READERS = {}
+
+    def __init__(self, display_name=None):
+        """
+        Connect to the display with the given ``display_name``.
+
+        ``display_name`` is a byte or unicode string with the name of the
+        display, or ``None`` to use the value of ``$DISPLAY``.
+
+        Raise :exc:`~synaptiks.x11.DisplayError`, if the display could not be
+        opened.
+        """
+        self.display = Display.from_name(display_name)
+        try:
+            self._select_events()
+            self.display.flush()
+        except:
+            self.display.close()
+            raise
+        self._event = xlib.XEvent()
+        self._listeners = []
+
+    def _select_events(self):
+        """
+        Select the events to receive on the private display connection.
+
+        The default implementation selects nothing.
+        """
+
+    def fileno(self):
+        """
+        Return the file descriptor of the display connection.  Events are
+        available, if this descriptor is readable.
+        """
+        return xlib.connection_number(self.display)
+
+    def add_listener(self, listener):
+        """
+        Add the given ``listener``, which is a callable taking a single event
+        argument.
+        """
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        """
+        Remove the given ``listener``.
+
+        Raise :exc:`~exceptions.ValueError`, if the listener was not added.
+        """
+        self._listeners.remove(listener)
+
+    def _read_event(self):
+        """
+        Read the next event from the display.
+
+        Return an event created by one of the :attr:`CORE_EVENT_READERS`, or
+        ``None``, if the event is not of interest.
+        """
+        xlib.next_event(self.display, byref(self._event))
+        read = self.CORE_EVENT_READERS.get(self._event.type)
+        if read is None:
+            return None
+        return read(self._event)
+
+    def process_events(self):
+        """
+        Process all pending events without blocking.
+
+        Each event is passed to all listeners.
+
+        Return the number of processed events.
+        """
+        number_of_events = 0
+        while xlib.pending(self.display):
+            event = self._read_event()
+            if event is None:
+                continue
+            for listener in list(self._listeners):
+                listener(event)
+            number_of_events += 1
+        return number_of_events
+
+    def close(self):
+        """
+        Close the private display connection.
+        """
+        self.display.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, _exc_type, _exc_value, _traceback):
+        self.close()
+
+
+class InputEventSource(EventSource):
+    """
+    A source of XInput hierarchy and property events.
+    """
+
+    #: readers for the selected event types
+    EVENT_READERS = {
+        xinput.HIERARCHY_CHANGED: _read_hierarchy_event,
+        xinput.PROPERTY_EVENT: _read_property_event,
+        }
+    #: maps device ids to the event types selected for these devices
+    SELECTED_EVENTS = {
+        xinput.ALL_DEVICES: [xinput.HIERARCHY_CHANGED, xinput.PROPERTY_EVENT],
+        }
+    #: the XInput version required by this source
+    XINPUT_VERSION = (2, 0)
+    #: the XInput version announced to the server
+    ANNOUNCED_XINPUT_VERSION = (2, 0)
+
+    def __init__(self, display_name=None):
+        """
+        Connect to the display with the given ``display_name``.
+
+        ``display_name`` is a byte or unicode string with the name of the
+        display, or ``None`` to use the value of ``$DISPLAY``.
+
+        Raise :exc:`~synaptiks.x11.DisplayError`, if the display could not be
+        opened.  Raise :exc:`~synaptiks.x11.input.XInputVersionError`, if the
+        XInput version isn't sufficient.
+        """
+        EventSource.__init__(self, display_name)
+        self.hierarchy_serial = 0
+
+    def _select_events(self):
+        assert_xinput_version(self.display, self.XINPUT_VERSION,
+                              self.ANNOUNCED_XINPUT_VERSION)
+        _, self._opcode, _, _ = xlib.query_extension(
+            self.display, b'XInputExtension')
+        root = xlib.default_root_window(self.display)
+        for deviceid, event_types in self.SELECTED_EVENTS.iteritems():
+            xinput.select_events(self.display, root, deviceid, event_types)
+
+    def _read_event(self):
+        """
+        Read the next event from the display.
+
+        Return an event created by one of the :attr:`EVENT_READERS`, or
+        ``None``, if the event was not a selected XInput event.
+        """
+        xlib.next_event(self.display, byref(self._event))
+        cookie = self._event.xcookie
+        if (cookie.type != xlib.GENERIC_EVENT or
+            cookie.extension != self._opcode):
+            return None
+        read = self.EVENT_READERS.get(cookie.evtype)
+        if read is None:
+            return None
+        if not xlib.get_event_data(self.display, byref(cookie)):
+            return None
+        try:
+            event = read(cookie.data)
+        finally:
+            xlib.free_event_data(self.display, byref(cookie))
+        if isinstance(event, HierarchyEvent):
+            self.hierarchy_serial += 1
+        return event
+
+
+class RawKeyEventSource(InputEventSource):
+    """
+    A source of :class:`RawKeyEvent` and :class:`HierarchyEvent` objects.
+
+    Raw key events are selected for all master devices on the root window,
+    and consequently received for all keys pressed on any keyboard,
+    independently of the focused window and of any active grab.  Before
+    XInput 2.1 raw events were not delivered during grabs, so at least this
+    version is required.  The ``sourceid`` of these events refers to a device
+    in the current device hierarchy, hence hierarchy events are received,
+    too.
+    """
+
+    #: readers for the selected event types
+    EVENT_READERS = {
+        xinput.RAW_KEY_PRESS: _read_raw_key_event,
+        xinput.RAW_KEY_RELEASE: _read_raw_key_event,
+        xinput.HIERARCHY_CHANGED: _read_hierarchy_event,
+        }
+    #: maps device ids to the event types selected for these devices
+    SELECTED_EVENTS = {
+        xinput.ALL_MASTER_DEVICES: [xinput.RAW_KEY_PRESS,
+                                    xinput.RAW_KEY_RELEASE],
+        xinput.ALL_DEVICES: [xinput.HIERARCHY_CHANGED],
+        }
+    #: the XInput version required by this source
+    XINPUT_VERSION = (2, 1)
+    #: the XInput version announced to the server
+    ANNOUNCED_XINPUT_VERSION = (2, 2)
+
+
+class MappingEventSource(EventSource):
+    """
+    A source of :class:`MappingEvent` objects.
+
+    The X server sends mapping events to all clients without any selection.
+    Xlib also reports changes of the XKB keymap (e.g. by
+    :program:`setxkbmap`) as mapping events, so this source notices changes
+    made with both :program:`xmodmap` and :program:`setxkbmap`.
+    """
+
+    #: readers for the core event types, which are passed to listeners
+    CORE_EVENT_READERS = {xlib.MAPPING_NOTIFY: _read_mapping_event}
@@ -67,6 +67,12 @@
 
     >>> devices[0].set_bool('Synaptics Edge Scrolling', [False, False, False])
 
+    Multiple changes can be sent together with :meth:`InputDevice.batch()`:
+
+    >>> with device.batch():
+    ...     device.set_bool('Synaptics Off', [True])
+    ...     device.set_bool('Synaptics Edge Scrolling', [True, False, False])
+
     .. moduleauthor::  Sebastian Wiesner  <lunaryorn@googlemail.com>
 """
 
@@ -76,10 +82,12 @@ from __future__ import (print_function, division, unicode_literals,
 import struct
 from functools import partial
 from contextlib import contextmanager
-from collections import Mapping, namedtuple
+from collections import (Mapping, Sequence, OrderedDict, namedtuple,
+                         defaultdict)
 from operator import eq
+from ctypes import POINTER, cast
 
-from synaptiks._bindings import xlib, xinput
+from synaptiks._bindings import xinput
 from synaptiks._bindings.util import scoped_pointer
 from synaptiks.x11 import Atom
 from synaptiks.util import ensure_unicode_string
@@ -132,20 +140,27 @@ class XInputVersionError(Exception):
                 'got {0.actual_version}').format(self)
 
 
-def assert_xinput_version(display):
+def assert_xinput_version(display, expected_version=(2, 0),
+                          announced_version=None):
     """
     Check, that the XInput version on the server side is sufficiently
     recent.
 
-    Currently, at least version 2.0 is required.
-
     ``display`` is a :class:`~synaptiks.x11.Display` object.
+    ``expected_version`` is a tuple ``(major, minor)`` with the required
+    version, by default 2.0.  ``announced_version`` is the version announced
+    to the server, which defaults to ``expected_version``.  The server
+    enables the behaviour of the lower of the announced and its own version
+    for the connection.  Each connection should only announce a single
+    version.
 
     Raise :exc:`XInputVersionError`, if the version isn't sufficient.
     """
-    matched, actual_version = xinput.query_version(display, (2, 0))
-    if not matched:
-        raise XInputVersionError((2, 0), actual_version)
+    expected_version = tuple(expected_version)
+    matched, actual_version = xinput.query_version(
+        display, announced_version or expected_version)
+    if not matched or actual_version < expected_version:
+        raise XInputVersionError(expected_version, actual_version)
 
 
 class UndefinedPropertyError(KeyError):
@@ -258,6 +273,29 @@ def _pack_property_data(type_code, values):
     return struct.pack(struct_format, *values)
 
 
+# precompiled struct.Struct objects, keyed by (type_code, number_of_items)
+_struct_cache = {}
+
+
+def _get_struct(type_code, number_of_items):
+    """
+    Get a precompiled :class:`struct.Struct` for the given number of items of
+    the given type.
+
+    See :func:`_make_struct_format()` for a description of the arguments.
+    The type code and the number of items fully determine the layout of the
+    property data, so the structs are cached and shared between all devices
+    and properties.
+    """
+    key = (type_code, number_of_items)
+    item_struct = _struct_cache.get(key)
+    if item_struct is None:
+        item_struct = struct.Struct(
+            _make_struct_format(type_code, number_of_items))
+        _struct_cache[key] = item_struct
+    return item_struct
+
+
 def _unpack_property_data(type_code, number_of_items, data):
     """
     Unpack property values from the given binary ``data``.
@@ -270,9 +308,387 @@ def _unpack_property_data(type_code, number_of_items, data):
     Return a list containing the unpacked property values.  The items in this
     list have a type corresponding to the given ``type_code``.
     """
-    struct_format = _make_struct_format(type_code, number_of_items)
-    assert struct.calcsize(struct_format) == len(data)
-    return list(struct.unpack(struct_format, data))
+    property_struct = _get_struct(type_code, number_of_items)
+    assert property_struct.size == len(data)
+    return list(property_struct.unpack(data))
+
+
+class PropertyValue(Sequence):
+    """
+    A read-only sequence of the items of a device property.
+
+    The raw property data is kept as is, and items are only decoded on
+    access.  Accessing a single item decodes just this item straight from the
+    raw data, without creating any intermediate list.  :meth:`tolist()`
+    decodes all items at once, the decoded items are kept for subsequent
+    access.
+
+    Property values compare equal to other sequences with equal items.
+    """
+
+    #: type code for string properties, whose only item is the whole string
+    STRING = 's'
+
+    def __init__(self, type_code, data):
+        """
+        Create a new value from the given raw property ``data``.
+
+        ``type_code`` is a one-character string containing the :mod:`struct`
+        type code of the items in ``data``, or :attr:`STRING`.  ``data`` is
+        a byte string with the raw property data.
+        """
+        self.type_code = type_code
+        self.data = data
+        if type_code == self.STRING:
+            self._items = (data,)
+            self._item_size = len(data)
+        else:
+            self._items = None
+            self._item_size = _get_struct(type_code, 1).size
+
+    def __len__(self):
+        if self._items is not None:
+            return len(self._items)
+        return len(self.data) // self._item_size
+
+    def __getitem__(self, index):
+        if self._items is not None or isinstance(index, slice):
+            return self.tolist()[index]
+        number_of_items = len(self)
+        if index < 0:
+            index += number_of_items
+        if not 0 <= index < number_of_items:
+            raise IndexError(index)
+        item_struct = _get_struct(self.type_code, 1)
+        return item_struct.unpack_from(self.data, index * self._item_size)[0]
+
+    def tolist(self):
+        """
+        Decode all items.
+
+        Return a new list of all items in this property.
+        """
+        if self._items is None:
+            property_struct = _get_struct(self.type_code, len(self))
+            self._items = property_struct.unpack(self.data)
+        return list(self._items)
+
+    def __eq__(self, other):
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return self.tolist() == list(other)
+
+    def __ne__(self, other):
+        if not isinstance(other, Sequence):
+            return NotImplemented
+        return not (self == other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '{0}({1!r})'.format(self.__class__.__name__, self.tolist())
+
+
+#: The keys of a device.  ``keycodes`` is a tuple of all keycodes.
+KeyClass = namedtuple('KeyClass', 'sourceid keycodes')
+#: The buttons of a device.  ``labels`` is a tuple with the integral label
+#: atom of each button, or ``0`` for unlabelled buttons.
+ButtonClass = namedtuple('ButtonClass', 'sourceid labels')
+#: An axis of a device.  ``label`` is the integral label atom.
+ValuatorClass = namedtuple('ValuatorClass', 'sourceid number label min max '
+                           'value resolution mode')
+#: A scrolling axis of a device.
+ScrollClass = namedtuple('ScrollClass', 'sourceid number scroll_type '
+                         'increment flags')
+#: The touch capabilities of a device.
+TouchClass = namedtuple('TouchClass', 'sourceid mode num_touches')
+
+
+def _parse_device_class(class_info):
+    """
+    Parse the given device class.
+
+    ``class_info`` is a :class:`~synaptiks._bindings.xinput.XIAnyClassInfo_p`
+    pointing to the class.
+
+    Return a :class:`KeyClass`, :class:`ButtonClass`, :class:`ValuatorClass`,
+    :class:`ScrollClass` or :class:`TouchClass`, or ``None``, if the class
+    type is unknown.
+    """
+    class_type = class_info.contents.type
+    struct_type = xinput.CLASS_INFO_TYPES.get(class_type)
+    if struct_type is None:
+        return None
+    info = cast(class_info, POINTER(struct_type)).contents
+    if class_type == xinput.KEY_CLASS:
+        return KeyClass(info.sourceid,
+                        tuple(info.keycodes[:info.num_keycodes]))
+    elif class_type == xinput.BUTTON_CLASS:
+        return ButtonClass(info.sourceid,
+                           tuple(info.labels[:info.num_buttons]))
+    elif class_type == xinput.VALUATOR_CLASS:
+        return ValuatorClass(info.sourceid, info.number, info.label,
+                             info.min, info.max, info.value,
+                             info.resolution, info.mode)
+    elif class_type == xinput.SCROLL_CLASS:
+        return ScrollClass(info.sourceid, info.number, info.scroll_type,
+                           info.increment, info.flags)
+    else:
+        return TouchClass(info.sourceid, info.mode, info.num_touches)
+
+
+class DeviceSnapshot(namedtuple('_DeviceSnapshot', 'id name use attachment '
+                                'enabled classes')):
+    """
+    An immutable snapshot of the state of an input device, as seen by a
+    single query of the X11 server.
+
+    ``id`` is the device id, ``name`` the device name as unicode string,
+    ``use`` the :ref:`device type <xinput-device-types>` and ``attachment``
+    the id of the attached or paired device.  ``enabled`` is ``True``, if the
+    device was enabled.  ``classes`` is a tuple of the device classes (e.g.
+    :class:`KeyClass` or :class:`ValuatorClass` objects).
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def from_device_info(cls, info):
+        """
+        Create a snapshot from the given ``info``, which is a
+        :class:`~synaptiks._bindings.xinput.XIDeviceInfo`.
+        """
+        classes = (_parse_device_class(info.classes[i])
+                   for i in xrange(info.num_classes))
+        return cls(info.deviceid, ensure_unicode_string(info.name), info.use,
+                   info.attachment, bool(info.enabled),
+                   tuple(c for c in classes if c is not None))
+
+    @classmethod
+    def query(cls, display, deviceid=xinput.ALL_DEVICES):
+        """
+        Query snapshots of devices with a single request.
+
+        ``display`` is a :class:`~synaptiks.x11.Display` object.
+        ``deviceid`` is either the id of a single device, or a :ref:`special
+        ID <xinput-special-ids>` to query multiple devices at once.
+
+        Return an ordered dictionary mapping device ids to
+        :class:`DeviceSnapshot` objects.  Raise
+        :exc:`InputDeviceNotFoundError`, if the device with the given
+        ``deviceid`` does not exist.
+        """
+        number_of_devices, devices = xinput.query_device(display, deviceid)
+        with scoped_pointer(devices, xinput.free_device_info) as devices:
+            if not devices:
+                if deviceid in (xinput.ALL_DEVICES,
+                                xinput.ALL_MASTER_DEVICES):
+                    raise EnvironmentError('Failed to query devices')
+                raise InputDeviceNotFoundError(deviceid)
+            snapshots = (cls.from_device_info(devices[i])
+                         for i in xrange(number_of_devices))
+            return OrderedDict((s.id, s) for s in snapshots)
+
+
+class PropertyCache(object):
+    """
+    A cache of the raw property data of a single input device.
+
+    Changes made in a :meth:`InputDevice.batch()` are stored in the cache,
+    once the server accepted them.  Other changes are sent without waiting
+    for errors, so they drop the property from the cache instead.
+
+    The cache is kept current by the
+    :attr:`~synaptiks.x11.Display.device_events` of the display of the
+    device.  A property is dropped from the cache, as soon as the server
+    reports a change of this property, and the whole cache is cleared, if the
+    device itself changed in the device hierarchy.  Pending events are
+    processed before each lookup, which does not require a round trip.
+
+    Use :meth:`InputDevice.enable_property_cache()` to create a cache.
+    """
+
+    def __init__(self, device):
+        """
+        Create a new cache for the given ``device``, which is an
+        :class:`InputDevice`.
+        """
+        self.deviceid = device.id
+        self.events = device.display.device_events
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+        self.events.add_listener(self._handle_event)
+
+    def _handle_event(self, event):
+        from synaptiks.x11.events import PropertyEvent
+        if isinstance(event, PropertyEvent):
+            if event.deviceid == self.deviceid:
+                self._entries.pop(event.property, None)
+        elif any(c.deviceid == self.deviceid for c in event.changes):
+            self._entries.clear()
+
+    def get(self, atom):
+        """
+        Get the raw data of the property with the given integral ``atom``.
+
+        Return a tuple ``(type, format, data)`` as returned by
+        :func:`~synaptiks._bindings.xinput.get_property()`, or ``None``, if
+        the property is not cached.
+        """
+        self.events.process_events()
+        entry = self._entries.get(atom)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def store(self, atom, entry):
+        """
+        Store the raw data of the property with the given integral ``atom``.
+
+        ``entry`` is a tuple ``(type, format, data)`` as returned by
+        :func:`~synaptiks._bindings.xinput.get_property()`.
+        """
+        self._entries[atom] = entry
+
+    def discard(self, atom):
+        """
+        Drop the property with the given integral ``atom`` from the cache.
+        """
+        self._entries.pop(atom, None)
+
+    def clear(self):
+        """
+        Drop all cached properties.
+        """
+        self._entries.clear()
+
+    def close(self):
+        """
+        Drop all cached properties, and stop listening for events.
+        """
+        self.events.remove_listener(self._handle_event)
+        self.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class PropertyIndex(object):
+    """
+    An index of the properties of all input devices on a display.
+
+    The index maps property atoms to the ids of the devices, which define
+    these properties.  It is built on first use, by querying the properties
+    of all devices at once (see
+    :func:`~synaptiks._bindings.xinput.list_device_properties()`), and kept
+    current by the :attr:`~synaptiks.x11.Display.device_events` of the
+    display.  Created and deleted properties are updated in place, removed
+    devices are dropped, and the properties of added devices are queried on
+    the next lookup.
+
+    Use :attr:`synaptiks.x11.Display.property_index` to get the index of a
+    display.
+    """
+
+    def __init__(self, display):
+        """
+        Create a new index for the given ``display``, which is a
+        :class:`~synaptiks.x11.Display`.
+        """
+        self.display = display
+        self.events = display.device_events
+        # maps device ids to frozensets of property atoms, or None, if the
+        # index was not yet built
+        self._device_properties = None
+        # maps property atoms to sets of device ids
+        self._devices_by_property = defaultdict(set)
+        # ids of devices, whose properties must be queried
+        self._stale_devices = set()
+        self.events.add_listener(self._handle_event)
+
+    def _add_device(self, deviceid, properties):
+        self._device_properties[deviceid] = frozenset(properties)
+        for atom in properties:
+            self._devices_by_property[atom].add(deviceid)
+
+    def _remove_device(self, deviceid):
+        self._stale_devices.discard(deviceid)
+        for atom in self._device_properties.pop(deviceid, ()):
+            self._devices_by_property[atom].discard(deviceid)
+
+    def _handle_event(self, event):
+        from synaptiks.x11.events import PropertyEvent
+        if self._device_properties is None:
+            return
+        if isinstance(event, PropertyEvent):
+            deviceid = event.deviceid
+            if deviceid not in self._device_properties:
+                return
+            properties = set(self._device_properties[deviceid])
+            if event.what == xinput.PROPERTY_CREATED:
+                properties.add(event.property)
+                self._devices_by_property[event.property].add(deviceid)
+            elif event.what == xinput.PROPERTY_DELETED:
+                properties.discard(event.property)
+                self._devices_by_property[event.property].discard(deviceid)
+            self._device_properties[deviceid] = frozenset(properties)
+            return
+        for change in event.changes:
+            if change.flags & (xinput.MASTER_REMOVED | xinput.SLAVE_REMOVED):
+                self._remove_device(change.deviceid)
+            elif change.flags & (xinput.MASTER_ADDED | xinput.SLAVE_ADDED):
+                self._stale_devices.add(change.deviceid)
+
+    def _update(self):
+        """
+        Process pending events, and build or complete the index as
+        necessary.
+        """
+        self.events.process_events()
+        if self._device_properties is None:
+            self._device_properties = {}
+            self._devices_by_property.clear()
+            self._stale_devices = set(DeviceSnapshot.query(self.display))
+        if self._stale_devices:
+            deviceids = sorted(self._stale_devices)
+            self._stale_devices.clear()
+            all_properties = xinput.list_device_properties(
+                self.display, deviceids)
+            for deviceid, properties in zip(deviceids, all_properties):
+                self._add_device(deviceid, properties)
+
+    def find_devices(self, atom):
+        """
+        Find all devices, which define the property with the given integral
+        ``atom``.
+
+        Return a frozenset with the ids of these devices.
+        """
+        self._update()
+        return frozenset(self._devices_by_property.get(atom, ()))
+
+    def get_properties(self, deviceid):
+        """
+        Get the properties of the device with the given ``deviceid``.
+
+        Return a frozenset with the integral atoms of all properties of the
+        device.  The set is empty, if the device does not exist.
+        """
+        self._update()
+        if deviceid not in self._device_properties:
+            # a device not seen by any hierarchy event so far
+            self._stale_devices.add(deviceid)
+            self._update()
+        return self._device_properties.get(deviceid, frozenset())
+
+    def close(self):
+        """
+        Stop listening for events.
+        """
+        self.events.remove_listener(self._handle_event)
 
 
 class InputDevice(Mapping):
@@ -313,6 +729,11 @@ class InputDevice(Mapping):
         case, the returned iterator yields only two devices in most cases, a
         master keyboard and a master slave (the exact order is undefined).
 
+        All devices are queried with a single request, and share the
+        resulting :class:`DeviceSnapshot` objects.  Thus the :attr:`name`,
+        :attr:`type` and :attr:`attachment_device` of the returned devices
+        are available without any further requests.
+
         Return an iterator over :class:`InputDevice` objects.
 
         Raise :exc:`XInputVersionError`, if the XInput version isn't sufficient
@@ -325,12 +746,9 @@ class InputDevice(Mapping):
             device_id = xinput.ALL_MASTER_DEVICES
         else:
             device_id = xinput.ALL_DEVICES
-        number_of_devices, devices = xinput.query_device(display, device_id)
-        with scoped_pointer(devices, xinput.free_device_info) as devices:
-            if not devices:
-                raise EnvironmentError('Failed to query devices')
-            for i in xrange(number_of_devices):
-                yield cls(display, devices[i].deviceid)
+        snapshots = DeviceSnapshot.query(display, device_id)
+        for deviceid in snapshots:
+            yield cls(display, deviceid, snapshots)
 
     @classmethod
     def find_devices_by_type(cls, display, type, master_only=False):
@@ -387,8 +805,13 @@ class InputDevice(Mapping):
         ``display`` is a :class:`~synaptiks.x11.Display` object.  ``name`` is a
         string with the property name.
 
+        The devices are looked up in the
+        :attr:`~synaptiks.x11.Display.property_index` of the display, so
+        usually no request is sent to the server.  Without an index, the
+        properties of all devices are queried at once.
+
         Return an iterator over all :class:`InputDevice` objects, which have
-        this property defined.
+        this property defined, ordered by device id.
 
         Raise :exc:`XInputVersionError`, if the XInput version isn't sufficient
         to support input device management.
@@ -396,33 +819,85 @@ class InputDevice(Mapping):
         .. seealso:: :meth:`__iter__`, :meth:`__contains__`,
            :meth:`__getitem__`
         """
-        return (d for d in cls.all_devices(display) if name in d)
+        atom = display.intern_atom(name)
+        if atom is None:
+            return iter([])
+        index = display.property_index
+        if index is not None:
+            deviceids = index.find_devices(atom.value)
+        else:
+            all_deviceids = sorted(DeviceSnapshot.query(display))
+            all_properties = xinput.list_device_properties(
+                display, all_deviceids)
+            deviceids = [deviceid for deviceid, properties
+                         in zip(all_deviceids, all_properties)
+                         if atom.value in properties]
+        return (cls(display, deviceid) for deviceid in sorted(deviceids))
+
+    def __init__(self, display, deviceid, snapshots=None):
+        """
+        Create a new device with the given ``deviceid`` on the given
+        ``display``.
 
-    def __init__(self, display, deviceid):
+        ``snapshots`` is an optional dictionary mapping device ids to
+        :class:`DeviceSnapshot` objects as returned by
+        :meth:`DeviceSnapshot.query()`.  Devices missing from this dictionary
+        are queried from the server on first access.
+        """
         self.id = deviceid
         self.display = display
+        self._snapshots = snapshots if snapshots is not None else {}
+        # property changes queued by batch(), or None outside of a batch
+        self._pending_changes = None
+        self.property_cache = None
 
-    @contextmanager
-    def _query_device(self):
+    def enable_property_cache(self):
+        """
+        Cache the properties of this device.
+
+        Subsequent reads of a property are served from the cache without any
+        round trip, until the property is changed.  Properties written by
+        this object are cached, too.  See :class:`PropertyCache` for
+        details.
+
+        Return the :class:`PropertyCache` of this device.
+        """
+        if self.property_cache is None:
+            self.property_cache = PropertyCache(self)
+        return self.property_cache
+
+    def disable_property_cache(self):
         """
-        Query this device from the X11 server.
+        Stop caching the properties of this device, and drop the
+        :attr:`property_cache`.
+        """
+        if self.property_cache is not None:
+            self.property_cache.close()
+            self.property_cache = None
+
+    @property
+    def snapshot(self):
+        """
+        The :class:`DeviceSnapshot` of this device.
+
+        The snapshot is queried from the server on first access, unless it
+        was already given upon creation.  It does not reflect any later
+        changes to the device.
 
-        Return a pointer to the device info struct
-        (:class:`~synaptiks._bindings.xinput.XIDeviceInfo`).
+        Raise :exc:`InputDeviceNotFoundError`, if the device does not exist.
         """
-        _, device = xinput.query_device(self.display, self.id)
-        if not device:
-            raise InputDeviceNotFoundError(self.id)
-        yield device
-        xinput.free_device_info(device)
+        snapshot = self._snapshots.get(self.id)
+        if snapshot is None:
+            snapshot = DeviceSnapshot.query(self.display, self.id)[self.id]
+            self._snapshots[self.id] = snapshot
+        return snapshot
 
     @property
     def name(self):
         """
         The name of this device as unicode string.
         """
-        with self._query_device() as device:
-            return ensure_unicode_string(device.contents.name)
+        return self.snapshot.name
 
     @property
     def is_master(self):
@@ -431,8 +906,7 @@ class InputDevice(Mapping):
 
         .. seealso:: :meth:`all_devices()`
         """
-        with self._query_device() as device:
-            return device.contents.use in self.MASTER_USES
+        return self.snapshot.use in self.MASTER_USES
 
     @property
     def type(self):
@@ -447,8 +921,7 @@ class InputDevice(Mapping):
 
         .. seealso:: :attr:`is_master`
         """
-        with self._query_device() as device:
-            return self.USE_TO_TYPE[device.contents.use]
+        return self.USE_TO_TYPE[self.snapshot.use]
 
     @property
     def attachment_device(self):
@@ -474,8 +947,8 @@ class InputDevice(Mapping):
         if self.type == 'floating':
             return None
         else:
-            with self._query_device() as device:
-                return self.__class__(self.display, device.contents.attachment)
+            return self.__class__(self.display, self.snapshot.attachment,
+                                  self._snapshots)
 
     def __repr__(self):
         return '<{0}({1}, name={2!r})>'.format(self.__class__.__name__,
@@ -490,30 +963,35 @@ class InputDevice(Mapping):
     def __hash__(self):
         return hash(self.id)
 
+    def _property_atoms(self):
+        """
+        Return a frozenset with the integral atoms of all properties of this
+        device, as maintained by the
+        :attr:`~synaptiks.x11.Display.property_index`, or as queried from the
+        server, if the display has no index.
+        """
+        index = self.display.property_index
+        if index is None:
+            properties, = xinput.list_device_properties(self.display,
+                                                        [self.id])
+            return frozenset(properties)
+        return index.get_properties(self.id)
+
     def __len__(self):
         """
         Return the amount of all properties defined on this device.
         """
-        number_of_properties, property_atoms = xinput.list_properties(
-            self.display, self.id)
-        with scoped_pointer(property_atoms, xlib.free):
-            return number_of_properties
-
-    def _iter_property_atoms(self):
-        number_of_properties, property_atoms = xinput.list_properties(
-            self.display, self.id)
-        with scoped_pointer(property_atoms, xlib.free):
-            for i in xrange(number_of_properties):
-                yield Atom(self.display, property_atoms[i])
+        return len(self._property_atoms())
 
     def __iter__(self):
         """
         Iterate over the names of all properties defined for this device.
 
-        Return a generator yielding the names of all properties of this
+        Return an iterator yielding the names of all properties of this
         device as unicode strings
         """
-        return (a.name for a in self._iter_property_atoms())
+        atoms = sorted(self._property_atoms())
+        return iter(self.display.get_atom_names(atoms))
 
     def __contains__(self, name):
         """
@@ -527,7 +1005,7 @@ class InputDevice(Mapping):
         atom = self.display.intern_atom(name)
         if atom is None:
             return False
-        return any(a == atom for a in self._iter_property_atoms())
+        return atom.value in self._property_atoms()
 
     def __getitem__(self, name):
         """
@@ -548,17 +1026,159 @@ class InputDevice(Mapping):
         :exc:`~exceptions.KeyError`), if the property is not defined on the
         server at all.  Raise :exc:`PropertyTypeError`, if the property has an
         unsupported property_type.
+
+        .. seealso:: :meth:`get_value()`
+        """
+        return self.get_value(name).tolist()
+
+    def get_value(self, name):
+        """
+        Get the given property as :class:`PropertyValue`.
+
+        Unlike :meth:`__getitem__()` this method does not decode the property
+        items up front.  Use this method, if only some items of a property
+        are required, or if a property is read very often.
+
+        ``name`` is the property name as string.
+
+        Return a :class:`PropertyValue` with the items of the property.
+        Raise the same exceptions as :meth:`__getitem__()`.
         """
         atom = _get_property_atom(self.display, name)
-        property_type, property_format, data = xinput.get_property(
-            self.display, self.id, atom)
+        pending = (self._pending_changes or {}).get(atom)
+        if pending:
+            property_type, property_format, data = pending
+        else:
+            property_type, property_format, data = self._get_raw(atom)
+        return self._decode_property(name, property_type, property_format,
+                                     data)
+
+    def get_values(self, names):
+        """
+        Get all of the given properties as :class:`PropertyValue` objects.
+
+        Unlike calling :meth:`get_value()` for each property, all properties
+        are fetched with a single request (see :meth:`_get_raw_many()`).
+
+        ``names`` is a sequence of property names as strings.
+
+        Return a list of :class:`PropertyValue` objects in the order of
+        ``names``.  Raise the same exceptions as :meth:`__getitem__()`.
+        """
+        names = list(names)
+        atoms = self.display.intern_atoms(names)
+        for name, atom in zip(names, atoms):
+            if atom is None:
+                raise UndefinedPropertyError(name)
+        raw = self._get_raw_many([atom.value for atom in atoms])
+        return [self._decode_property(name, *entry)
+                for name, entry in zip(names, raw)]
+
+    def _get_raw(self, atom):
+        """
+        Get the raw data of the property with the given ``atom``, from the
+        :attr:`property_cache` if possible.
+
+        Return a tuple ``(type, format, data)`` as returned by
+        :func:`~synaptiks._bindings.xinput.get_property()`.
+        """
+        cache = self.property_cache
+        if cache is not None:
+            entry = cache.get(atom.value)
+            if entry is not None:
+                return entry
+        entry = xinput.get_property(self.display, self.id, atom)
+        if cache is not None and entry[1]:
+            # only cache properties which actually exist on the device
+            cache.store(atom.value, entry)
+        return entry
+
+    def _get_raw_many(self, atoms):
+        """
+        Get the raw data of all properties with the given integral ``atoms``.
+
+        Queued changes and the :attr:`property_cache` are used where
+        possible, all remaining properties are fetched with
+        :func:`~synaptiks._bindings.xinput.get_properties()`.
+
+        Return a list of ``(type, format, data)`` tuples in the order of
+        ``atoms``.
+        """
+        entries = {}
+        pending = self._pending_changes or {}
+        cache = self.property_cache
+        for atom in atoms:
+            entry = pending.get(atom)
+            if entry is None and cache is not None:
+                entry = cache.get(atom)
+            if entry is not None:
+                entries[atom] = entry
+        missing = [a for a in atoms if a not in entries]
+        if missing:
+            fetched = xinput.get_properties(self.display, self.id, missing)
+            for atom, entry in zip(missing, fetched):
+                entries[atom] = entry
+                if cache is not None and entry[1]:
+                    cache.store(atom, entry)
+        return [entries[a] for a in atoms]
+
+    def iteritems(self):
+        """
+        Iterate over all properties of this device.
+
+        Unlike the inherited implementation, which gets each property
+        separately, all properties are fetched at once (see
+        :meth:`_get_raw_many()`).
+
+        Return an iterator over ``(name, value)`` pairs.  Raise the same
+        exceptions as :meth:`__getitem__()`.
+        """
+        atoms = sorted(self._property_atoms())
+        names = self.display.get_atom_names(atoms)
+        for name, raw in zip(names, self._get_raw_many(atoms)):
+            yield name, self._decode_property(name, *raw).tolist()
+
+    def itervalues(self):
+        """
+        Iterate over the values of all properties of this device.
+
+        All properties are fetched at once, see :meth:`iteritems()`.
+        """
+        return (value for _, value in self.iteritems())
+
+    def items(self):
+        """
+        Return a list of ``(name, value)`` pairs of all properties.
+
+        See :meth:`iteritems()`.
+        """
+        return list(self.iteritems())
+
+    def values(self):
+        """
+        Return a list of the values of all properties.
+
+        See :meth:`iteritems()`.
+        """
+        return list(self.itervalues())
+
+    def _decode_property(self, name, property_type, property_format, data):
+        """
+        Decode the raw data of the given property.
+
+        ``name`` is the property name as string.  ``property_type``,
+        ``property_format`` and ``data`` are the raw property as returned by
+        :func:`~synaptiks._bindings.xinput.get_property()`.
+
+        Return a :class:`PropertyValue`.  Raise the same exceptions as
+        :meth:`__getitem__()`.
+        """
         property_type = Atom(self.display, property_type)
         if not property_type and property_format == 0:
             raise KeyError(name)
         if property_type == self.display.types.string:
             # string types means to return the string data unchanged
-            return [data]
-        number_of_items = (len(data) * 8) // property_format
+            return PropertyValue(PropertyValue.STRING, data)
         if property_type in (self.display.types.integer,
                              self.display.types.atom):
             type_code = _TYPE_CODE_MAPPING[property_format]
@@ -566,7 +1186,7 @@ class InputDevice(Mapping):
             type_code = 'f'
         else:
             raise PropertyTypeError(property_type)
-        return _unpack_property_data(type_code, number_of_items, data)
+        return PropertyValue(type_code, data)
 
     def __gt__(self, other):
         raise TypeError('InputDevice not orderable')
@@ -580,10 +1200,58 @@ class InputDevice(Mapping):
     def __ge__(self, other):
         raise TypeError('InputDevice not orderable')
 
+    @contextmanager
+    def batch(self):
+        """
+        Group property changes inside a ``with`` block::
+
+           with device.batch():
+               device.set_bool('Synaptics Off', [True])
+               device.set_int('Synaptics Finger', [25, 30, 256])
+
+        Inside the block, the setters only queue changes.  Repeated changes
+        of the same property are merged, so that only the last one is sent.
+        Reading a property with a queued change returns the queued value.
+
+        Upon exit of the block, all queued changes are sent at once, and the
+        display is synchronized a single time.  Protocol errors caused by any
+        of the changes are raised together as
+        :exc:`~synaptiks.x11.ProtocolError`.  If the block raises an
+        exception, queued changes are discarded and nothing is sent.
+
+        Nested batches are merged into the outermost batch.
+        """
+        if self._pending_changes is not None:
+            yield
+            return
+        self._pending_changes = OrderedDict()
+        try:
+            yield
+            changes = self._pending_changes
+        finally:
+            self._pending_changes = None
+        if not changes:
+            return
+        with self.display.trap_errors():
+            for atom, (type, format, data) in changes.iteritems():
+                xinput.change_property(self.display, self.id, atom,
+                                       type, format, data)
+        if self.property_cache is not None:
+            for atom, entry in changes.iteritems():
+                self.property_cache.store(atom.value, entry)
+
     def _set_raw(self, property, type, format, data):
         atom = _get_property_atom(self.display, property)
+        entry = (type.value, format, data)
+        if self._pending_changes is not None:
+            self._pending_changes[atom] = entry
+            return
         xinput.change_property(self.display, self.id, atom,
                                type, format, data)
+        if self.property_cache is not None:
+            # the change is not checked for errors, so the next read must go
+            # to the server to get the value actually accepted by the device
+            self.property_cache.discard(atom.value)
 
     def set_int(self, property, values):
         """
@@ -57,6 +57,32 @@ def test_load_library_not_existing():
     assert str(exc_info.value) == 'No library named doesNotExist'
 
 
+def test_load_library_soname():
+    with mock.patch.dict(util._library_names, clear=True):
+        with mock.patch.object(util, 'find_library') as find_library:
+            library = util.load_library('X11')
+            assert library._name == util.SONAMES['X11']
+            assert not find_library.called
+            assert util._library_names['X11'] == util.SONAMES['X11']
+
+
+def test_load_library_soname_fallback():
+    with mock.patch.dict(util._library_names, clear=True):
+        with mock.patch.dict(util.SONAMES, {'X11': 'libdoesNotExist.so.0'}):
+            library = util.load_library('X11')
+            assert library
+            assert util._library_names['X11'] != 'libdoesNotExist.so.0'
+
+
+def test_load_library_cached_name():
+    with mock.patch.dict(util._library_names, clear=True):
+        util.load_library('X11')
+        with mock.patch.dict(util.SONAMES, clear=True):
+            with mock.patch.object(util, 'find_library') as find_library:
+                assert util.load_library('X11')
+                assert not find_library.called
+
+
 def test_add_foreign_signatures_errcheck_omitted():
     signatures = dict(spam=(mock.sentinel.argtypes, mock.sentinel.restype))
     library = mock.Mock(name='library')
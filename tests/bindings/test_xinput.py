@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012, Sebastian Wiesner <lunaryorn@googlemail.com>
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import (print_function, division, unicode_literals,
+                        absolute_import)
+
+import mock
+
+from synaptiks._bindings import xlib, xinput
+from synaptiks.x11.input import InputDevice
+
+
+def pytest_funcarg__test_keyboard(request):
+    display = request.getfuncargvalue('display')
+    return next(InputDevice.find_devices_by_name(
+        display, 'Virtual core XTEST keyboard'))
+
+
+def pytest_funcarg__property_atoms(request):
+    display = request.getfuncargvalue('display')
+    test_keyboard = request.getfuncargvalue('test_keyboard')
+    number_of_properties, property_atoms = xinput.list_properties(
+        display, test_keyboard.id)
+    try:
+        return property_atoms[:number_of_properties]
+    finally:
+        xlib.free(property_atoms)
+
+
+def test_get_properties(display, test_keyboard, property_atoms):
+    assert property_atoms
+    properties = xinput.get_properties(display, test_keyboard.id,
+                                       property_atoms)
+    assert properties == [
+        xinput.get_property(display, test_keyboard.id, atom)
+        for atom in property_atoms]
+
+
+def test_list_device_properties(display, test_keyboard, property_atoms):
+    properties = xinput.list_device_properties(
+        display, [test_keyboard.id, test_keyboard.id])
+    assert properties == [property_atoms, property_atoms]
+
+
+def test_get_properties_empty(display, test_keyboard):
+    assert xinput.get_properties(display, test_keyboard.id, []) == []
+
+
+def test_get_properties_not_defined_on_device(display, test_keyboard):
+    atom = xlib.intern_atom(display, b'synaptiks test property', False)
+    properties = xinput.get_properties(display, test_keyboard.id, [atom])
+    assert properties == [(xlib.NONE, 0, b'')]
+
+
+def test_get_property_remembers_length(display, test_keyboard,
+                                       property_atoms):
+    xinput._property_length_hints.clear()
+    for atom in property_atoms:
+        _, _, data = xinput.get_property(display, test_keyboard.id, atom)
+        length = xinput._property_length_hints[(test_keyboard.id, atom)]
+        assert length * 4 >= len(data)
+
+
+def test_get_property_grows_between_requests():
+    xinput._property_length_hints.clear()
+    replies = [(19, 8, 4, b'\x00' * 4), (19, 8, 4, b'\x00' * 8),
+               (19, 8, 0, b'\x00' * 12)]
+    with mock.patch.object(xinput, '_get_property_data',
+                           side_effect=replies) as get_property_data:
+        _, _, data = xinput.get_property(mock.sentinel.display, 2, 276)
+    assert data == b'\x00' * 12
+    assert [c[0][3] for c in get_property_data.call_args_list] == [
+        xinput.DEFAULT_PROPERTY_LENGTH, 2, 3]
+    assert xinput._property_length_hints[(2, 276)] == 3
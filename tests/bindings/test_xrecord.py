@@ -27,8 +27,10 @@
 from __future__ import (print_function, division, unicode_literals,
                         absolute_import)
 
+from select import select
 from functools import partial
 
+from synaptiks.x11 import Display
 from synaptiks._bindings import xlib, xrecord
 
 
@@ -72,3 +74,28 @@ def test_create_context(display):
     finally:
         if context:
             assert xrecord.free_context(display, context)
+
+
+def test_enable_context_async(display, context):
+    categories = []
+
+    def handle_data(_, data):
+        categories.append(data.contents.category)
+        xrecord.free_data(data)
+
+    xlib.sync(display, False)
+    with Display.from_name() as recording_display:
+        callback = xrecord.enable_context_async(
+            recording_display, context, handle_data, None)
+        assert callback
+        connection = xlib.connection_number(recording_display)
+        while xrecord.START_OF_DATA not in categories:
+            readable, _, _ = select([connection], [], [], 5)
+            assert readable
+            xrecord.process_replies(recording_display)
+        xrecord.disable_context(display, context)
+        xlib.sync(display, False)
+        while xrecord.END_OF_DATA not in categories:
+            readable, _, _ = select([connection], [], [], 5)
+            assert readable
+            xrecord.process_replies(recording_display)
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012, Sebastian Wiesner <lunaryorn@googlemail.com>
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+from __future__ import (print_function, division, unicode_literals,
+                        absolute_import)
+
+from select import select
+
+from synaptiks._bindings import xlib, xtest
+from synaptiks.x11.events import RawKeyEventSource
+
+
+def test_query_extension(display):
+    success, version = xtest.query_extension(display)
+    assert success
+    assert version >= (2, 1)
+
+
+def test_fake_key_event(display):
+    with RawKeyEventSource() as source:
+        received = []
+        source.add_listener(received.append)
+        source.process_events()
+        assert xtest.fake_key_event(display, 38, True)
+        assert xtest.fake_key_event(display, 38, False)
+        xlib.flush(display)
+        while len(received) < 2:
+            readable, _, _ = select([source], [], [], 1)
+            assert readable
+            source.process_events()
+        assert [e[-2:] for e in received] == [(38, True), (38, False)]
@@ -141,3 +141,15 @@ class TestConfigurationWidgetMixin(object):
         config_widget.change('eggs', True)
         config_widget.apply_configuration()
         assert config == {'lineedit': 'eggs', 'checkbox': True}
+
+    def test_key_without_widget(self, qtapp):
+        # keys without widgets (e.g. runtime state like a learned histogram)
+        # must neither mark the configuration as changed, nor hide defaults
+        config = DummyConfig({'lineedit': 'spam', 'checkbox': False,
+                              'histogram': [1.0, 2.0]})
+        config_widget = DummyConfigWidget(config)
+        assert not config_widget.is_configuration_changed
+        assert config_widget.shows_defaults()
+        config_widget.change('eggs', True)
+        config_widget.apply_configuration()
+        assert config['histogram'] == [1.0, 2.0]
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012, Sebastian Wiesner <lunaryorn@googlemail.com>
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+from __future__ import (print_function, division, unicode_literals,
+                        absolute_import)
+
+import os
+
+import pytest
+
+from synaptiks.monitors import evdev
+from synaptiks.monitors.evdev import INPUT_EVENT, EV_KEY, KeyEvent
+
+EV_SYN = 0
+EV_MSC = 4
+
+
+def record(*events):
+    """
+    Encode the given ``events`` as recorded from an event device.
+
+    Each event is a tuple ``(time, type, code, value)``.
+    """
+    return b''.join(
+        INPUT_EVENT.pack(int(time), int(round(time % 1 * 1000000)),
+                         type, code, value)
+        for time, type, code, value in events)
+
+
+def keystroke(time, code):
+    """
+    Record the events of a single keystroke of the key with the given evdev
+    ``code``, like the kernel reports it.
+    """
+    return record((time, EV_MSC, 4, 0x70004), (time, EV_KEY, code, 1),
+                  (time, EV_SYN, 0, 0), (time + 0.5, EV_KEY, code, 0),
+                  (time + 0.5, EV_SYN, 0, 0))
+
+
+def pytest_funcarg__source(request):
+    return request.cached_setup(evdev.EvdevKeyEventSource,
+                                lambda s: s.close(), scope='function')
+
+
+def pytest_funcarg__pipe(request):
+    """
+    A pipe, whose reading end is added as device ``'pipe'`` to the source.
+    Return the writing end.
+    """
+    source = request.getfuncargvalue('source')
+    read_end, write_end = os.pipe()
+    source.add_device(read_end, 'pipe')
+    request.addfinalizer(lambda: os.close(write_end))
+    return write_end
+
+
+def replay(source):
+    received = []
+    source.add_listener(received.append)
+    try:
+        source.process_events()
+    finally:
+        source.remove_listener(received.append)
+    return received
+
+
+def test_no_pending_events(source, pipe):
+    assert source.process_events() == 0
+
+
+def test_keystroke(source, pipe):
+    os.write(pipe, keystroke(10, 30))
+    assert replay(source) == [KeyEvent(10, 'pipe', 38, True, False),
+                              KeyEvent(10.5, 'pipe', 38, False, False)]
+
+
+def test_key_repeat(source, pipe):
+    os.write(pipe, record((10, EV_KEY, 30, 2)))
+    assert replay(source) == [KeyEvent(10, 'pipe', 38, True, True)]
+
+
+def test_bulk_read(source, pipe):
+    # more events than fit into the buffer
+    number_of_keystrokes = source.EVENTS_PER_READ
+    os.write(pipe, b''.join(keystroke(i, 30)
+                            for i in range(number_of_keystrokes)))
+    assert source.process_events() == number_of_keystrokes * 2
+    assert source.process_events() == 0
+
+
+def test_end_of_file(source):
+    read_end, write_end = os.pipe()
+    source.add_device(read_end, 'pipe')
+    os.write(write_end, keystroke(10, 30))
+    os.close(write_end)
+    assert len(replay(source)) == 2
+    # the end of file is noticed upon the next read
+    assert source.process_events() == 0
+    assert source.devices == []
+
+
+def test_remove_device(source, pipe):
+    assert source.devices == ['pipe']
+    source.remove_device('pipe')
+    assert source.devices == []
+    with pytest.raises(KeyError):
+        source.remove_device('pipe')
+
+
+def test_open_device_not_existing(source, tmpdir):
+    with pytest.raises(EnvironmentError):
+        source.open_device(str(tmpdir.join('event0')))
+
+
+def test_add_device_twice(source, pipe):
+    read_end, write_end = os.pipe()
+    try:
+        with pytest.raises(ValueError):
+            source.add_device(read_end, 'pipe')
+        # the descriptor is still open
+        os.fstat(read_end)
+        assert source.devices == ['pipe']
+    finally:
+        os.close(read_end)
+        os.close(write_end)
+
+
+def test_open_device_closes_descriptor_on_error(source, pipe, tmpdir):
+    # regular files cannot be watched with epoll
+    tmpdir.join('event0').write('')
+    open_fds = set(os.listdir('/proc/self/fd'))
+    with pytest.raises(EnvironmentError):
+        source.open_device(str(tmpdir.join('event0')))
+    assert set(os.listdir('/proc/self/fd')) == open_fds
+    assert source.devices == ['pipe']
+
+
+def test_fileno(source, pipe):
+    assert source.fileno() > 0
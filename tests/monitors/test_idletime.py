@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012, Sebastian Wiesner <lunaryorn@googlemail.com>
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+from __future__ import (print_function, division, unicode_literals,
+                        absolute_import)
+
+import pytest
+
+from synaptiks.monitors.idletime import IdleTimeEstimator
+
+
+def pytest_funcarg__estimator(request):
+    return IdleTimeEstimator(percentile=0.9)
+
+
+def test_empty(estimator):
+    assert estimator.weight == 0
+    assert estimator.histogram == []
+    assert estimator.estimate() is None
+
+
+def test_not_enough_intervals(estimator):
+    for _ in range(estimator.MINIMUM_WEIGHT - 1):
+        estimator.add_interval(0.2)
+    assert estimator.estimate() is None
+
+
+def test_estimate(estimator):
+    for _ in range(20):
+        for interval in (0.1, 0.1, 0.1, 0.1, 1):
+            estimator.add_interval(interval)
+    # the upper bound of the bin of the short intervals
+    estimator.percentile = 0.75
+    assert 0.1 < estimator.estimate() < 0.1 * 1.2
+    estimator.percentile = 0.9
+    assert 1 < estimator.estimate() < 1.2
+
+
+def test_bounds(estimator):
+    for _ in range(100):
+        estimator.add_interval(0)
+    assert estimator.estimate() <= estimator.MINIMUM_INTERVAL * 1.2
+    # pauses between typing are ignored
+    weight = estimator.weight
+    estimator.add_interval(estimator.MAXIMUM_INTERVAL + 1)
+    assert estimator.weight == weight
+
+
+def test_decay(estimator):
+    for _ in range(1000):
+        estimator.add_interval(1)
+    for _ in range(2000):
+        estimator.add_interval(0.1)
+    assert estimator.estimate() < 0.2
+    assert estimator.weight < 1000
+
+
+def test_rescale(estimator, monkeypatch):
+    monkeypatch.setattr(estimator, '_RESCALE_LIMIT', 10)
+    for _ in range(10000):
+        estimator.add_interval(0.1)
+    assert estimator._increment <= 10
+    decay = estimator.DECAY
+    expected = decay * (1 - decay ** 10000) / (1 - decay)
+    assert abs(estimator.weight - expected) < 1e-6 * expected
+
+
+def test_histogram_roundtrip(estimator):
+    for interval in (0.05, 0.1, 0.2, 0.4) * 20:
+        estimator.add_interval(interval)
+    histogram = estimator.histogram
+    assert len(histogram) == estimator.BINS
+    restored = IdleTimeEstimator(estimator.percentile, histogram)
+    assert restored.histogram == histogram
+    assert restored.estimate() == estimator.estimate()
+
+
+def test_histogram_clear(estimator):
+    estimator.add_interval(0.1)
+    estimator.histogram = []
+    assert estimator.weight == 0
+
+
+def test_histogram_invalid(estimator):
+    with pytest.raises(ValueError):
+        estimator.histogram = [1.0, 2.0]
@@ -0,0 +1,573 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012, Sebastian Wiesner <lunaryorn@googlemail.com>
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+from __future__ import (print_function, division, unicode_literals,
+                        absolute_import)
+
+import os
+import warnings
+
+import mock
+import pytest
+
+pytest.importorskip('PyQt4.QtCore')
+
+from synaptiks.monitors import keyboard
+from synaptiks.x11.input import DeviceSnapshot, XInputVersionError
+from synaptiks.x11.events import RawKeyEvent, HierarchyEvent, MappingEvent
+from synaptiks.monitors.evdev import INPUT_EVENT, EV_KEY
+from synaptiks.monitors.idletime import IdleTimeEstimator
+from synaptiks._bindings import xlib
+from synaptiks._bindings.xlib import ModifierMap
+
+
+MODIFIERS = ModifierMap((50, 62), (66, 0), (37, 105), (64, 108),
+                        (77, 0), (0, 0), (133, 134), (92, 0))
+
+
+def make_keymap(*keycodes):
+    keymap = bytearray(32)
+    for keycode in keycodes:
+        keymap[keycode // 8] |= 1 << (keycode % 8)
+    return bytes(keymap)
+
+
+def test_keymap_to_int():
+    assert keyboard.keymap_to_int(make_keymap()) == 0
+    assert keyboard.keymap_to_int(make_keymap(9)) == 1 << 9
+    assert keyboard.keymap_to_int(make_keymap(8, 255)) == \
+           (1 << 8) | (1 << 255)
+    assert keyboard.keymap_to_int(b'\xff' * 32) == keyboard.ALL_KEYS
+
+
+def test_keycodes_to_int():
+    assert keyboard.keycodes_to_int([0, 50, 62, 0]) == (1 << 50) | (1 << 62)
+
+
+def test_next_poll_delay():
+    monitor_class = keyboard.PollingKeyboardMonitor
+    delay = monitor_class.DEFAULT_POLLDELAY
+    delays = []
+    for _ in range(5):
+        delay = monitor_class._next_poll_delay(delay, False, False)
+        delays.append(delay)
+    assert delays == sorted(delays)
+    assert delays[-1] == monitor_class.MAXIMUM_POLLDELAY
+    for typing in (False, True):
+        assert monitor_class._next_poll_delay(delay, True, typing) == \
+               monitor_class.MINIMUM_POLLDELAY
+
+
+def test_next_poll_delay_while_typing():
+    # a tap, which is not seen at any poll, is lost, so polling while typing
+    # must not be slower than the default interval
+    monitor_class = keyboard.PollingKeyboardMonitor
+    delay = monitor_class.MINIMUM_POLLDELAY
+    for _ in range(5):
+        delay = monitor_class._next_poll_delay(delay, False, True)
+    assert delay == monitor_class.DEFAULT_POLLDELAY
+
+
+def test_idle_poll_delay_bounds():
+    monitor_class = keyboard.PollingKeyboardMonitor
+    # fewer wakeups while idle, but typing is still detected within a second
+    assert monitor_class.MAXIMUM_POLLDELAY > monitor_class.DEFAULT_POLLDELAY
+    assert monitor_class.MAXIMUM_POLLDELAY <= 1000
+    delay = monitor_class.MINIMUM_POLLDELAY
+    elapsed = polls = 0
+    while elapsed < 60000:
+        delay = monitor_class._next_poll_delay(delay, False, False)
+        elapsed += delay
+        polls += 1
+    assert polls < 60000 / monitor_class.DEFAULT_POLLDELAY / 3
+
+
+def test_create_keyboard_monitor_old_xinput():
+    patches = [mock.patch.object(keyboard, 'Display'),
+               mock.patch.object(keyboard, 'xrecord', None),
+               mock.patch.object(keyboard, 'RawEventKeyboardMonitor'),
+               mock.patch.object(keyboard, 'PollingKeyboardMonitor'),
+               mock.patch.object(keyboard, 'RawKeyEventSource')]
+    for patch in patches:
+        patch.start()
+    try:
+        monitor = keyboard.create_keyboard_monitor()
+        assert monitor is keyboard.RawEventKeyboardMonitor.return_value
+        keyboard.RawKeyEventSource.side_effect = XInputVersionError(
+            (2, 1), (2, 0))
+        monitor = keyboard.create_keyboard_monitor()
+        assert monitor is keyboard.PollingKeyboardMonitor.return_value
+    finally:
+        for patch in reversed(patches):
+            patch.stop()
+
+
+def pytest_funcarg__mapping_source(request):
+    """
+    Let modifier mappings query :data:`MODIFIERS`, and return the mocked
+    :class:`~synaptiks.x11.events.MappingEventSource` class.
+    """
+    request.getfuncargvalue('qtapp')
+    # the socket notifier needs a real file descriptor
+    read_end, write_end = os.pipe()
+    request.addfinalizer(lambda: os.close(read_end))
+    request.addfinalizer(lambda: os.close(write_end))
+    patches = [mock.patch.object(keyboard, 'MappingEventSource'),
+               mock.patch.object(keyboard.xlib, 'get_modifier_mapping',
+                                 mock.Mock(return_value=MODIFIERS))]
+    for patch in patches:
+        patch.start()
+        request.addfinalizer(patch.stop)
+    request.addfinalizer(keyboard.ModifierMapping._instances.clear)
+    source_class = keyboard.MappingEventSource
+    source_class.return_value.fileno.return_value = read_end
+    source_class.return_value.process_events.return_value = 0
+    return source_class
+
+
+def change_mapping(mapping, *events):
+    """
+    Let the event source of ``mapping`` deliver the given mapping ``events``.
+    """
+    source = mapping._source
+    listener = source.add_listener.call_args[0][0]
+    pending = list(events)
+
+    def process_events():
+        while pending:
+            listener(pending.pop(0))
+    source.process_events.side_effect = process_events
+    mapping._process_events()
+
+
+def test_modifier_mapping_masks(mapping_source):
+    mapping = keyboard.ModifierMapping(':0')
+    mapping_source.assert_called_once_with(':0')
+    assert mapping.modifiers == frozenset(
+        [50, 62, 66, 37, 105, 64, 108, 77, 133, 134, 92])
+    assert mapping.modifier_mask == keyboard.keycodes_to_int(
+        mapping.modifiers)
+    assert mapping.non_modifier_mask & mapping.modifier_mask == 0
+    assert mapping.non_modifier_mask | mapping.modifier_mask == \
+           keyboard.ALL_KEYS
+
+
+def test_modifier_mapping_for_display(mapping_source):
+    display = mock.Mock()
+    display.name = ':0'
+    mapping = keyboard.ModifierMapping.for_display(display)
+    assert keyboard.ModifierMapping.for_display(display) is mapping
+    other_display = mock.Mock()
+    other_display.name = ':1'
+    assert keyboard.ModifierMapping.for_display(other_display) is not mapping
+    assert keyboard.xlib.get_modifier_mapping.call_count == 2
+
+
+def test_modifier_mapping_changed(mapping_source):
+    mapping = keyboard.ModifierMapping(':0')
+    changed = mock.Mock()
+    mapping.changed.connect(changed)
+    get_modifier_mapping = keyboard.xlib.get_modifier_mapping
+    get_modifier_mapping.reset_mock()
+    change_mapping(mapping, MappingEvent(xlib.MAPPING_POINTER, 0, 0))
+    assert not get_modifier_mapping.called
+    assert not changed.called
+    get_modifier_mapping.return_value = ModifierMap(
+        (50, 62), (66, 0), (37, 105), (0, 0), (0, 0), (0, 0), (0, 0), (0, 0))
+    # many events are handled with a single query
+    change_mapping(mapping, MappingEvent(xlib.MAPPING_KEYBOARD, 8, 248),
+                   MappingEvent(xlib.MAPPING_MODIFIER, 0, 0))
+    assert get_modifier_mapping.call_count == 1
+    assert changed.call_count == 1
+    assert mapping.modifiers == frozenset([50, 62, 66, 37, 105])
+
+
+def test_modifier_mapping_changed_while_querying(mapping_source):
+    mapping = keyboard.ModifierMapping(':0')
+    get_modifier_mapping = keyboard.xlib.get_modifier_mapping
+    get_modifier_mapping.reset_mock()
+    listener = mapping._source.add_listener.call_args[0][0]
+    events = [MappingEvent(xlib.MAPPING_MODIFIER, 0, 0)]
+
+    def query(display):
+        if events:
+            # the event arrives, while the query is running
+            listener(events.pop())
+        return MODIFIERS
+    get_modifier_mapping.side_effect = query
+    change_mapping(mapping, MappingEvent(xlib.MAPPING_MODIFIER, 0, 0))
+    assert get_modifier_mapping.call_count == 2
+    assert not mapping._stale
+
+
+def pytest_funcarg__polling_monitor(request):
+    request.getfuncargvalue('mapping_source')
+    patches = [mock.patch.object(keyboard, 'Display'),
+               mock.patch.object(keyboard.xlib, 'query_keymap')]
+    for patch in patches:
+        patch.start()
+        request.addfinalizer(patch.stop)
+    return keyboard.PollingKeyboardMonitor()
+
+
+def press(monitor, *keycodes):
+    keyboard.xlib.query_keymap.return_value = (1, make_keymap(*keycodes))
+    return monitor.keyboard_active
+
+
+def test_polling_monitor_ignored_keyboards(polling_monitor):
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        polling_monitor.ignored_keyboards = ['Yubikey']
+        polling_monitor.ignored_keyboards = []
+    assert [w.category for w in caught] == [RuntimeWarning]
+    assert 'PollingKeyboardMonitor' in unicode(caught[0].message)
+
+
+def test_polling_monitor_reuses_buffer(polling_monitor):
+    press(polling_monitor, 38)
+    press(polling_monitor)
+    buffers = set(id(call[0][1]) for call in
+                  keyboard.xlib.query_keymap.call_args_list)
+    assert len(buffers) == 1
+
+
+def test_polling_monitor_no_keys_ignored(polling_monitor):
+    assert press(polling_monitor, 38)
+    # still pressed, but not newly pressed
+    assert not press(polling_monitor, 38)
+    assert press(polling_monitor, 38, 50)
+    assert not press(polling_monitor)
+
+
+def test_polling_monitor_modifier_keys(polling_monitor):
+    polling_monitor.keys_to_ignore = polling_monitor.IGNORE_MODIFIER_KEYS
+    assert not press(polling_monitor, 50)
+    assert press(polling_monitor, 50, 38)
+
+
+def test_polling_monitor_modifier_mapping_changed(polling_monitor):
+    polling_monitor.keys_to_ignore = polling_monitor.IGNORE_MODIFIER_KEYS
+    keyboard.xlib.get_modifier_mapping.return_value = ModifierMap(
+        (62, 0), (0, 0), (0, 0), (0, 0), (0, 0), (0, 0), (0, 0), (0, 0))
+    change_mapping(polling_monitor._modifier_mapping,
+                   MappingEvent(xlib.MAPPING_MODIFIER, 0, 0))
+    assert press(polling_monitor, 50)
+    assert not press(polling_monitor, 50, 62)
+
+
+def test_polling_monitor_modifier_combos(polling_monitor):
+    polling_monitor.keys_to_ignore = polling_monitor.IGNORE_MODIFIER_COMBOS
+    assert not press(polling_monitor, 37)
+    assert not press(polling_monitor, 37, 38)
+    assert not press(polling_monitor)
+    assert press(polling_monitor, 38)
+
+
+def pytest_funcarg__raw_monitor(request):
+    request.getfuncargvalue('mapping_source')
+    patches = [mock.patch.object(keyboard, 'Display'),
+               mock.patch.object(keyboard, 'RawKeyEventSource'),
+               mock.patch.object(keyboard, 'QSocketNotifier')]
+    for patch in patches:
+        patch.start()
+        request.addfinalizer(patch.stop)
+    monitor = keyboard.RawEventKeyboardMonitor()
+    request.addfinalizer(monitor.stop)
+    return monitor
+
+
+def feed(monitor, *events):
+    """
+    Let the event source of ``monitor`` deliver the given raw key ``events``.
+    """
+    source = monitor._source
+    listener = source.add_listener.call_args[0][0]
+    source.process_events.side_effect = lambda: [listener(e) for e in events]
+    monitor._process_events()
+
+
+def test_raw_monitor_start_stop(raw_monitor):
+    assert not raw_monitor.is_running
+    raw_monitor.start()
+    assert raw_monitor.is_running
+    source = raw_monitor._source
+    raw_monitor.stop()
+    assert not raw_monitor.is_running
+    source.close.assert_called_with()
+
+
+def test_raw_monitor_typing(raw_monitor):
+    started = mock.Mock()
+    stopped = mock.Mock()
+    raw_monitor.typingStarted.connect(started)
+    raw_monitor.typingStopped.connect(stopped)
+    # the idle time is taken, when typing starts
+    raw_monitor.idle_time = 0
+    raw_monitor.start()
+    feed(raw_monitor, RawKeyEvent(0, 3, 11, 38, True, False),
+         RawKeyEvent(0, 3, 11, 38, False, False))
+    assert raw_monitor.keyboard_active
+    assert started.call_count == 1
+    assert raw_monitor._idle_timer.isActive()
+    raw_monitor._check_idle()
+    assert not raw_monitor.keyboard_active
+    assert stopped.call_count == 1
+
+
+def test_raw_monitor_modifier_keys(raw_monitor):
+    raw_monitor.keys_to_ignore = raw_monitor.IGNORE_MODIFIER_KEYS
+    raw_monitor.start()
+    feed(raw_monitor, RawKeyEvent(0, 3, 11, 50, True, False))
+    assert not raw_monitor.keyboard_active
+    assert not raw_monitor._idle_timer.isActive()
+
+
+def test_raw_monitor_modifier_mapping_changed(raw_monitor):
+    raw_monitor.keys_to_ignore = raw_monitor.IGNORE_MODIFIER_KEYS
+    keyboard.xlib.get_modifier_mapping.return_value = ModifierMap(
+        (62, 0), (0, 0), (0, 0), (0, 0), (0, 0), (0, 0), (0, 0), (0, 0))
+    change_mapping(raw_monitor._modifier_mapping,
+                   MappingEvent(xlib.MAPPING_MODIFIER, 0, 0))
+    raw_monitor.start()
+    feed(raw_monitor, RawKeyEvent(0, 3, 11, 50, True, False))
+    assert raw_monitor.keyboard_active
+
+
+def test_raw_monitor_ignored_keyboards(raw_monitor):
+    snapshots = {11: DeviceSnapshot(11, 'AT keyboard', 3, 3, True, ()),
+                 12: DeviceSnapshot(12, 'Yubikey', 3, 3, True, ())}
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        raw_monitor.ignored_keyboards = ['Yubikey']
+    assert not caught
+    raw_monitor.start()
+    with mock.patch.object(keyboard.DeviceSnapshot, 'query',
+                           mock.Mock(return_value=snapshots)) as query:
+        feed(raw_monitor, RawKeyEvent(0, 3, 12, 38, True, False),
+             RawKeyEvent(0, 3, 12, 38, False, False))
+        assert not raw_monitor.keyboard_active
+        # the ids are only looked up again after hierarchy changes
+        feed(raw_monitor, RawKeyEvent(0, 3, 12, 39, True, False))
+        assert query.call_count == 1
+        feed(raw_monitor, HierarchyEvent(0, 0, ()),
+             RawKeyEvent(0, 3, 12, 39, True, False))
+        assert query.call_count == 2
+        assert not raw_monitor.keyboard_active
+        feed(raw_monitor, RawKeyEvent(0, 3, 11, 38, True, False))
+        assert raw_monitor.keyboard_active
+
+
+def test_raw_monitor_invalid_keys_to_ignore(raw_monitor):
+    with pytest.raises(ValueError):
+        raw_monitor.keys_to_ignore = 3
+
+
+def pytest_funcarg__evdev_monitor(request):
+    request.getfuncargvalue('mapping_source')
+    patches = [mock.patch.object(keyboard, 'Display'),
+               mock.patch.object(keyboard, 'pyudev'),
+               mock.patch.object(keyboard, 'QUDevMonitorObserver')]
+    for patch in patches:
+        patch.start()
+        request.addfinalizer(patch.stop)
+    keyboard.pyudev.Context.return_value.list_devices.return_value = []
+    monitor = keyboard.EvdevKeyboardMonitor()
+    request.addfinalizer(monitor.stop)
+    return monitor
+
+
+def test_evdev_monitor_replay(evdev_monitor):
+    started = mock.Mock()
+    evdev_monitor.typingStarted.connect(started)
+    evdev_monitor.keys_to_ignore = evdev_monitor.IGNORE_MODIFIER_KEYS
+    evdev_monitor.start()
+    assert evdev_monitor.is_running
+    read_end, write_end = os.pipe()
+    evdev_monitor._source.add_device(read_end, 'pipe')
+    try:
+        # left shift (evdev code 42) and "a" (evdev code 30)
+        os.write(write_end, b''.join(
+            INPUT_EVENT.pack(10, 0, EV_KEY, code, value)
+            for code, value in [(42, 1), (42, 0)]))
+        evdev_monitor._process_events()
+        assert not evdev_monitor.keyboard_active
+        os.write(write_end, INPUT_EVENT.pack(11, 0, EV_KEY, 30, 1))
+        evdev_monitor._process_events()
+        assert evdev_monitor.keyboard_active
+        assert started.call_count == 1
+        assert evdev_monitor._idle_timer.isActive()
+    finally:
+        os.close(write_end)
+    evdev_monitor.stop()
+    assert not evdev_monitor.is_running
+    assert not evdev_monitor.keyboard_active
+
+
+def make_udev_keyboard(name, device_node):
+    device = mock.MagicMock()
+    device.sys_name = device_node.rsplit('/', 1)[-1]
+    device.device_node = device_node
+    device.get.side_effect = {'ID_INPUT_KEYBOARD': '1'}.get
+    device.parent.get.side_effect = {'NAME': '"{0}"'.format(name)}.get
+    return device
+
+
+def test_evdev_monitor_ignored_keyboards(evdev_monitor):
+    keyboards = [make_udev_keyboard('AT keyboard', '/dev/input/event0'),
+                 make_udev_keyboard('Yubikey', '/dev/input/event1')]
+    keyboard.pyudev.Context.return_value.list_devices.return_value = \
+        keyboards
+    evdev_monitor.ignored_keyboards = ['Yubikey']
+    with mock.patch.object(keyboard, 'EvdevKeyEventSource') as source_class:
+        source = source_class.return_value
+        evdev_monitor.start()
+        source.open_device.assert_called_once_with('/dev/input/event0')
+        source.devices = ['/dev/input/event0']
+        source.remove_device.side_effect = lambda name: setattr(
+            source, 'devices', [d for d in source.devices if d != name])
+        source.open_device.reset_mock()
+        evdev_monitor.ignored_keyboards = []
+        source.remove_device.assert_called_once_with('/dev/input/event0')
+        assert sorted(call[0][0] for call in
+                      source.open_device.call_args_list) == [
+            '/dev/input/event0', '/dev/input/event1']
+
+
+def test_evdev_monitor_open_device_once(evdev_monitor):
+    keyboard.pyudev.Context.return_value.list_devices.return_value = []
+    with mock.patch.object(keyboard, 'EvdevKeyEventSource') as source_class:
+        source = source_class.return_value
+        source.devices = ['/dev/input/event0']
+        evdev_monitor.start()
+        # udev reported a keyboard, which was already opened
+        evdev_monitor._handle_udev_event(
+            'add', make_udev_keyboard('AT keyboard', '/dev/input/event0'))
+        assert not source.open_device.called
+
+
+def pytest_funcarg__activity_filter(request):
+    return keyboard.KeyActivityFilter([37, 50, 64])
+
+
+def test_event_recorder_closes_wakeup_pipe(qtapp, activity_filter):
+    recorder = keyboard.EventRecorder(activity_filter)
+    open_fds = set(os.listdir('/proc/self/fd'))
+    with mock.patch.object(keyboard.EventRecorder, 'run'):
+        for _ in range(3):
+            recorder.start()
+            recorder.wait()
+            recorder.stop()
+    assert set(os.listdir('/proc/self/fd')) == open_fds
+
+
+def test_activity_filter_typing(activity_filter):
+    activity_filter.idle_time = 2
+    assert activity_filter.timeout(10) is None
+    assert activity_filter.key_pressed(38, 10)
+    assert activity_filter.typing
+    assert not activity_filter.key_released(38, 10.1)
+    assert not activity_filter.key_pressed(39, 11)
+    assert activity_filter.timeout(12) == 1
+    assert not activity_filter.check_idle(12)
+    assert activity_filter.check_idle(13)
+    assert not activity_filter.typing
+    assert not activity_filter.check_idle(14)
+    assert activity_filter.timeout(14) is None
+
+
+def test_activity_filter_no_keys_ignored(activity_filter):
+    assert activity_filter.key_pressed(37, 0)
+
+
+def test_activity_filter_modifier_keys(activity_filter):
+    activity_filter.keys_to_ignore = \
+        keyboard.AbstractKeyboardMonitor.IGNORE_MODIFIER_KEYS
+    assert not activity_filter.key_pressed(37, 0)
+    assert activity_filter.key_pressed(38, 0)
+
+
+def test_activity_filter_modifier_combos(activity_filter):
+    activity_filter.keys_to_ignore = \
+        keyboard.AbstractKeyboardMonitor.IGNORE_MODIFIER_COMBOS
+    assert not activity_filter.key_pressed(37, 0)
+    assert not activity_filter.key_pressed(38, 0)
+    assert not activity_filter.key_released(38, 0)
+    assert not activity_filter.key_released(37, 0)
+    assert activity_filter.key_pressed(38, 0)
+
+
+def test_activity_filter_reset(activity_filter):
+    activity_filter.key_pressed(50, 0)
+    activity_filter.reset()
+    assert not activity_filter.typing
+    activity_filter.keys_to_ignore = \
+        keyboard.AbstractKeyboardMonitor.IGNORE_MODIFIER_COMBOS
+    assert activity_filter.key_pressed(38, 0)
+
+
+def test_activity_filter_estimator(activity_filter):
+    estimator = IdleTimeEstimator()
+    activity_filter.estimator = estimator
+    activity_filter.idle_time = 2
+    now = 0
+    for _ in range(100):
+        activity_filter.key_pressed(38, now)
+        activity_filter.key_released(38, now + 0.05)
+        now += 0.2
+    assert estimator.weight > 90
+    # the estimate is only used from the next typing on
+    assert abs(activity_filter.timeout(now) - (2 - 0.15)) < 1e-9
+    assert activity_filter.check_idle(now + 2)
+    activity_filter.key_pressed(38, now + 10)
+    assert abs(activity_filter.timeout(now + 10) -
+               estimator.estimate()) < 1e-9
+    assert estimator.estimate() < 0.3
+
+
+def test_activity_filter_estimator_ignored_keys(activity_filter):
+    estimator = IdleTimeEstimator()
+    activity_filter.estimator = estimator
+    activity_filter.keys_to_ignore = \
+        keyboard.AbstractKeyboardMonitor.IGNORE_MODIFIER_KEYS
+    activity_filter.key_pressed(37, 0)
+    activity_filter.key_pressed(37, 0.1)
+    assert estimator.weight == 0
+
+
+def test_activity_filter_estimator_key_repeat(activity_filter):
+    estimator = IdleTimeEstimator()
+    activity_filter.estimator = estimator
+    assert activity_filter.key_pressed(38, 0)
+    activity_filter.key_pressed(38, 0.5, repeat=True)
+    activity_filter.key_pressed(38, 0.53, repeat=True)
+    assert estimator.weight == 0
+    # repeats keep the user typing
+    assert abs(activity_filter.timeout(0.53) -
+               activity_filter.idle_time) < 1e-9
+    activity_filter.key_released(38, 0.55)
+    activity_filter.key_pressed(39, 0.8)
+    assert estimator.weight > 0
@@ -27,7 +27,9 @@ from __future__ import (print_function, division, unicode_literals,
                         absolute_import)
 
 import os
+import sys
 import json
+import subprocess
 from contextlib import contextmanager
 
 import mock
@@ -37,6 +39,7 @@ import py.path
 from synaptiks import config
 from synaptiks.management import TouchpadManager
 from synaptiks.touchpad import Touchpad, device_property
+from synaptiks.x11.input import UndefinedPropertyError
 
 
 @contextmanager
@@ -76,9 +79,35 @@ def pytest_generate_tests(metafunc):
                 metafunc.addcall(funcargs=dict(key=key), id=key)
 
 
+def make_touchpad_mock(keys, missing_keys=()):
+    """
+    Create a touchpad mock with the given attribute ``keys``, whose
+    ``read_all()`` and ``apply()`` methods behave like those of a real
+    :class:`~synaptiks.touchpad.Touchpad`.
+
+    Reading any of the ``missing_keys`` fails like reading a property, which
+    is not supported by the driver.
+    """
+    touchpad = mock.Mock(name='Touchpad',
+                         spec_set=list(keys) + ['read_all', 'apply'])
+
+    def read_all(names=None):
+        names = keys if names is None else names
+        for key in names:
+            if key in missing_keys:
+                raise UndefinedPropertyError(key)
+        return dict((k, getattr(touchpad, k)) for k in names)
+    touchpad.read_all.side_effect = read_all
+
+    def apply(mapping):
+        for key, value in mapping.iteritems():
+            setattr(touchpad, key, value)
+    touchpad.apply.side_effect = apply
+    return touchpad
+
+
 def pytest_funcarg__touchpad(request):
-    keys = config.TouchpadConfiguration.CONFIG_KEYS
-    return mock.Mock(name='Touchpad', spec_set=list(keys))
+    return make_touchpad_mock(config.TouchpadConfiguration.CONFIG_KEYS)
 
 
 def pytest_funcarg__touchpad_config(request):
@@ -95,7 +124,10 @@ def pytest_funcarg__touchpad_manager(request):
 
 def pytest_funcarg__manager_config_sample(request):
     return {'monitor_mouses': True, 'ignored_mouses': ['spam', 'eggs'],
-            'monitor_keyboard': True, 'idle_time': 0.5, 'keys_to_ignore': 1}
+            'monitor_keyboard': True, 'idle_time': 0.5, 'keys_to_ignore': 1,
+            'adaptive_idle_time': True, 'idle_time_percentile': 0.9,
+            'idle_time_histogram': [float(i) for i in range(48)],
+            'ignored_keyboards': ['Yubico Yubikey NEO OTP']}
 
 
 def pytest_funcarg__manager_config(request):
@@ -164,6 +196,75 @@ def test_get_touchpad_defaults_existing_without_filename(tmpdir):
         assert config.get_touchpad_defaults() == data
 
 
+CHECK_CLI_IMPORTS = """
+import os
+import sys
+from synaptiks import config
+sys.argv = ['synaptikscfg', '--no-server', 'get']
+sys.stdout = sys.stderr = open(os.devnull, 'w')
+try:
+    config.main()
+except SystemExit:
+    pass
+sys.stdout = sys.__stdout__
+import synaptiks.monitors
+print(' '.join(sorted(set(name.split('.')[0] for name in sys.modules
+                          if name.startswith(('PyQt4', 'PyKDE4', 'sip',
+                                              'pyudev', 'dbus'))))))
+"""
+
+
+def test_main_imports_no_gui_modules():
+    output = subprocess.check_output([sys.executable, '-c', CHECK_CLI_IMPORTS])
+    assert output.split() == []
+
+
+@contextmanager
+def patched_main(argv, **send_request):
+    """
+    Patch the command line and :func:`synaptiks.daemon.send_request()` for
+    :func:`synaptiks.config.main()`, and yield the patched X11
+    :class:`~synaptiks.x11.Display` class, which is used without a server.
+    """
+    from synaptiks import daemon
+    with mock.patch.object(sys, 'argv', ['synaptikscfg'] + argv):
+        with mock.patch.object(daemon, 'send_request',
+                               mock.Mock(**send_request)):
+            with mock.patch.object(daemon, 'ConfigurationService') as service:
+                service.return_value.execute.return_value = {'result': []}
+                with mock.patch('synaptiks.x11.Display') as display:
+                    yield display
+
+
+def test_main_sends_absolute_filename():
+    with patched_main(['save', 'spam.json'],
+                      return_value={'result': None}) as display:
+        config.main()
+        from synaptiks import daemon
+        request = daemon.send_request.call_args[0][0]
+        assert request['filename'] == os.path.abspath('spam.json')
+        assert not display.from_name.called
+
+
+def test_main_no_server():
+    import errno
+    import socket
+    error = socket.error(errno.ECONNREFUSED, 'Connection refused')
+    with patched_main(['set', 'fast_taps', '1'],
+                      side_effect=error) as display:
+        config.main()
+        assert display.from_name.called
+
+
+def test_main_server_timeout():
+    import socket
+    with patched_main(['set', 'fast_taps', '1'],
+                      side_effect=socket.timeout()) as display:
+        with pytest.raises(SystemExit):
+            config.main()
+        assert not display.from_name.called
+
+
 class TestTouchpadConfiguration(object):
 
     def test_complete(self):
@@ -184,7 +285,7 @@ class TestTouchpadConfiguration(object):
             config_file = py.path.local(config.get_touchpad_config_file_path())
             keys = config.TouchpadConfiguration.CONFIG_KEYS
             config_file.write(json.dumps(dict((k, k) for k in keys)))
-            touchpad = mock.Mock(name='Touchpad', spec_set=list(keys))
+            touchpad = make_touchpad_mock(keys)
             touchpad_config = config.TouchpadConfiguration.load(touchpad)
             assert touchpad_config.touchpad is touchpad
             assert all(getattr(touchpad, k) == k for k in keys)
@@ -203,7 +304,7 @@ class TestTouchpadConfiguration(object):
         config_file = tmpdir.join('test.json')
         keys = config.TouchpadConfiguration.CONFIG_KEYS
         config_file.write(json.dumps(dict((k, k) for k in keys)))
-        touchpad = mock.Mock(name='Touchpad', spec_set=list(keys))
+        touchpad = make_touchpad_mock(keys)
         touchpad_config = config.TouchpadConfiguration.load(
             touchpad, str(config_file))
         assert touchpad_config.touchpad is touchpad
@@ -265,6 +366,45 @@ class TestTouchpadConfiguration(object):
         with pytest.raises(KeyError):
             touchpad_config['spam'] = mock.sentinel.value
 
+    def test_update_changed_only(self, touchpad_config):
+        touchpad = touchpad_config.touchpad
+        for key in touchpad_config.CONFIG_KEYS:
+            setattr(touchpad, key, 1)
+        touchpad.minimum_speed = 0.2500000125
+        changed = touchpad_config.update(
+            {'minimum_speed': 0.25, 'fast_taps': 1, 'locked_drags': 2},
+            corner_coasting=3)
+        assert changed == frozenset(['locked_drags', 'corner_coasting'])
+        assert touchpad.read_all.call_count == 1
+        touchpad.apply.assert_called_once_with(
+            {'locked_drags': 2, 'corner_coasting': 3})
+        assert touchpad.locked_drags == 2
+        assert touchpad.corner_coasting == 3
+
+    def test_update_unchanged(self, touchpad_config):
+        touchpad = touchpad_config.touchpad
+        for key in touchpad_config.CONFIG_KEYS:
+            setattr(touchpad, key, 1)
+        assert touchpad_config.update(fast_taps=1) == frozenset()
+        assert not touchpad.apply.called
+
+    def test_update_missing_property(self):
+        keys = config.TouchpadConfiguration.CONFIG_KEYS
+        touchpad = make_touchpad_mock(keys, missing_keys=['corner_coasting'])
+        for key in keys:
+            setattr(touchpad, key, 1)
+        touchpad_config = config.TouchpadConfiguration(touchpad)
+        assert touchpad_config.update(fast_taps=2) == frozenset(['fast_taps'])
+        assert touchpad.fast_taps == 2
+        with pytest.raises(UndefinedPropertyError):
+            touchpad_config.update(corner_coasting=2)
+
+    def test_update_unknown_key(self, touchpad_config):
+        with pytest.raises(KeyError):
+            touchpad_config.update(fast_taps=1, spam=2)
+        assert not touchpad_config.touchpad.read_all.called
+        assert not touchpad_config.touchpad.apply.called
+
     def test_delitem(self, tmpdir, touchpad_config, key):
         with config_home(tmpdir):
             defaults_file = py.path.local(
@@ -304,6 +444,14 @@ class TestManagerConfiguration(object):
         keyboard_monitor = manager.keyboard_monitor
         assert keyboard_monitor.idle_time == config['idle_time']
         assert keyboard_monitor.keys_to_ignore == config['keys_to_ignore']
+        assert (keyboard_monitor.adaptive_idle_time ==
+                config['adaptive_idle_time'])
+        assert (keyboard_monitor.idle_time_percentile ==
+                config['idle_time_percentile'])
+        assert (keyboard_monitor.idle_time_histogram ==
+                config['idle_time_histogram'])
+        assert (keyboard_monitor.ignored_keyboards ==
+                config['ignored_keyboards'])
         mouse_manager = manager.mouse_manager
         assert mouse_manager.ignored_mouses == config['ignored_mouses']
 
@@ -316,7 +464,7 @@ class TestManagerConfiguration(object):
         assert left == right
 
     def get_value(self, manager, key):
-        if key in ('idle_time', 'keys_to_ignore'):
+        if key in config.ManagerConfiguration.KEYBOARD_MONITOR_KEYS:
             return getattr(manager.keyboard_monitor, key)
         elif key == 'ignored_mouses':
             return getattr(manager.mouse_manager, key)
@@ -373,7 +521,9 @@ class TestManagerConfiguration(object):
         assert defaults == {
             'monitor_mouses': False, 'ignored_mouses': [],
             'monitor_keyboard': False, 'idle_time': 2.0,
-            'keys_to_ignore': 2}
+            'keys_to_ignore': 2, 'adaptive_idle_time': False,
+            'idle_time_percentile': 0.95, 'idle_time_histogram': [],
+            'ignored_keyboards': []}
         assert manager_config.defaults == defaults
 
     def test_init(self):
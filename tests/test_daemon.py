@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012, Sebastian Wiesner <lunaryorn@googlemail.com>
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+
+from __future__ import (print_function, division, unicode_literals,
+                        absolute_import)
+
+import os
+import json
+import socket
+import threading
+
+import mock
+import pytest
+
+from synaptiks import daemon
+from synaptiks.config import TouchpadConfiguration
+from synaptiks.x11 import ProtocolError
+
+
+def pytest_funcarg__touchpad(request):
+    keys = TouchpadConfiguration.CONFIG_KEYS
+    touchpad = mock.Mock(name='Touchpad',
+                         spec_set=list(keys) + ['read_all', 'apply',
+                                                'property_cache'])
+    for key in keys:
+        setattr(touchpad, key, 1)
+    touchpad.property_cache = None
+    touchpad.read_all.side_effect = lambda names=None: dict(
+        (k, getattr(touchpad, k)) for k in (keys if names is None else names))
+
+    def apply(mapping):
+        for key, value in mapping.iteritems():
+            setattr(touchpad, key, value)
+    touchpad.apply.side_effect = apply
+    return touchpad
+
+
+def pytest_funcarg__service(request):
+    touchpad = request.getfuncargvalue('touchpad')
+    service = daemon.ConfigurationService(mock.MagicMock(name='display'))
+    service._config = TouchpadConfiguration(touchpad)
+    return service
+
+
+def pytest_funcarg__server(request):
+    service = request.getfuncargvalue('service')
+    tmpdir = request.getfuncargvalue('tmpdir')
+    server = daemon.ConfigurationServer(service, str(tmpdir.join('socket')))
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+
+    def shutdown():
+        server.shutdown()
+        thread.join()
+        server.server_close()
+    request.addfinalizer(shutdown)
+    return server
+
+
+def test_get_socket_path():
+    environ = {'XDG_RUNTIME_DIR': '/run/user/1000', 'DISPLAY': ':0'}
+    with mock.patch.dict(os.environ, environ):
+        path = daemon.get_socket_path()
+        assert os.path.dirname(path) == '/run/user/1000'
+        assert ':0' in os.path.basename(path)
+        assert str(os.getuid()) in os.path.basename(path)
+        assert daemon.get_socket_path(':1') != path
+
+
+def test_get_socket_path_private_directory(tmpdir):
+    environ = {'XDG_RUNTIME_DIR': '', 'DISPLAY': ':0'}
+    with mock.patch.dict(os.environ, environ):
+        with mock.patch.object(daemon.tempfile, 'tempdir', str(tmpdir)):
+            path = daemon.get_socket_path()
+    assert os.path.dirname(path) == str(
+        tmpdir.join('synaptiks-{0}'.format(os.getuid())))
+
+
+def test_get_peer_uid():
+    left, right = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        assert daemon.get_peer_uid(left) == os.getuid()
+    finally:
+        left.close()
+        right.close()
+
+
+def test_execute_set(service, touchpad):
+    response = service.execute({'command': 'set', 'key': 'fast_taps',
+                                'value': 0})
+    assert response == {'result': ['fast_taps']}
+    assert touchpad.fast_taps == 0
+    assert service.display.trap_errors.called
+
+
+def test_execute_apply(service, touchpad):
+    response = service.execute({'command': 'apply', 'settings': {
+        'fast_taps': 1, 'locked_drags': 0, 'corner_coasting': 0}})
+    assert response == {'result': ['corner_coasting', 'locked_drags']}
+    touchpad.apply.assert_called_once_with(
+        {'locked_drags': 0, 'corner_coasting': 0})
+
+
+def test_execute_get(service):
+    response = service.execute({'command': 'get',
+                                'keys': ['fast_taps', 'locked_drags']})
+    assert response == {'result': {'fast_taps': 1, 'locked_drags': 1}}
+    response = service.execute({'command': 'get'})
+    assert set(response['result']) == TouchpadConfiguration.CONFIG_KEYS
+
+
+def test_execute_unknown_command(service):
+    response = service.execute({'command': 'spam'})
+    assert 'spam' in response['error']
+    assert 'result' not in response
+
+
+def test_execute_invalid_arguments(service, touchpad):
+    response = service.execute({'command': 'set', 'key': 'spam',
+                                'value': 1})
+    assert response['error'].startswith('KeyError')
+    assert not touchpad.apply.called
+
+
+def test_execute_protocol_error_forgets_touchpad(service, touchpad):
+    touchpad.read_all.side_effect = ProtocolError([])
+    response = service.execute({'command': 'set', 'key': 'fast_taps',
+                                'value': 0})
+    assert 'error' in response
+    assert service._config is None
+
+
+def test_process_events(service):
+    # no property cache
+    service.process_events()
+    touchpad = mock.Mock(name='Touchpad')
+    service._config = TouchpadConfiguration(touchpad)
+    service.process_events()
+    events = touchpad.property_cache.events
+    events.process_events.assert_called_once_with()
+    touchpad.property_cache = None
+    service.process_events()
+    assert events.process_events.call_count == 1
+    service._config = None
+    service.process_events()
+
+
+def test_server_handle_timeout(tmpdir, service):
+    server = daemon.ConfigurationServer(service, str(tmpdir.join('socket')))
+    try:
+        with mock.patch.object(service, 'process_events') as process_events:
+            server.timeout = 0.01
+            server.handle_request()
+            process_events.assert_called_once_with()
+    finally:
+        server.server_close()
+
+
+def test_server_drops_idle_clients(server, touchpad):
+    idle = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    with mock.patch.object(daemon._RequestHandler, 'timeout', 0.1):
+        try:
+            idle.connect(server.server_address)
+            response = daemon.send_request(
+                {'command': 'get', 'keys': ['fast_taps']},
+                server.server_address)
+            assert response == {'result': {'fast_taps': 1}}
+            # the idle client was disconnected
+            assert idle.recv(1) == b''
+        finally:
+            idle.close()
+
+
+def test_server_one_request_per_connection(server, touchpad):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(server.server_address)
+        request = json.dumps({'command': 'get', 'keys': ['fast_taps']})
+        sock.sendall((request + '\n' + request + '\n').encode('utf-8'))
+        stream = sock.makefile('rb')
+        assert json.loads(stream.readline()) == {'result': {'fast_taps': 1}}
+        assert stream.readline() == b''
+        stream.close()
+    finally:
+        sock.close()
+
+
+def test_server_roundtrip(server, touchpad):
+    response = daemon.send_request(
+        {'command': 'set', 'key': 'locked_drags', 'value': 0},
+        server.server_address)
+    assert response == {'result': ['locked_drags']}
+    assert touchpad.locked_drags == 0
+    response = daemon.send_request({'command': 'get', 'keys': ['fast_taps']},
+                                   server.server_address)
+    assert response == {'result': {'fast_taps': 1}}
+
+
+def test_server_socket_permissions(server):
+    mode = os.stat(server.server_address).st_mode
+    assert not mode & 0o077
+
+
+def test_server_rejects_other_users(server):
+    left, right = socket.socketpair(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        assert server.verify_request(left, None)
+        with mock.patch.object(os, 'getuid',
+                               mock.Mock(return_value=os.getuid() + 1)):
+            assert not server.verify_request(left, None)
+    finally:
+        left.close()
+        right.close()
+
+
+def test_server_creates_private_directory(tmpdir, service):
+    environ = {'XDG_RUNTIME_DIR': '', 'DISPLAY': ':0'}
+    with mock.patch.dict(os.environ, environ):
+        with mock.patch.object(daemon.tempfile, 'tempdir', str(tmpdir)):
+            server = daemon.ConfigurationServer(service)
+    try:
+        directory = os.path.dirname(server.server_address)
+        assert os.stat(directory).st_mode & 0o777 == 0o700
+    finally:
+        server.server_close()
+
+
+def test_server_insecure_directory(tmpdir, service):
+    directory = tmpdir.join('synaptiks-{0}'.format(os.getuid()))
+    directory.mkdir()
+    directory.chmod(0o755)
+    environ = {'XDG_RUNTIME_DIR': '', 'DISPLAY': ':0'}
+    with mock.patch.dict(os.environ, environ):
+        with mock.patch.object(daemon.tempfile, 'tempdir', str(tmpdir)):
+            with pytest.raises(EnvironmentError):
+                daemon.ConfigurationServer(service)
+
+
+def test_server_already_running(server, service):
+    with pytest.raises(EnvironmentError):
+        daemon.ConfigurationServer(service, server.server_address)
+
+
+def test_server_replaces_stale_socket(tmpdir, service):
+    socket_path = str(tmpdir.join('socket'))
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(socket_path)
+    stale.close()
+    server = daemon.ConfigurationServer(service, socket_path)
+    server.server_close()
+    assert not os.path.exists(socket_path)
+
+
+def test_send_request_no_server(tmpdir):
+    with pytest.raises(socket.error):
+        daemon.send_request({'command': 'get'}, str(tmpdir.join('socket')))
@@ -27,11 +27,14 @@ from __future__ import (print_function, division, unicode_literals,
                         absolute_import)
 
 import math
+import json
 
 import pytest
+import mock
 
 from synaptiks.x11.input import InputDevice
-from synaptiks.touchpad import Touchpad, NoTouchpadError
+from synaptiks.touchpad import (Touchpad, TouchpadHardwareInfo,
+                                 NoTouchpadError)
 
 
 def pytest_funcarg__touchpad(request):
@@ -63,6 +66,162 @@ def test_inheritance():
     assert issubclass(Touchpad, InputDevice)
 
 
+def test_property_names():
+    names = Touchpad.property_names()
+    assert 'Synaptics Off' in names
+    assert 'Synaptics Move Speed' in names
+    assert 'Synaptics Capabilities' in names
+    assert all(name.startswith('Synaptics ') for name in names)
+
+
+def test_property_plan():
+    plan = Touchpad.property_plan()
+    assert Touchpad.property_plan() is plan
+    move_speed = plan['Synaptics Move Speed']
+    assert move_speed.type == 'float'
+    assert set(a for a, _ in move_speed.attributes) == set(
+        ['minimum_speed', 'maximum_speed', 'acceleration_factor'])
+    assert all(isinstance(getattr(Touchpad, a), type(d)) and
+               getattr(Touchpad, a) is d
+               for p in plan.values() for a, d in p.attributes)
+
+
+def pytest_funcarg__fake_touchpad(request):
+    touchpad = Touchpad(mock.Mock(name='display'), 12)
+    touchpad.get_values = mock.Mock(return_value=[[0.5, 1.0, 0.1, 40.0]])
+    touchpad.batch = mock.MagicMock(name='batch')
+    touchpad.set_float = mock.Mock(name='set_float')
+    return touchpad
+
+
+def test_apply_writes_each_property_once(fake_touchpad):
+    fake_touchpad.apply({'minimum_speed': 0.4, 'maximum_speed': 1.5,
+                         'acceleration_factor': 0.2})
+    fake_touchpad.get_values.assert_called_once_with(
+        ['Synaptics Move Speed'])
+    fake_touchpad.set_float.assert_called_once_with(
+        'Synaptics Move Speed', [0.4, 1.5, 0.2, 40.0])
+    assert fake_touchpad.batch.called
+
+
+def test_read_all_names(fake_touchpad):
+    values = fake_touchpad.read_all(['maximum_speed'])
+    fake_touchpad.get_values.assert_called_once_with(
+        ['Synaptics Move Speed'])
+    assert values['maximum_speed'] == 1.0
+    assert 'fast_taps' not in values
+
+
+def test_apply_nothing(fake_touchpad):
+    fake_touchpad.apply({})
+    assert not fake_touchpad.get_values.called
+    assert not fake_touchpad.batch.called
+
+
+def test_apply_unknown_key(fake_touchpad):
+    with pytest.raises(KeyError):
+        fake_touchpad.apply({'capabilities': [True]})
+    assert not fake_touchpad.set_float.called
+
+
+def test_hardware_info_from_capabilities():
+    info = TouchpadHardwareInfo.from_capabilities([1, 0, 1, 1, 0, 1, 1])
+    assert info.capabilities == (True, False, True, True, False, True, True)
+    assert info.buttons == (True, False, True)
+    assert info.finger_detection == 2
+    assert info.has_pressure_detection
+    assert info.has_finger_width_detection
+    assert info.has_two_finger_emulation
+    with pytest.raises(AttributeError):
+        info.spam = 'eggs'
+
+
+def test_hardware_info_cached_until_hierarchy_change(fake_touchpad):
+    display = fake_touchpad.display
+    display.hierarchy_serial = 0
+    capabilities = mock.Mock(return_value=[1, 1, 1, 0, 0, 1, 0])
+    with mock.patch.object(Touchpad, '__getitem__', capabilities):
+        info = fake_touchpad.hardware_info
+        assert fake_touchpad.finger_detection == 1
+        assert fake_touchpad.buttons == (True, True, True)
+        assert not fake_touchpad.has_two_finger_emulation
+        assert fake_touchpad.hardware_info is info
+        capabilities.assert_called_once_with('Synaptics Capabilities')
+        display.hierarchy_serial = 1
+        assert fake_touchpad.hardware_info is not info
+        assert capabilities.call_count == 2
+
+
+def test_hardware_info_without_device_events():
+    display = mock.Mock(name='display', spec_set=['hierarchy_serial'])
+    display.hierarchy_serial = None
+    touchpad = Touchpad(display, 12)
+    capabilities = mock.Mock(return_value=[1, 1, 1, 0, 0, 1, 0])
+    with mock.patch.object(Touchpad, '__getitem__', capabilities):
+        info = touchpad.hardware_info
+        assert touchpad.hardware_info is info
+        capabilities.assert_called_once_with('Synaptics Capabilities')
+
+
+def test_find_first_cache_hit(tmpdir):
+    cache_file = tmpdir.join('discovery.json')
+    entry = {'id': 12, 'name': 'SynPS/2 Synaptics TouchPad',
+             'product_id': [2, 7]}
+    cache_file.write(json.dumps(entry))
+    display = mock.Mock(name='display')
+    with mock.patch.object(Touchpad, '_probe_cached_touchpad') as probe:
+        with mock.patch.object(Touchpad, 'find_all') as find_all:
+            probe.return_value = mock.sentinel.touchpad
+            touchpad = Touchpad.find_first(display, str(cache_file))
+            assert touchpad is mock.sentinel.touchpad
+            probe.assert_called_once_with(display, entry)
+            assert not find_all.called
+
+
+def test_find_first_cache_miss(tmpdir):
+    cache_file = tmpdir.join('discovery.json')
+    cache_file.write('garbage')
+    touchpad = mock.Mock(name='touchpad')
+    with mock.patch.object(Touchpad, '_probe_cached_touchpad') as probe:
+        with mock.patch.object(Touchpad, 'find_all') as find_all:
+            find_all.return_value = iter([touchpad])
+            found = Touchpad.find_first(mock.sentinel.display,
+                                        str(cache_file))
+            assert found is touchpad
+            assert not probe.called
+            touchpad._save_discovery_entry.assert_called_once_with(
+                str(cache_file))
+
+
+def test_probe_cached_touchpad():
+    display = mock.MagicMock(name='display')
+    product_id = mock.Mock(name='product_id')
+    product_id.tolist.return_value = [2, 7]
+    get_values = mock.Mock(return_value=[product_id, mock.sentinel.off])
+    entry = {'id': 12, 'name': 'SynPS/2 Synaptics TouchPad',
+             'product_id': [2, 7]}
+    with mock.patch.object(Touchpad, 'name', 'SynPS/2 Synaptics TouchPad'):
+        with mock.patch.object(Touchpad, 'get_values', get_values):
+            touchpad = Touchpad._probe_cached_touchpad(display, entry)
+            assert touchpad.id == 12
+            get_values.assert_called_once_with(
+                ['Device Product ID', 'Synaptics Off'])
+            assert display.trap_errors.called
+            entry['product_id'] = [2, 8]
+            assert Touchpad._probe_cached_touchpad(display, entry) is None
+            get_values.side_effect = KeyError('Synaptics Off')
+            entry['product_id'] = [2, 7]
+            assert Touchpad._probe_cached_touchpad(display, entry) is None
+
+
+def test_find_all_preloads_atoms(display):
+    list(Touchpad.find_all(display))
+    cached = set(display._atom_cache)
+    undefined = display._undefined_atoms
+    assert all(name.encode('ascii') in cached | undefined
+               for name in Touchpad.property_names())
+
+
 @pytest.mark.skipif(b'config.xinput_has_touchpad')
 def test_no_touchpad(display):
     assert not list(Touchpad.find_all(display))
@@ -85,6 +244,23 @@ class TestTouchpad(object):
         assert 'Synaptics Off' in touchpad
         assert isinstance(touchpad, Touchpad)
 
+    def test_read_all(self, touchpad):
+        values = touchpad.read_all()
+        assert set(values) == set(a for p in Touchpad.property_plan().values()
+                                  for a, _ in p.attributes)
+        assert values == dict((key, getattr(touchpad, key)) for key in values)
+
+    def test_apply(self, touchpad):
+        values = touchpad.read_all()
+        touchpad.apply({'minimum_speed': 0.25, 'maximum_speed': 2.5})
+        try:
+            assert round(touchpad.minimum_speed, 5) == 0.25
+            assert round(touchpad.maximum_speed, 5) == 2.5
+            assert touchpad.acceleration_factor == \
+                   values['acceleration_factor']
+        finally:
+            touchpad.apply(values)
+
     def test_off(self, touchpad, touchpad_properties):
         assert isinstance(touchpad.off, int)
         assert 0 <= touchpad.off <= 2
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012, Sebastian Wiesner <lunaryorn@googlemail.com>
+# All rights reserved.
+
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+
+# 1. Redistributions of source code must retain the above copyright notice,
+#    this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in the
+#    documentation and/or other materials provided with the distribution.
+
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+from __future__ import (print_function, division, unicode_literals,
+                        absolute_import)
+
+from select import select
+from ctypes import pointer
+
+import pytest
+
+from synaptiks._bindings import xlib
+from synaptiks._bindings import xinput as binding
+from synaptiks.x11.input import InputDevice
+from synaptiks.x11 import events
+
+
+def pytest_funcarg__source(request):
+    return request.cached_setup(events.InputEventSource, lambda s: s.close())
+
+
+def pytest_funcarg__test_keyboard(request):
+    display = request.getfuncargvalue('display')
+    return next(InputDevice.find_devices_by_name(
+        display, 'Virtual core XTEST keyboard'))
+
+
+def wait_for_events(source, timeout=1):
+    """
+    Wait for events on the given ``source``, and return all of them.
+    """
+    received = []
+    source.add_listener(received.append)
+    try:
+        readable, _, _ = select([source], [], [], timeout)
+        if readable:
+            source.process_events()
+    finally:
+        source.remove_listener(received.append)
+    return received
+
+
+def test_read_property_event():
+    event = binding.XIPropertyEvent(evtype=binding.PROPERTY_EVENT, time=42,
+                                    deviceid=3, property=276,
+                                    what=binding.PROPERTY_MODIFIED)
+    assert events._read_property_event(pointer(event)) == events.PropertyEvent(
+        42, 3, 276, binding.PROPERTY_MODIFIED)
+
+
+def test_read_hierarchy_event():
+    info = (binding.XIHierarchyInfo * 2)(
+        binding.XIHierarchyInfo(12, 3, 3, True, binding.SLAVE_ADDED),
+        binding.XIHierarchyInfo(13, 3, 3, False, binding.SLAVE_REMOVED))
+    event = binding.XIHierarchyEvent(
+        evtype=binding.HIERARCHY_CHANGED, time=42,
+        flags=binding.SLAVE_ADDED | binding.SLAVE_REMOVED, num_info=2,
+        info=info)
+    parsed = events._read_hierarchy_event(pointer(event))
+    assert parsed.time == 42
+    assert parsed.flags == binding.SLAVE_ADDED | binding.SLAVE_REMOVED
+    assert parsed.changes == (
+        events.HierarchyChange(12, 3, 3, True, binding.SLAVE_ADDED),
+        events.HierarchyChange(13, 3, 3, False, binding.SLAVE_REMOVED))
+
+
+def test_read_raw_key_event():
+    event = binding.XIRawEvent(evtype=binding.RAW_KEY_PRESS, time=42,
+                               deviceid=3, sourceid=11, detail=38)
+    assert events._read_raw_key_event(pointer(event)) == events.RawKeyEvent(
+        42, 3, 11, 38, True, False)
+    event.flags = binding.KEY_REPEAT
+    assert events._read_raw_key_event(pointer(event)).repeat
+    event.evtype = binding.RAW_KEY_RELEASE
+    event.flags = 0
+    assert not events._read_raw_key_event(pointer(event)).pressed
+
+
+def test_read_mapping_event():
+    event = xlib.XEvent()
+    event.xmapping = xlib.XMappingEvent(
+        type=xlib.MAPPING_NOTIFY, request=xlib.MAPPING_KEYBOARD,
+        first_keycode=8, count=248)
+    assert events._read_mapping_event(event) == events.MappingEvent(
+        xlib.MAPPING_KEYBOARD, 8, 248)
+
+
+class TestInputEventSource(object):
+
+    def test_fileno(self, source):
+        assert source.fileno() > 0
+
+    def test_no_pending_events(self, source):
+        source.process_events()
+        assert source.process_events() == 0
+
+    def test_property_event(self, source, test_keyboard):
+        source.process_events()
+        property = 'Device Enabled'
+        test_keyboard.set_byte(property, [1])
+        test_keyboard.display.flush()
+        received = wait_for_events(source)
+        atom = test_keyboard.display.intern_atom(property)
+        assert any(e[1:] == (test_keyboard.id, atom.value,
+                             binding.PROPERTY_MODIFIED) for e in received)
+
+    def test_remove_listener_not_added(self, source):
+        with pytest.raises(ValueError):
+            source.remove_listener(len)
+
+    def test_hierarchy_serial(self, source):
+        assert source.hierarchy_serial == 0
+
+
+def test_display_device_events(display):
+    source = display.device_events
+    assert isinstance(source, events.InputEventSource)
+    assert source is display.device_events
+    assert source.display.name == display.name
+
+
+def test_raw_key_event_source():
+    with events.RawKeyEventSource() as source:
+        assert source.fileno() > 0
+        source.process_events()
+        assert source.process_events() == 0
+
+
+def test_mapping_event_source():
+    with events.MappingEventSource() as source:
+        assert source.fileno() > 0
+        source.process_events()
+        assert source.process_events() == 0
@@ -28,12 +28,14 @@ from __future__ import (print_function, division, unicode_literals,
 
 import sys
 import re
+from select import select
 from itertools import product, repeat
 from functools import partial
 
 import pytest
+import mock
 
-from synaptiks.x11 import input as xinput
+from synaptiks.x11 import Display, input as xinput
 
 
 def pytest_generate_tests(metafunc):
@@ -108,6 +110,19 @@ def test_assert_xinput_version(display):
         pass
 
 
+def test_assert_xinput_version_announced():
+    query_version = mock.Mock(return_value=(True, (2, 1)))
+    with mock.patch.object(xinput.xinput, 'query_version', query_version):
+        xinput.assert_xinput_version(mock.sentinel.display, (2, 1), (2, 2))
+        query_version.assert_called_once_with(mock.sentinel.display, (2, 2))
+        with pytest.raises(xinput.XInputVersionError) as excinfo:
+            xinput.assert_xinput_version(mock.sentinel.display, (2, 2))
+        assert excinfo.value.actual_version == (2, 1)
+        query_version.return_value = (False, (2, 2))
+        with pytest.raises(xinput.XInputVersionError):
+            xinput.assert_xinput_version(mock.sentinel.display, (2, 0))
+
+
 def test_make_struct_format():
     data = xinput._make_struct_format('f', 1)
     assert isinstance(data, str)
@@ -139,12 +154,177 @@ def test_unpack_property_data(type_code, item_size):
     assert xinput._unpack_property_data(type_code, 1, data) == [1]
 
 
+def test_get_struct():
+    property_struct = xinput._get_struct('L', 4)
+    assert property_struct.format == '=4L'
+    assert property_struct.size == 16
+    assert xinput._get_struct('L', 4) is property_struct
+
+
 def test_make_struct_format_invalid_type_code():
     with pytest.raises(ValueError) as exc_info:
         xinput._make_struct_format('ff', 10)
     assert str(exc_info.value) == 'invalid type code'
 
 
+def test_parse_device_class():
+    from ctypes import POINTER, c_int, cast, pointer
+    from synaptiks._bindings import xinput as binding
+    keycodes = (c_int * 2)(9, 10)
+    key_class = binding.XIKeyClassInfo(binding.KEY_CLASS, 3, 2,
+                                       cast(keycodes, POINTER(c_int)))
+    parsed = xinput._parse_device_class(
+        cast(pointer(key_class), binding.XIAnyClassInfo_p))
+    assert parsed == xinput.KeyClass(3, (9, 10))
+    unknown_class = binding.XIAnyClassInfo(42, 3)
+    assert xinput._parse_device_class(pointer(unknown_class)) is None
+
+
+class TestPropertyValue(object):
+
+    value = xinput.PropertyValue('L', xinput._pack_property_data(
+        'L', [10, 20, 30]))
+
+    def test_len(self):
+        assert len(self.value) == 3
+
+    def test_getitem(self):
+        value = xinput.PropertyValue(self.value.type_code, self.value.data)
+        assert value[0] == 10
+        assert value[2] == 30
+        assert value[-1] == 30
+        assert value._items is None
+
+    def test_getitem_out_of_range(self):
+        value = xinput.PropertyValue(self.value.type_code, self.value.data)
+        with pytest.raises(IndexError):
+            value[3]
+        with pytest.raises(IndexError):
+            value[-4]
+
+    def test_getitem_slice(self):
+        assert self.value[1:] == [20, 30]
+
+    def test_tolist(self):
+        items = self.value.tolist()
+        assert items == [10, 20, 30]
+        assert isinstance(items, list)
+        items[0] = 0
+        assert self.value.tolist() == [10, 20, 30]
+
+    def test_eq_ne(self):
+        assert self.value == [10, 20, 30]
+        assert self.value == (10, 20, 30)
+        assert self.value != [10, 20]
+        assert self.value != 'spam'
+
+    def test_string(self):
+        value = xinput.PropertyValue(xinput.PropertyValue.STRING, b'spam')
+        assert len(value) == 1
+        assert value[0] == b'spam'
+        assert value.tolist() == [b'spam']
+
+
+class TestPropertyCache(object):
+
+    def pytest_funcarg__cache(self, request):
+        device = mock.Mock(name='device')
+        device.id = 12
+        return xinput.PropertyCache(device)
+
+    def test_listener(self, cache):
+        cache.events.add_listener.assert_called_with(cache._handle_event)
+        cache.close()
+        cache.events.remove_listener.assert_called_with(cache._handle_event)
+
+    def test_get_store(self, cache):
+        assert cache.get(276) is None
+        cache.store(276, (19, 8, b'\x01'))
+        assert cache.get(276) == (19, 8, b'\x01')
+        assert cache.events.process_events.call_count == 2
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_discard(self, cache):
+        cache.store(276, (19, 8, b'\x01'))
+        cache.store(277, (19, 8, b'\x01'))
+        cache.discard(276)
+        cache.discard(278)
+        assert cache.get(276) is None
+        assert cache.get(277) is not None
+
+    def test_property_event(self, cache):
+        from synaptiks.x11.events import PropertyEvent
+        cache.store(276, (19, 8, b'\x01'))
+        cache.store(277, (19, 8, b'\x01'))
+        cache._handle_event(PropertyEvent(0, 13, 276, 2))
+        assert len(cache) == 2
+        cache._handle_event(PropertyEvent(0, 12, 276, 2))
+        assert cache.get(276) is None
+        assert cache.get(277) is not None
+
+    def test_hierarchy_event(self, cache):
+        from synaptiks.x11.events import HierarchyEvent, HierarchyChange
+        cache.store(276, (19, 8, b'\x01'))
+        cache._handle_event(HierarchyEvent(0, 0, (
+            HierarchyChange(13, 3, 3, True, 0),)))
+        assert len(cache) == 1
+        cache._handle_event(HierarchyEvent(0, 0, (
+            HierarchyChange(12, 3, 3, False, 0),)))
+        assert len(cache) == 0
+
+
+class TestPropertyIndex(object):
+
+    DEVICE_PROPERTIES = {2: [276, 277], 12: [277, 300], 13: [300]}
+
+    def pytest_funcarg__index(self, request):
+        patches = [
+            mock.patch.object(xinput.DeviceSnapshot, 'query',
+                              return_value=dict.fromkeys([2, 12])),
+            mock.patch('synaptiks._bindings.xinput.list_device_properties',
+                       side_effect=lambda display, deviceids: [
+                           self.DEVICE_PROPERTIES[d] for d in deviceids])]
+        for patch in patches:
+            patch.start()
+            request.addfinalizer(patch.stop)
+        return xinput.PropertyIndex(mock.Mock(name='display'))
+
+    def test_find_devices(self, index):
+        assert index.find_devices(277) == frozenset([2, 12])
+        assert index.find_devices(300) == frozenset([12])
+        assert index.find_devices(42) == frozenset()
+        # the index is built once
+        assert xinput.DeviceSnapshot.query.call_count == 1
+        list_device_properties = xinput.xinput.list_device_properties
+        assert list_device_properties.call_count == 1
+        assert index.events.process_events.call_count == 3
+
+    def test_get_properties(self, index):
+        assert index.get_properties(2) == frozenset([276, 277])
+
+    def test_property_events(self, index):
+        from synaptiks.x11.events import PropertyEvent
+        binding = xinput.xinput
+        index.find_devices(276)
+        index._handle_event(
+            PropertyEvent(0, 12, 276, binding.PROPERTY_CREATED))
+        index._handle_event(
+            PropertyEvent(0, 2, 277, binding.PROPERTY_DELETED))
+        assert index.find_devices(276) == frozenset([2, 12])
+        assert index.find_devices(277) == frozenset([12])
+        assert index.get_properties(2) == frozenset([276])
+
+    def test_hierarchy_events(self, index):
+        from synaptiks.x11.events import HierarchyEvent, HierarchyChange
+        binding = xinput.xinput
+        index.find_devices(300)
+        index._handle_event(HierarchyEvent(0, 0, (
+            HierarchyChange(13, 3, 3, True, binding.SLAVE_ADDED),
+            HierarchyChange(12, 3, 3, False, binding.SLAVE_REMOVED))))
+        assert index.find_devices(300) == frozenset([13])
+        assert index.find_devices(277) == frozenset([2])
+
+
 class TestXInputVersion(object):
 
     version = xinput.XInputVersion(2, 3)
@@ -219,6 +399,19 @@ class TestInputDevice(object):
             display, device_property)
         assert all(device_property in d for d in devices)
 
+    def test_find_devices_with_property_uses_index(self, device_property):
+        with Display.from_name() as display:
+            without_index = list(xinput.InputDevice.find_devices_with_property(
+                display, device_property))
+            assert display._device_events is None
+            display.device_events
+            devices = list(xinput.InputDevice.find_devices_with_property(
+                display, device_property))
+            atom = display.intern_atom(device_property)
+            assert set(d.id for d in devices) == \
+                   display.property_index.find_devices(atom.value)
+            assert devices == without_index
+
     def test_find_devices_with_property_non_defined(self, display):
         devices = list(xinput.InputDevice.find_devices_with_property(
             display, 'a undefined property'))
@@ -236,9 +429,30 @@ class TestInputDevice(object):
         assert devices
         assert all('XTEST' in d.name for d in devices)
 
+    def test_all_devices_share_snapshots(self, display):
+        devices = list(xinput.InputDevice.all_devices(display))
+        snapshots = devices[0]._snapshots
+        assert all(d._snapshots is snapshots for d in devices)
+        assert set(snapshots) == set(d.id for d in devices)
+
     def test_display(self, display, device):
         assert device.display is display
 
+    def test_snapshot(self, device, test_device):
+        snapshot = device.snapshot
+        assert isinstance(snapshot, xinput.DeviceSnapshot)
+        assert snapshot.id == test_device.id
+        assert snapshot.name == test_device.name
+        assert snapshot is device.snapshot
+
+    def test_snapshot_classes(self, test_keyboard, test_pointer):
+        keyboard_classes = test_keyboard.snapshot.classes
+        assert any(isinstance(c, xinput.KeyClass) for c in keyboard_classes)
+        pointer_classes = test_pointer.snapshot.classes
+        assert any(isinstance(c, xinput.ButtonClass) for c in pointer_classes)
+        assert any(isinstance(c, xinput.ValuatorClass)
+                   for c in pointer_classes)
+
     def test_name(self, device, test_device):
         assert device.name == test_device.name
 
@@ -291,6 +505,11 @@ class TestInputDevice(object):
     def test_contains(self, device, device_property):
         assert device_property in device
 
+    def test_items(self, device, test_device):
+        items = dict(device.items())
+        assert set(items) == set(test_device.properties)
+        assert items == dict((name, device[name]) for name in items)
+
     def test_contains_undefined_property(self, device):
         assert not 'a undefined property' in device
 
@@ -303,6 +522,11 @@ class TestInputDevice(object):
             values = device[device_property]
         assert values == device_property_value
 
+    def test_get_value(self, device, device_property):
+        value = device.get_value(device_property)
+        assert isinstance(value, xinput.PropertyValue)
+        assert value == device[device_property]
+
     def test_getitem_non_defined_property(self, device):
         with pytest.raises(xinput.UndefinedPropertyError) as excinfo:
             device['a undefined property']
@@ -319,6 +543,67 @@ class TestInputDevice(object):
         test_keyboard.set_byte(property, [1])
         assert test_keyboard[property] == [1]
 
+    def test_batch(self, test_keyboard):
+        property = 'Device Enabled'
+        atom = test_keyboard.display.intern_atom(property)
+        def server_value():
+            _, _, data = xinput.get_property(test_keyboard.display,
+                                             test_keyboard.id, atom)
+            return data
+        with test_keyboard.batch():
+            test_keyboard.set_byte(property, [0])
+            test_keyboard.set_byte(property, [1])
+            test_keyboard.set_byte(property, [0])
+            # reads see the pending value, the server still has the old one
+            assert test_keyboard[property] == [0]
+            assert server_value() == b'\x01'
+        assert test_keyboard[property] == [0]
+        with test_keyboard.batch():
+            test_keyboard.set_byte(property, [1])
+        assert test_keyboard[property] == [1]
+
+    def test_property_cache(self, display, test_keyboard):
+        property = 'Device Enabled'
+        cache = test_keyboard.enable_property_cache()
+        try:
+            assert test_keyboard.enable_property_cache() is cache
+            assert test_keyboard[property] == [1]
+            assert test_keyboard[property] == [1]
+            assert (cache.hits, cache.misses) == (1, 1)
+            # a change through another object invalidates the cache
+            other = xinput.InputDevice(display, test_keyboard.id)
+            other.set_byte(property, [0])
+            display.sync()
+            # give the server some time to deliver the event
+            select([cache.events], [], [], 1)
+            assert test_keyboard[property] == [0]
+            assert cache.misses == 2
+            # unchecked changes are read back from the server
+            test_keyboard.set_byte(property, [1])
+            assert test_keyboard[property] == [1]
+            assert cache.misses == 3
+        finally:
+            test_keyboard.set_byte(property, [1])
+            test_keyboard.disable_property_cache()
+        assert test_keyboard.property_cache is None
+
+    def test_batch_discarded_on_exception(self, test_keyboard):
+        property = 'Device Enabled'
+        with pytest.raises(ZeroDivisionError):
+            with test_keyboard.batch():
+                test_keyboard.set_byte(property, [0])
+                1 / 0
+        assert test_keyboard[property] == [1]
+
+    def test_batch_errors(self, test_keyboard):
+        from synaptiks.x11 import ProtocolError
+        integer = test_keyboard.display.types.integer
+        with pytest.raises(ProtocolError) as excinfo:
+            with test_keyboard.batch():
+                # 7 is not a valid property format
+                test_keyboard._set_raw('Device Enabled', integer, 7, b'\x00')
+        assert len(excinfo.value.errors) == 1
+
     def test_set_int(self):
         pytest.xfail('not implemented')
 
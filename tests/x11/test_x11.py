@@ -31,7 +31,7 @@ import os
 import mock
 import pytest
 
-from synaptiks.x11 import Display, DisplayError
+from synaptiks.x11 import Display, DisplayError, ProtocolError, ErrorEvent
 
 
 class TestDisplay(object):
@@ -53,7 +53,9 @@ class TestDisplay(object):
                 Display.from_name()
 
     def test_qt(self, qtapp):
-        assert Display.from_qt()
+        display = Display.from_qt()
+        assert display
+        assert Display.from_qt() is display
 
     def test_standard_types(self, display):
         from synaptiks._bindings import xlib
@@ -77,6 +79,110 @@ class TestDisplay(object):
         assert display._atom_cache[b'INTEGER'] is int_atom
         assert b'non-existing_atom' not in display._atom_cache
 
+    def test_intern_atoms(self, display):
+        atoms = display.intern_atoms(['FLOAT', 'non-existing-atom', 'FLOAT'])
+        assert atoms == [display.types.float, None, display.types.float]
+        assert display._atom_names[display.types.float.value] == 'FLOAT'
+
+    def test_intern_atoms_create(self, display):
+        name = 'synaptiks test atom'
+        atom, = display.intern_atoms([name], only_if_exists=False)
+        assert atom
+        assert display.intern_atom(name) is atom
+        assert atom.name == name
+
+    def test_undefined_atoms(self):
+        from synaptiks._bindings import xlib
+        name = b'synaptiks undefined test atom'
+        with Display.from_name() as display:
+            # without device events, undefined atoms are not remembered
+            assert display.intern_atom(name) is None
+            assert name not in display._undefined_atoms
+            display.device_events
+            assert display.intern_atom(name) is None
+            assert name in display._undefined_atoms
+            with mock.patch.object(xlib, 'intern_atom') as intern_atom:
+                assert display.intern_atom(name) is None
+                assert not intern_atom.called
+            # creating the atom drops it from the negative cache
+            assert display.intern_atom(name, only_if_exists=False)
+            assert name not in display._undefined_atoms
+
+    def test_hierarchy_serial(self):
+        with Display.from_name() as display:
+            assert display.hierarchy_serial is None
+            assert display._device_events is None
+            display.device_events
+            assert display.hierarchy_serial == 0
+
+    def test_property_index(self):
+        with Display.from_name() as display:
+            assert display.property_index is None
+            assert display._device_events is None
+            display.device_events
+            index = display.property_index
+            assert index is not None
+            assert display.property_index is index
+
+    def test_undefined_atoms_after_close(self):
+        name = b'synaptiks undefined test atom'
+        display = Display.from_name()
+        display.device_events
+        assert display.intern_atom(name) is None
+        assert name in display._undefined_atoms
+        display.close()
+        assert not display._is_undefined_atom(name)
+
+    def test_get_atom_names(self, display):
+        from synaptiks._bindings import xlib
+        names = display.get_atom_names([xlib.INTEGER, display.types.float,
+                                        xlib.INTEGER])
+        assert names == ['INTEGER', 'FLOAT', 'INTEGER']
+        assert display._atom_names[xlib.INTEGER] == 'INTEGER'
+
+    def test_get_atom_names_cached(self, display):
+        from synaptiks._bindings import xlib
+        display.get_atom_names([xlib.STRING])
+        with mock.patch.object(xlib, 'get_atom_names') as get_atom_names:
+            assert display.get_atom_names([xlib.STRING]) == ['STRING']
+            assert not get_atom_names.called
+
+    def test_trap_errors_no_error(self, display):
+        with display.trap_errors():
+            display.intern_atom('FLOAT')
+
+    def test_trap_errors(self, display):
+        from synaptiks._bindings import xlib
+        with pytest.raises(ProtocolError) as excinfo:
+            with display.trap_errors():
+                # 0xffffff is never a valid atom
+                xlib.get_atom_name(display, 0xffffff)
+                xlib.get_atom_name(display, 0xfffffe)
+        errors = excinfo.value.errors
+        assert len(errors) == 2
+        assert all(isinstance(e, ErrorEvent) for e in errors)
+        assert [e.resourceid for e in errors] == [0xffffff, 0xfffffe]
+        assert all(e.description for e in errors)
+
+    def test_trap_errors_propagates_exception(self, display):
+        with pytest.raises(ZeroDivisionError):
+            with display.trap_errors():
+                1 / 0
+
+
+class TestProtocolError(object):
+
+    def test_errors(self):
+        error = ErrorEvent(5, 17, 0, 42, 10, 'BadAtom')
+        assert ProtocolError([error]).errors == [error]
+
+    def test_str(self):
+        errors = [ErrorEvent(5, 17, 0, 42, 10, 'BadAtom'),
+                  ErrorEvent(2, 131, 57, 0, 11, 'BadValue')]
+        assert str(ProtocolError(errors)) == (
+            'BadAtom (error 5, request 17.0); '
+            'BadValue (error 2, request 131.57)')
+
 
 class TestAtom(object):
 